@@ -6,8 +6,27 @@ Organizes the anomaly detector into modules:
 - sources: bit streams (device and synthetic)
 - tests_online: RCT, APT, SPRT, and online Z
 - worker: per-process processing loop
+- detector: embeddable Detector (feed buffers, snapshot)
+- lincomp: linear complexity test in side processes
+- budget: CPU-time budgets for the optional tests
+- capture: raw-byte context dumps around anomalies
+- pipeline: one stream split by test across processes over shared memory
 - tui: curses UI and "pretty" output
 - cli: orchestration and main CLI
+- aggregate: incremental totals for heartbeats and the summary
+- sinks: buffered output sinks (stdout, rotating JSONL, binary log)
+- metrics: Prometheus /metrics endpoint
+- analyze: sharded offline analysis of capture files
+- store: SQLite results store and query command
+- plot: matplotlib render process (blitting, decimation)
+- rollup: fixed-size second/minute/hour/day bias rollups
+- autotune: parameter sweep and tuning profiles
+- bench: microbenchmarks, end-to-end runs and baseline comparison
+- calibrate: detection latency and false-alarm sweeps over synthetic bias
+- thresholds: Monte Carlo false-alarm rates and corrected threshold cache
+- supervisor: asyncio monitor for many sources in one process
+- collector: fleet aggregation service and client
+- checkpoint: binary snapshots of test state for --resume
 """
 
 __all__ = [
@@ -15,8 +34,27 @@ __all__ = [
     "sources",
     "tests_online",
     "worker",
+    "detector",
+    "lincomp",
+    "budget",
+    "capture",
+    "pipeline",
     "tui",
     "cli",
+    "aggregate",
+    "sinks",
+    "metrics",
+    "analyze",
+    "store",
+    "plot",
+    "rollup",
+    "autotune",
+    "bench",
+    "calibrate",
+    "thresholds",
+    "supervisor",
+    "collector",
+    "checkpoint",
 ]
 
 
@@ -0,0 +1,172 @@
+import math
+
+from .utils import iso_now, human_bps
+
+
+# Per-process slot layout: last absolute values reported by a worker.
+_BPS, _BITS, _ONES, _WIN_LEN, _WIN_ONES = range(5)
+
+
+class Aggregator:
+    """
+    Running totals over the workers of one run.
+
+    Each process keeps its last reported counters in a small list; a new
+    report adds the difference to the totals, so an update costs O(1)
+    whatever the number of processes. Heartbeat and summary records are
+    built from the totals only.
+    """
+
+    def __init__(self):
+        self.procs = {}
+        self.bits_total = 0
+        self.ones_total = 0
+        self.window_len_total = 0
+        self.window_ones_total = 0
+        self.bps_total = 0.0
+        # Per-bit-position counters (BITPOS test), summed like the totals.
+        self.bitpos_word_bytes = None
+        self.bitpos_words = 0
+        self.bitpos_ones = None
+        self._bitpos = {}
+        # Per-process [bits analyzed, bits seen, CPU s] of budgeted tests.
+        self._coverage = {}
+
+    def _slot(self, pid: int) -> list:
+        slot = self.procs.get(pid)
+        if slot is None:
+            slot = self.procs[pid] = [0.0, 0, 0, 0, 0]
+        return slot
+
+    def update(self, payload: dict):
+        """Apply a STATS, ANOMALY or DONE payload (missing counters keep their last value)."""
+        slot = self._slot(payload["proc"])
+        bps = payload.get("bps", slot[_BPS])
+        if bps is None or not math.isfinite(bps):
+            # NaN (no elapsed time yet) would stick in the running total.
+            bps = 0.0
+        bits = payload.get("bits_processed", slot[_BITS])
+        ones = payload.get("ones_total", slot[_ONES])
+        win_len = payload.get("apt_len", slot[_WIN_LEN])
+        win_ones = payload.get("apt_ones", slot[_WIN_ONES])
+        self.bps_total += bps - slot[_BPS]
+        self.bits_total += bits - slot[_BITS]
+        self.ones_total += ones - slot[_ONES]
+        self.window_len_total += win_len - slot[_WIN_LEN]
+        self.window_ones_total += win_ones - slot[_WIN_ONES]
+        slot[:] = (bps, bits, ones, win_len, win_ones)
+        if "bitpos_ones" in payload:
+            self._update_bitpos(payload)
+        if "coverage" in payload:
+            self._coverage[payload["proc"]] = payload["coverage"]
+
+    def _update_bitpos(self, payload: dict):
+        pid = payload["proc"]
+        words, ones = payload["bitpos_words"], payload["bitpos_ones"]
+        if self.bitpos_ones is None:
+            self.bitpos_word_bytes = payload["bitpos_word_bytes"]
+            self.bitpos_ones = [0] * len(ones)
+        prev_words, prev_ones = self._bitpos.get(pid, (0, None))
+        self.bitpos_words += words - prev_words
+        if prev_ones is None:
+            self.bitpos_ones = [t + o for t, o in zip(self.bitpos_ones, ones)]
+        else:
+            self.bitpos_ones = [t + o - p for t, o, p in zip(self.bitpos_ones, ones, prev_ones)]
+        self._bitpos[pid] = (words, ones)
+
+    def coverage(self) -> dict | None:
+        """Per budgeted test: share of the bits analyzed and CPU seconds over all processes."""
+        if not self._coverage:
+            return None
+        sums = {}
+        for per_test in self._coverage.values():
+            for name, (run, seen, cpu) in per_test.items():
+                acc = sums.setdefault(name, [0, 0, 0.0])
+                acc[0] += run
+                acc[1] += seen
+                acc[2] += cpu
+        return {name: {"fraction": (run / seen) if seen else None, "bits": run, "cpu_sec": round(cpu, 3)}
+                for name, (run, seen, cpu) in sums.items()}
+
+    def bit_positions(self) -> dict | None:
+        """Per-position ones ratio and Z over all processes, or None without BITPOS."""
+        n = self.bitpos_words
+        if self.bitpos_ones is None or n <= 0:
+            return None
+        z = [(o - 0.5 * n) / (0.5 * math.sqrt(n)) for o in self.bitpos_ones]
+        worst = max(range(len(z)), key=lambda p: abs(z[p]))
+        return {
+            "word_bytes": self.bitpos_word_bytes,
+            "words": n,
+            "ones_ratio": [o / n for o in self.bitpos_ones],
+            "z": z,
+            "z_max": z[worst],
+            "worst_position": worst,
+        }
+
+    def update_counts(self, payload: dict):
+        """Apply an ITER payload (bit and ones counters only)."""
+        slot = self._slot(payload["proc"])
+        bits = payload.get("bits_processed", slot[_BITS])
+        ones = payload.get("ones_total", slot[_ONES])
+        self.bits_total += bits - slot[_BITS]
+        self.ones_total += ones - slot[_ONES]
+        slot[_BITS] = bits
+        slot[_ONES] = ones
+
+    @property
+    def ones_ratio(self) -> float | None:
+        return (self.ones_total / self.bits_total) if self.bits_total > 0 else None
+
+    @property
+    def window_ratio(self) -> float | None:
+        return (self.window_ones_total / self.window_len_total) if self.window_len_total > 0 else None
+
+    def _totals(self) -> dict:
+        ones_ratio = self.ones_ratio
+        window_ratio = self.window_ratio
+        return {
+            "ones_total": self.ones_total,
+            "ones_ratio_global": ones_ratio,
+            "ones_percent_global": (ones_ratio * 100.0) if ones_ratio is not None else None,
+            "window_len_total": self.window_len_total,
+            "window_ones_total": self.window_ones_total,
+            "ones_ratio_window": window_ratio,
+            "ones_percent_window": (window_ratio * 100.0) if window_ratio is not None else None,
+            "aggregate_bps": self.bps_total,
+            "aggregate_bps_human": human_bps(self.bps_total),
+        }
+
+    def heartbeat_record(self, elapsed: float) -> dict:
+        rec = {
+            "ts": iso_now(),
+            "heartbeat": True,
+            "elapsed_sec": round(elapsed, 3),
+            "procs_reporting": len(self.procs),
+            "bits_total": self.bits_total,
+            **self._totals(),
+        }
+        positions = self.bit_positions()
+        if positions is not None:
+            rec["bitpos_z_max"] = positions["z_max"]
+            rec["bitpos_worst_position"] = positions["worst_position"]
+        return rec
+
+    def summary_record(self, elapsed: float, processes: int, anomalies: int) -> dict:
+        rec = {
+            "ts": iso_now(),
+            "summary": {
+                "elapsed_sec": round(elapsed, 3),
+                "processes": processes,
+                "anomalies": anomalies,
+                "total_bits": self.bits_total,
+                **self._totals(),
+            },
+        }
+        positions = self.bit_positions()
+        if positions is not None:
+            rec["summary"]["bit_positions"] = positions
+        coverage = self.coverage()
+        if coverage is not None:
+            rec["summary"]["coverage"] = coverage
+        return rec
@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import math
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from .utils import iso_now, human_bps
+from .worker import build_tests
+
+
+def plan_shards(size: int, shard_bytes: int, chunk: int) -> list[tuple[int, int]]:
+    """
+    Split [0, size) into byte ranges whose starts fall on the chunk grid,
+    so every shard sees the same chunk boundaries as a serial run.
+    """
+    shard_bytes = max(chunk, (shard_bytes // chunk) * chunk)
+    return [(start, min(size, start + shard_bytes)) for start in range(0, size, shard_bytes)] or [(0, 0)]
+
+
+def _read_range(f, start: int, end: int, chunk: int):
+    f.seek(start)
+    pos = start
+    while pos < end:
+        data = f.read(min(chunk, end - pos))
+        if not data:
+            return
+        yield pos, data
+        pos += len(data)
+
+
+def summarize_shard(path: str, start: int, end: int, chunk: int) -> dict:
+    """
+    First pass over a shard: ones count and the bit run at its end
+    (or the bit value if the whole shard is one run). Enough to derive
+    the exact RCT, SPRT and Z state at the start of every later shard.
+    """
+    ones = 0
+    uniform = None
+    tail_bit, tail_run = None, 0
+    with open(path, "rb") as f:
+        for pos, data in _read_range(f, start, end, chunk):
+            ones += int.from_bytes(data, "little").bit_count()
+            last = data[-1]
+            lead = data[0]
+            same = lead in (0, 255) and data.count(lead) == len(data)
+            if pos == start:
+                uniform = lead if same else -1
+            elif not (same and lead == uniform):
+                uniform = -1
+            # Trailing run of this block, extended backwards over 0x00/0xFF.
+            bit = last >> 7
+            fill = 255 if bit else 0
+            run = 0
+            for b in reversed(data):
+                if b == fill:
+                    run += 8
+                    continue
+                # Top bits of b equal to `bit` (none if its top bit differs).
+                run += 8 - (b ^ fill).bit_length()
+                break
+            else:
+                if tail_bit == bit:
+                    run += tail_run
+            tail_bit, tail_run = bit, run
+    bits = 8 * (end - start)
+    return {"bits": bits, "ones": ones, "uniform": uniform if uniform in (0, 255) else None,
+            "tail_bit": tail_bit, "tail_run": tail_run}
+
+
+def boundary_states(summaries: list[dict]) -> list[dict]:
+    """
+    Fold the shard summaries in order into the state of the stream just
+    before each shard: bits, ones and the current RCT run.
+    """
+    states = []
+    bits = ones = 0
+    last_bit, run = None, 0
+    for s in summaries:
+        states.append({"bits": bits, "ones": ones, "last_bit": last_bit, "run_len": run})
+        bits += s["bits"]
+        ones += s["ones"]
+        if s["bits"] == 0:
+            continue
+        if s["uniform"] is not None:
+            b = s["uniform"] & 1
+            run = run + s["bits"] if b == last_bit else s["bits"]
+            last_bit = b
+        else:
+            last_bit, run = s["tail_bit"], s["tail_run"]
+    return states
+
+
+def analyze_shard(path: str, start: int, end: int, chunk: int, params: dict, state: dict) -> dict:
+    """
+    Run the battery over one shard with the exact state at its start:
+    RCT run and SPRT/Z statistics from the first pass, APT window warmed
+    with the bytes just before `start` (events raised there belong to the
+    previous shard and are discarded).
+    """
+    rct, apt, sprt, tests = build_tests(params["alpha"], params["beta"], params["delta"], params["apt_window"],
+                                        params["ztest"], params["z_alpha"], params["z_min_bits"])
+    bits_before, ones_before = state["bits"], state["ones"]
+    rct.last_bit, rct.run_len = state["last_bit"], state["run_len"]
+    zeros_before = bits_before - ones_before
+    sprt.s_up = (ones_before * math.log(sprt.p1u / sprt.p0)
+                 + zeros_before * math.log((1 - sprt.p1u) / (1 - sprt.p0)))
+    sprt.s_dn = (ones_before * math.log(sprt.p1d / sprt.p0)
+                 + zeros_before * math.log((1 - sprt.p1d) / (1 - sprt.p0)))
+    if len(tests) > 3:
+        tests[3].n, tests[3].ones = bits_before, ones_before
+
+    events = []
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        overlap = min(start, (apt.window + 7) // 8)
+        if overlap:
+            f.seek(start - overlap)
+            warm = f.read(overlap)
+            if apt.window % 8:
+                skip = 8 * len(warm) - apt.window
+                for i in range(max(0, skip), 8 * len(warm)):
+                    apt.update((warm[i >> 3] >> (i & 7)) & 1)
+            else:
+                apt.update_bytes(warm)
+
+        bits, ones = bits_before, ones_before
+        for pos, data in _read_range(f, start, end, chunk):
+            found = []
+            for test in tests:
+                evt = test.update_bytes(data)
+                if evt is not None:
+                    found.append(evt)
+            for evt in sorted(found, key=lambda e: e["offset"]):
+                offset = evt.pop("offset")
+                prefix = int.from_bytes(data[:offset // 8 + 1], "little") & ((1 << (offset + 1)) - 1)
+                events.append({
+                    **evt,
+                    "file": path,
+                    "bit_offset": 8 * pos + offset,
+                    "ones_total": ones + prefix.bit_count(),
+                })
+            bits += 8 * len(data)
+            ones += int.from_bytes(data, "little").bit_count()
+    return {
+        "file": path,
+        "start": start,
+        "end": end,
+        "bits": bits - bits_before,
+        "ones": ones - ones_before,
+        "events": events,
+        "sec": time.perf_counter() - t0,
+    }
+
+
+def _summarize(task):
+    return summarize_shard(*task)
+
+
+def _analyze(task):
+    return analyze_shard(*task)
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly analyze",
+        description="Run the RCT/APT/SPRT(/Z) battery over capture files using a process pool.",
+    )
+    ap.add_argument("files", nargs="+", help="Capture files (raw bytes, bits LSB-first).")
+    ap.add_argument("--processes", type=int, default=max(1, os.cpu_count() or 1),
+                    help="Pool size (default: CPU count).")
+    ap.add_argument("--shard-mb", type=float, default=64.0,
+                    help="Shard size in MiB, rounded to the chunk grid (default 64).")
+    ap.add_argument("--chunk", type=int, default=1 << 16,
+                    help="Block size in bytes; one event per test per block, as with --engine block (default 65536).")
+    ap.add_argument("--alpha", type=float, default=1e-6,
+                    help="Alpha level for RCT/APT and SPRT (false positive rate).")
+    ap.add_argument("--beta", type=float, default=1e-2,
+                    help="Beta level for SPRT (false negative rate).")
+    ap.add_argument("--delta", type=float, default=1e-4,
+                    help="Minimum bias to detect with SPRT (p=0.5±δ).")
+    ap.add_argument("--apt-window", type=int, default=1024,
+                    help="Window size for APT.")
+    ap.add_argument("--ztest", action="store_true", default=False,
+                    help="Enable bilateral online monobit Z-test.")
+    ap.add_argument("--z-alpha", type=float, default=None,
+                    help="Bilateral α for monobit Z (defaults to --alpha).")
+    ap.add_argument("--z-min-bits", type=int, default=10000,
+                    help="Minimum bits before evaluating Z (default 10000).")
+    ap.add_argument("--max-anomalies", type=int, default=1000,
+                    help="Anomalies listed in the final report (all are counted; default 1000).")
+    ap.add_argument("--quiet-json", action="store_true", default=False,
+                    help="Only print the final report.")
+    args = ap.parse_args(argv)
+    if args.processes <= 0:
+        ap.error("--processes must be > 0")
+    if args.chunk <= 0 or args.shard_mb <= 0:
+        ap.error("--chunk and --shard-mb must be > 0")
+    for path in args.files:
+        if not os.path.isfile(path):
+            print(f"Error: not a regular file {path}", file=sys.stderr)
+            sys.exit(1)
+
+    params = {
+        "alpha": args.alpha, "beta": args.beta, "delta": args.delta, "apt_window": args.apt_window,
+        "ztest": args.ztest, "z_alpha": args.z_alpha, "z_min_bits": args.z_min_bits,
+    }
+    shard_bytes = int(args.shard_mb * (1 << 20))
+    plan = [(path, plan_shards(os.path.getsize(path), shard_bytes, args.chunk)) for path in args.files]
+
+    t_start = time.perf_counter()
+    per_file = {path: {"file": path, "bytes": os.path.getsize(path), "bits": 0, "ones": 0, "anomalies": {}}
+                for path in args.files}
+    by_test = {}
+    listed = []
+    total_anomalies = 0
+    n_shards = sum(len(shards) for _, shards in plan)
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        first = [(path, s, e, args.chunk) for path, shards in plan for s, e in shards]
+        summaries = list(pool.map(_summarize, first))
+        tasks = []
+        i = 0
+        for path, shards in plan:
+            states = boundary_states(summaries[i:i + len(shards)])
+            i += len(shards)
+            tasks += [(path, s, e, args.chunk, params, st) for (s, e), st in zip(shards, states)]
+
+        for res in pool.map(_analyze, tasks):
+            f = per_file[res["file"]]
+            f["bits"] += res["bits"]
+            f["ones"] += res["ones"]
+            for evt in res["events"]:
+                total_anomalies += 1
+                by_test[evt["test"]] = by_test.get(evt["test"], 0) + 1
+                f["anomalies"][evt["test"]] = f["anomalies"].get(evt["test"], 0) + 1
+                if len(listed) < args.max_anomalies:
+                    listed.append(evt)
+                if not args.quiet_json:
+                    print(json.dumps({"ts": iso_now(), "event": "ANOMALY", **evt}, ensure_ascii=False))
+            if not args.quiet_json:
+                print(json.dumps({
+                    "ts": iso_now(),
+                    "event": "SHARD",
+                    "file": res["file"],
+                    "start_bit": 8 * res["start"],
+                    "end_bit": 8 * res["end"],
+                    "anomalies": len(res["events"]),
+                    "bps": res["bits"] / res["sec"] if res["sec"] > 0 else None,
+                }, ensure_ascii=False), flush=True)
+
+    elapsed = time.perf_counter() - t_start
+    bits_total = sum(f["bits"] for f in per_file.values())
+    for f in per_file.values():
+        f["ones_ratio"] = (f["ones"] / f["bits"]) if f["bits"] else None
+    print(json.dumps({
+        "ts": iso_now(),
+        "report": {
+            "files": list(per_file.values()),
+            "shards": n_shards,
+            "processes": args.processes,
+            "chunk_bytes": args.chunk,
+            "params": params,
+            "elapsed_sec": round(elapsed, 3),
+            "total_bits": bits_total,
+            "bps": bits_total / elapsed if elapsed > 0 else None,
+            "bps_human": human_bps(bits_total / elapsed) if elapsed > 0 else None,
+            "anomalies": total_anomalies,
+            "anomalies_by_test": by_test,
+            "anomaly_list": listed,
+        },
+    }, ensure_ascii=False))
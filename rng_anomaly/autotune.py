@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+
+from .utils import iso_now, human_bps
+from .worker import ENGINES, EXEC_MODES, launch_workers, stop_workers, gil_enabled
+
+
+# Keys of a profile that `cli.run` applies as argument defaults.
+PROFILE_KEYS = ("chunk", "processes", "engine", "exec")
+
+# Report interval used in trials; readiness is measured by first STATS.
+TRIAL_REPORT_SEC = 0.1
+
+
+def load_profile(path: str) -> dict:
+    """
+    Read a tuning profile and return the argument defaults it defines.
+    Unknown keys (host info, measured bps) are ignored.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    best = data.get("best", data)
+    out = {}
+    for key in PROFILE_KEYS:
+        if key in best:
+            out[key] = best[key]
+    if "engine" in out and out["engine"] not in ENGINES:
+        raise ValueError(f"profile engine must be one of {ENGINES}")
+    if "exec" in out and out["exec"] not in EXEC_MODES:
+        raise ValueError(f"profile exec must be one of {EXEC_MODES}")
+    for key in ("chunk", "processes"):
+        if key in out:
+            out[key] = int(out[key])
+            if out[key] <= 0:
+                raise ValueError(f"profile {key} must be > 0")
+    return out
+
+
+def save_profile(path: str, best: dict, trials: list[dict], meta: dict):
+    """
+    Write the profile atomically (temp file + rename).
+    """
+    doc = {"ts": iso_now(), "host": meta, "best": best, "trials": trials}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def rss_bytes(pid: int) -> int | None:
+    """
+    Resident set size of a process from /proc (None where unavailable).
+    """
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def run_trial(args, chunk: int, processes: int, engine: str, exec_mode: str = "process") -> dict:
+    """
+    Run `processes` workers for `args.trial_sec` seconds and return the
+    aggregate bps reported in their DONE messages, plus the time until
+    every worker reported once and the RSS (this process + workers) at
+    that moment.
+    """
+    def make_kwargs(i, queue_out, stop_event):
+        return dict(
+            proc_id=i,
+            source_path=args.source,
+            alpha=args.alpha,
+            beta=args.beta,
+            delta=args.delta,
+            apt_window=args.apt_window,
+            queue_out=queue_out,
+            max_seconds=args.trial_sec,
+            chunk_size=chunk,
+            report_interval=TRIAL_REPORT_SEC,
+            stop_on_anomaly=False,
+            use_synthetic=args.synthetic,
+            synthetic_p=args.p,
+            synthetic_seed=args.seed,
+            ztest_enabled=args.ztest,
+            engine=engine,
+            stop_event=stop_event,
+            num_procs=processes,
+        )
+
+    t_start = time.perf_counter()
+    q, handles, stop_event = launch_workers(exec_mode, processes, make_kwargs)
+
+    active = len(handles)
+    reported = set()
+    ready_sec = None
+    rss = None
+    bps_total = 0.0
+    bits_total = 0
+    errors = []
+    deadline = t_start + args.trial_sec + 30.0
+    try:
+        while active > 0 and time.perf_counter() < deadline:
+            try:
+                tag, payload = q.get(timeout=0.5)
+            except Exception:
+                if not any(h.is_alive() for h in handles):
+                    break
+                continue
+            if ready_sec is None and "proc" in payload:
+                reported.add(payload["proc"])
+                if len(reported) == processes:
+                    ready_sec = time.perf_counter() - t_start
+                    pids = [os.getpid()] + [h.pid for h in handles if getattr(h, "pid", None)]
+                    sizes = [rss_bytes(pid) for pid in pids]
+                    rss = sum(sizes) if all(x is not None for x in sizes) else None
+            if tag == "DONE":
+                bps_total += payload.get("bps", 0.0)
+                bits_total += payload.get("bits_processed", 0)
+                active -= 1
+            elif tag == "ERROR":
+                errors.append(payload.get("error"))
+                active -= 1
+    finally:
+        stop_workers(handles, stop_event)
+
+    return {
+        "chunk": chunk,
+        "processes": processes,
+        "engine": engine,
+        "exec": exec_mode,
+        "bps": bps_total,
+        "bits": bits_total,
+        "ready_sec": round(ready_sec, 4) if ready_sec is not None else None,
+        "rss_bytes": rss,
+        "wall_sec": round(time.perf_counter() - t_start, 3),
+        "errors": errors,
+    }
+
+
+def format_table(trials: list[dict]) -> str:
+    header = (f"{'engine':<7} {'exec':<8} {'procs':>5} {'chunk':>8} {'bps':>16}  {'human':>14}"
+              f"  {'ready_s':>8} {'rss_MiB':>8}")
+    lines = [header, "-" * len(header)]
+    for t in sorted(trials, key=lambda t: t["bps"], reverse=True):
+        ready = f"{t['ready_sec']:.3f}" if t["ready_sec"] is not None else "n/a"
+        rss = f"{t['rss_bytes'] / (1 << 20):.1f}" if t["rss_bytes"] is not None else "n/a"
+        lines.append(
+            f"{t['engine']:<7} {t['exec']:<8} {t['processes']:>5} {t['chunk']:>8} {t['bps']:>16,.0f}"
+            f"  {human_bps(t['bps']):>14}  {ready:>8} {rss:>8}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def _str_list(text: str) -> list[str]:
+    return [x.strip() for x in text.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None):
+    cpus = max(1, os.cpu_count() or 1)
+    default_procs = sorted({1, max(1, cpus // 2), cpus})
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly autotune",
+        description="Sweep chunk size, process count, engine and exec mode; write the fastest as a profile.",
+    )
+    ap.add_argument("--source", default="/dev/urandom",
+                    help="Device path (default: /dev/urandom). Ignored if --synthetic.")
+    ap.add_argument("--synthetic", action="store_true", default=False,
+                    help="Tune against the synthetic Bernoulli source.")
+    ap.add_argument("--p", type=float, default=0.5,
+                    help="Probability P(1)=p for synthetic source (default 0.5).")
+    ap.add_argument("--seed", type=int, default=None,
+                    help="Base seed for synthetic source (optional).")
+    ap.add_argument("--alpha", type=float, default=1e-6,
+                    help="Alpha level for RCT/APT and SPRT.")
+    ap.add_argument("--beta", type=float, default=1e-2,
+                    help="Beta level for SPRT.")
+    ap.add_argument("--delta", type=float, default=1e-4,
+                    help="Minimum bias to detect with SPRT.")
+    ap.add_argument("--apt-window", type=int, default=1024,
+                    help="Window size for APT.")
+    ap.add_argument("--ztest", action="store_true", default=False,
+                    help="Include the monobit Z-test in the trials.")
+    ap.add_argument("--chunks", type=_int_list, default=[1 << 12, 1 << 14, 1 << 16, 1 << 18],
+                    help="Comma-separated chunk sizes in bytes.")
+    ap.add_argument("--processes", type=_int_list, default=default_procs,
+                    help="Comma-separated process counts.")
+    ap.add_argument("--engines", type=_str_list, default=list(ENGINES),
+                    help=f"Comma-separated engines ({', '.join(ENGINES)}).")
+    ap.add_argument("--exec-modes", type=_str_list, default=["process"],
+                    help=f"Comma-separated execution modes ({', '.join(EXEC_MODES)}; default process).")
+    ap.add_argument("--trial-sec", type=float, default=3.0,
+                    help="Duration of each trial in seconds (default 3).")
+    ap.add_argument("--profile-out", default="rng-anomaly-profile.json",
+                    help="Where to write the best configuration (default ./rng-anomaly-profile.json).")
+    ap.add_argument("--json", action="store_true", default=False,
+                    help="Print one JSON line per trial instead of the table.")
+    args = ap.parse_args(argv)
+
+    for e in args.engines:
+        if e not in ENGINES:
+            ap.error(f"unknown engine {e!r} (choose from {', '.join(ENGINES)})")
+    for m in args.exec_modes:
+        if m not in EXEC_MODES:
+            ap.error(f"unknown exec mode {m!r} (choose from {', '.join(EXEC_MODES)})")
+    if not args.chunks or min(args.chunks) <= 0:
+        ap.error("--chunks must be positive")
+    if not args.processes or min(args.processes) <= 0:
+        ap.error("--processes must be positive")
+    if args.trial_sec <= 0:
+        ap.error("--trial-sec must be > 0")
+    if not args.synthetic and not os.path.exists(args.source):
+        print(f"Error: path does not exist {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    trials = []
+    sweep = itertools.product(args.exec_modes, args.engines, args.processes, args.chunks)
+    for exec_mode, engine, procs, chunk in sweep:
+        res = run_trial(args, chunk, procs, engine, exec_mode)
+        trials.append(res)
+        if args.json:
+            print(json.dumps({"ts": iso_now(), "autotune": res}, ensure_ascii=False), flush=True)
+        else:
+            print(f"  {exec_mode:<7} {engine:<6} procs={procs:<4} chunk={chunk:<8} {human_bps(res['bps'])}",
+                  file=sys.stderr, flush=True)
+
+    ok = [t for t in trials if not t["errors"] and t["bps"] > 0]
+    if not ok:
+        print("Error: no trial completed successfully", file=sys.stderr)
+        sys.exit(1)
+    best_trial = max(ok, key=lambda t: t["bps"])
+    best = {k: best_trial[k] for k in PROFILE_KEYS}
+    best["bps"] = best_trial["bps"]
+    meta = {
+        "hostname": platform.node(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "gil_enabled": gil_enabled(),
+        "source": "synthetic" if args.synthetic else args.source,
+        "trial_sec": args.trial_sec,
+    }
+    save_profile(args.profile_out, best, trials, meta)
+
+    if args.json:
+        print(json.dumps({"ts": iso_now(), "best": best, "profile": args.profile_out}, ensure_ascii=False))
+    else:
+        print(format_table(trials))
+        print(f"\nBest: exec={best['exec']} engine={best['engine']} processes={best['processes']} chunk={best['chunk']} "
+              f"({human_bps(best['bps'])}) -> {args.profile_out}")
@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import tempfile
+from types import SimpleNamespace
+
+from .utils import iso_now, human_bps
+from .sources import synthetic_block, chunk_stream_from_device, bit_stream_from_device
+from .worker import worker, gil_enabled
+from .tests_online import RCT, APT, SPRTDetector, ZMonobit
+from .autotune import run_trial
+
+
+# Fixed test data: deterministic, no network or device needed.
+BENCH_SEED = 20240601
+
+
+def bench_data(nbytes: int, p: float = 0.5) -> bytes:
+    blocks = [synthetic_block(BENCH_SEED, k, p) for k in range((nbytes + 4095) // 4096)]
+    return b"".join(blocks)[:nbytes]
+
+
+def best_rate(fn, units: int, repeat: int) -> float:
+    """Best-of-`repeat` throughput of `fn()` in `units` per second."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return units / best if best > 0 else float("inf")
+
+
+def _fresh_tests():
+    return {
+        "rct": lambda: RCT(alpha=1e-6),
+        "apt": lambda: APT(window=1024, alpha=1e-6),
+        "sprt": lambda: SPRTDetector(delta=1e-4, alpha=1e-6, beta=1e-2),
+        "zmono": lambda: ZMonobit(alpha=1e-6, min_bits=10000),
+    }
+
+
+def micro_benchmarks(repeat: int, block_bytes: int, bit_bytes: int, tmp_path: str) -> dict:
+    """
+    Per-component throughput in bits/s: each test's `update_bytes`
+    (block engine) and `update` (bit engine), the sources, and one
+    in-thread `worker.worker` run per engine.
+    """
+    results = {}
+    data = bench_data(block_bytes)
+    bits = [(b >> k) & 1 for b in bench_data(bit_bytes) for k in range(8)]
+    for name, make in _fresh_tests().items():
+        def run_bytes(make=make):
+            test = make()
+            for i in range(0, len(data), 1 << 16):
+                test.update_bytes(data[i:i + (1 << 16)])
+
+        def run_bits(make=make):
+            update = make().update
+            for b in bits:
+                update(b)
+
+        results[f"micro.{name}.update_bytes"] = best_rate(run_bytes, 8 * len(data), repeat)
+        results[f"micro.{name}.update"] = best_rate(run_bits, len(bits), repeat)
+
+    src_bytes = max(4096, block_bytes // 4)
+    results["micro.source.synthetic_p50"] = best_rate(lambda: bench_data(src_bytes), 8 * src_bytes, repeat)
+    results["micro.source.synthetic_p30"] = best_rate(lambda: bench_data(src_bytes // 8, 0.3), src_bytes, repeat)
+    results["micro.source.file_chunks"] = best_rate(
+        lambda: sum(len(c) for c in chunk_stream_from_device(tmp_path)), 8 * os.path.getsize(tmp_path), repeat)
+
+    def read_bits():
+        stream = bit_stream_from_device(tmp_path)
+        for _ in range(len(bits)):
+            next(stream)
+    results["micro.source.file_bits"] = best_rate(read_bits, len(bits), repeat)
+
+    for engine, nbits in (("block", 8 * block_bytes), ("bit", len(bits))):
+        def run_worker(engine=engine, nbits=nbits):
+            q = queue.Queue()
+            worker(0, tmp_path, 1e-6, 1e-2, 1e-4, 1024, q, max_bits=nbits, engine=engine,
+                   report_interval=3600.0, stop_on_anomaly=False, use_synthetic=True, synthetic_seed=BENCH_SEED)
+        results[f"micro.worker.{engine}"] = best_rate(run_worker, nbits, repeat)
+    return results
+
+
+def e2e_benchmarks(processes: list[int], trial_sec: float, chunk: int, tmp_path: str) -> dict:
+    """Aggregate bps of full worker runs (block engine, process exec) per source and process count."""
+    results = {}
+    for source in ("synthetic", "file"):
+        for n in processes:
+            args = SimpleNamespace(
+                source=tmp_path, synthetic=(source == "synthetic"), p=0.5, seed=BENCH_SEED,
+                alpha=1e-6, beta=1e-2, delta=1e-4, apt_window=1024, ztest=False, trial_sec=trial_sec,
+            )
+            res = run_trial(args, chunk, n, "block")
+            if res["errors"]:
+                raise RuntimeError(f"{source} x{n}: {res['errors'][0]}")
+            results[f"e2e.{source}.p{n}"] = res["bps"]
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    """
+    Rows comparing `results` with a baseline document. A benchmark
+    regresses when it is slower than baseline by more than its threshold
+    (`baseline["thresholds"][name]` if present, else `threshold`).
+    """
+    base = baseline.get("results", {})
+    limits = baseline.get("thresholds", {})
+    rows = []
+    for name in sorted(set(results) | set(base)):
+        now, ref = results.get(name), base.get(name)
+        row = {"name": name, "baseline": ref, "value": now, "threshold": limits.get(name, threshold)}
+        if now is None:
+            row["status"] = "missing"
+        elif ref is None or ref <= 0:
+            row["status"] = "new"
+        else:
+            row["change"] = now / ref - 1.0
+            if row["change"] < -row["threshold"]:
+                row["status"] = "regressed"
+            elif row["change"] > row["threshold"]:
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def format_table(results: dict, rows: list[dict] | None) -> str:
+    by_name = {r["name"]: r for r in rows or []}
+    header = f"{'benchmark':<32} {'bits/s':>16} {'human':>14} {'baseline':>16} {'change':>8}  status"
+    lines = [header, "-" * len(header)]
+    for name in sorted(set(results) | set(by_name)):
+        r = by_name.get(name, {})
+        value = results.get(name)
+        ref = r.get("baseline")
+        change = f"{100 * r['change']:+.1f}%" if "change" in r else ""
+        lines.append(
+            f"{name:<32} {value if value is not None else float('nan'):>16,.0f} "
+            f"{human_bps(value) if value is not None else 'n/a':>14} "
+            f"{ref if ref is not None else float('nan'):>16,.0f} {change:>8}  {r.get('status', '')}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None):
+    cpus = max(1, os.cpu_count() or 1)
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly bench",
+        description="Microbenchmarks and end-to-end bps runs; compare with a stored baseline.",
+    )
+    ap.add_argument("--suite", choices=("all", "micro", "e2e"), default="all",
+                    help="Which benchmarks to run (default all).")
+    ap.add_argument("--repeat", type=int, default=5,
+                    help="Micro runs per benchmark; the best is kept (default 5).")
+    ap.add_argument("--block-kb", type=int, default=1024,
+                    help="Data per update_bytes/worker block run in KiB (default 1024).")
+    ap.add_argument("--bit-kb", type=int, default=16,
+                    help="Data per per-bit update run in KiB (default 16).")
+    ap.add_argument("--file-mb", type=float, default=16.0,
+                    help="Size of the temporary capture used by the file source (default 16).")
+    ap.add_argument("--processes", type=_int_list, default=sorted({1, cpus}),
+                    help="Comma-separated process counts for e2e runs (default 1 and the CPU count).")
+    ap.add_argument("--trial-sec", type=float, default=3.0,
+                    help="Duration of each e2e run in seconds (default 3).")
+    ap.add_argument("--chunk", type=int, default=1 << 16,
+                    help="Chunk size in bytes for e2e runs (default 65536).")
+    ap.add_argument("--out", default=None,
+                    help="Write the results document (JSON) to this path.")
+    ap.add_argument("--baseline", default=None,
+                    help="Baseline results document to compare with; exit 1 on regressions.")
+    ap.add_argument("--threshold", type=float, default=0.15,
+                    help="Allowed slowdown vs baseline as a fraction (default 0.15); "
+                         "the baseline's \"thresholds\" map overrides it per benchmark.")
+    ap.add_argument("--json", action="store_true", default=False,
+                    help="Print the results document instead of the table.")
+    args = ap.parse_args(argv)
+    if args.repeat <= 0 or args.block_kb <= 0 or args.bit_kb <= 0 or args.file_mb <= 0:
+        ap.error("--repeat, --block-kb, --bit-kb and --file-mb must be > 0")
+    if not args.processes or min(args.processes) <= 0:
+        ap.error("--processes must be positive")
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot load baseline {args.baseline}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    fd, tmp_path = tempfile.mkstemp(prefix="rng-anomaly-bench-", suffix=".bin")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(bench_data(int(args.file_mb * (1 << 20))))
+        results = {}
+        t0 = time.perf_counter()
+        if args.suite in ("all", "micro"):
+            results.update(micro_benchmarks(args.repeat, args.block_kb << 10, args.bit_kb << 10, tmp_path))
+        if args.suite in ("all", "e2e"):
+            try:
+                results.update(e2e_benchmarks(args.processes, args.trial_sec, args.chunk, tmp_path))
+            except RuntimeError as e:
+                print(f"Error: e2e run failed: {e}", file=sys.stderr)
+                sys.exit(1)
+    finally:
+        os.unlink(tmp_path)
+
+    doc = {
+        "ts": iso_now(),
+        "host": {
+            "hostname": platform.node(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "gil_enabled": gil_enabled(),
+        },
+        "params": {k: getattr(args, k) for k in ("suite", "repeat", "block_kb", "bit_kb", "file_mb",
+                                                 "processes", "trial_sec", "chunk")},
+        "elapsed_sec": round(time.perf_counter() - t0, 3),
+        "unit": "bits/s",
+        "results": results,
+    }
+    rows = None
+    if baseline is not None:
+        if args.suite != "all":
+            baseline = {**baseline, "results": {k: v for k, v in baseline.get("results", {}).items()
+                                                if k.startswith(args.suite + ".")}}
+        rows = compare(results, baseline, args.threshold)
+    if rows is not None:
+        doc["comparison"] = {"baseline": args.baseline, "rows": rows}
+    if args.out:
+        tmp = f"{args.out}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp, args.out)
+
+    if args.json:
+        print(json.dumps(doc, ensure_ascii=False))
+    else:
+        print(format_table(results, rows))
+    regressed = [r["name"] for r in rows or [] if r["status"] == "regressed"]
+    if regressed:
+        print(f"Error: {len(regressed)} benchmark(s) regressed beyond threshold: {', '.join(regressed)}",
+              file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,55 @@
+import time
+
+
+class CpuBudget:
+    """
+    CPU-time token bucket for one expensive test in a worker.
+
+    Credit accrues at `fraction` CPU-seconds per wall second, capped at
+    `burst`, and each run is charged the thread CPU time it took. The test
+    runs on a chunk while the credit is positive and skips it otherwise,
+    so the analyzed share of the stream adapts to the test's cost and to
+    the source rate. Runs are spread evenly rather than batched because
+    the credit never exceeds one burst.
+    """
+
+    def __init__(self, fraction: float, burst: float = 0.05):
+        if not (0 < fraction <= 1):
+            raise ValueError("fraction must be in (0,1]")
+        if burst <= 0:
+            raise ValueError("burst must be > 0")
+        self.fraction = fraction
+        self.burst = burst
+        self.credit = burst
+        self.last = time.perf_counter()
+        self.bits_run = 0
+        self.bits_seen = 0
+        self.cpu = 0.0
+
+    def due(self) -> bool:
+        now = time.perf_counter()
+        self.credit = min(self.burst, self.credit + self.fraction * (now - self.last))
+        self.last = now
+        return self.credit > 0
+
+    def run(self, fn, data, nbits: int):
+        """Call fn(data), charging its CPU time; returns its result."""
+        c0 = time.thread_time()
+        res = fn(data)
+        cost = time.thread_time() - c0
+        self.credit -= cost
+        self.cpu += cost
+        self.bits_run += nbits
+        self.bits_seen += nbits
+        return res
+
+    def skip(self, nbits: int):
+        self.bits_seen += nbits
+
+    @property
+    def coverage(self) -> float | None:
+        return (self.bits_run / self.bits_seen) if self.bits_seen else None
+
+    def stats(self) -> list:
+        """[bits analyzed, bits seen, CPU seconds] for STATS payloads."""
+        return [self.bits_run, self.bits_seen, self.cpu]
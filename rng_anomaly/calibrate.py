@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+from .utils import iso_now, human_bps
+from .worker import build_tests
+from .sources import chunk_stream_synthetic
+
+
+TESTS = ("RCT", "APT", "SPRT", "ZMONO")
+
+
+def bernoulli_chunks(p: float, seed: int, chunk_bytes: int):
+    """
+    Packed LSB-first Bernoulli(p) chunks. Uses numpy's PCG64 when numpy is
+    available (p=0.5 from raw bytes, otherwise one 32-bit word per bit
+    compared against p*2^32); falls back to the synthetic source.
+    """
+    if importlib.util.find_spec("numpy") is None:
+        yield from chunk_stream_synthetic(p=p, seed=seed, chunk_size=chunk_bytes)
+        return
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    if p == 0.5:
+        while True:
+            yield rng.bytes(chunk_bytes)
+    cut = np.uint64(min(1 << 32, int(round(p * (1 << 32)))))
+    while True:
+        words = rng.integers(0, 1 << 32, size=8 * chunk_bytes, dtype=np.uint64)
+        yield np.packbits(words < cut, bitorder="little").tobytes()
+
+
+def detection_trial(task: dict) -> dict:
+    """
+    Feed one Bernoulli stream through a fresh battery until every test
+    has fired or `max_bits` is reached. Returns the bits processed and,
+    per test, the bit count at its first event (None if it never fired).
+    """
+    rct, apt, sprt, tests = build_tests(task["alpha"], task["beta"], task["delta"], task["apt_window"],
+                                        task["ztest"], None, task["z_min_bits"])
+    live = list(zip(TESTS, tests))
+    detect = {name: None for name, _ in live}
+    bits = 0
+    for data in bernoulli_chunks(task["p"], task["seed"], task["chunk"]):
+        data = data[:max(0, (task["max_bits"] - bits) // 8)]
+        if not data:
+            break
+        for name, test in live:
+            evt = test.update_bytes(data)
+            if evt is not None:
+                detect[name] = bits + evt["offset"] + 1
+        live = [(name, test) for name, test in live if detect[name] is None]
+        bits += 8 * len(data)
+        if not live:
+            break
+    return {"bits": bits, "detect": detect}
+
+
+def _quantile(sorted_vals: list, q: float):
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+def summarize(config: dict, trials: list[dict], source_bps: float) -> dict:
+    """
+    Per test: detected fraction, bits-to-detection quantiles, and the
+    event rate per bit as detections / exposed bits (exposure stops at
+    the first event), with its per-hour equivalent at `source_bps`.
+    Under p=0.5 that rate is the false-alarm rate.
+    """
+    out = {"config": config, "trials": len(trials), "tests": {}}
+    for name in trials[0]["detect"] if trials else ():
+        hits = sorted(t["detect"][name] for t in trials if t["detect"][name] is not None)
+        exposure = sum(t["detect"][name] if t["detect"][name] is not None else t["bits"] for t in trials)
+        rate = len(hits) / exposure if exposure else None
+        out["tests"][name] = {
+            "detected": len(hits),
+            "detected_frac": len(hits) / len(trials),
+            "bits_p10": _quantile(hits, 0.10),
+            "bits_p50": _quantile(hits, 0.50),
+            "bits_p90": _quantile(hits, 0.90),
+            "bits_max": hits[-1] if hits else None,
+            "sec_p50": _quantile(hits, 0.50) / source_bps if hits else None,
+            "sec_p90": _quantile(hits, 0.90) / source_bps if hits else None,
+            "rate_per_bit": rate,
+            "rate_per_hour": rate * source_bps * 3600.0 if rate is not None else None,
+            "exposure_bits": exposure,
+        }
+    return out
+
+
+def config_label(cfg: dict) -> str:
+    return f"p={cfg['p']} α={cfg['alpha']:g} δ={cfg['delta']:g} W={cfg['apt_window']}"
+
+
+def format_table(rows: list[dict]) -> str:
+    header = (f"{'p':>8} {'alpha':>8} {'delta':>8} {'W':>6} {'test':<6} {'det':>9} {'bits_p50':>14} "
+              f"{'bits_p90':>14} {'sec_p90':>10} {'rate/bit':>10} {'per_hour':>10}")
+    lines = [header, "-" * len(header)]
+
+    def num(v, fmt):
+        return format(v, fmt) if v is not None else "-"
+
+    for row in rows:
+        c = row["config"]
+        for name, t in row["tests"].items():
+            lines.append(
+                f"{c['p']:>8} {c['alpha']:>8.0e} {c['delta']:>8.0e} {c['apt_window']:>6} {name:<6} "
+                f"{t['detected']:>4}/{row['trials']:<4} {num(t['bits_p50'], ',d'):>14} "
+                f"{num(t['bits_p90'], ',d'):>14} {num(t['sec_p90'], '.3g'):>10} "
+                f"{num(t['rate_per_bit'], '.2e'):>10} {num(t['rate_per_hour'], '.3g'):>10}"
+            )
+    return "\n".join(lines)
+
+
+def save_plot(path: str, rows: list[dict], trials_by_config: list[list[dict]]):
+    """Empirical CDF of bits-to-detection, one panel per test, one line per configuration."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    names = list(rows[0]["tests"]) if rows else []
+    fig, axes = plt.subplots(len(names), 1, figsize=(8, 3 * max(1, len(names))), squeeze=False)
+    for ax, name in zip(axes[:, 0], names):
+        for row, trials in zip(rows, trials_by_config):
+            hits = sorted(t["detect"][name] for t in trials if t["detect"][name] is not None)
+            if hits:
+                ys = [(i + 1) / len(trials) for i in range(len(hits))]
+                ax.step(hits, ys, where="post", label=config_label(row["config"]))
+        ax.set_xscale("log")
+        ax.set_ylim(0, 1.02)
+        ax.set_title(f"{name}: fraction detected by N bits")
+        ax.set_xlabel("Bits to detection")
+        ax.grid(True, alpha=0.3)
+        if ax.get_legend_handles_labels()[0]:
+            ax.legend(fontsize="x-small")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def _float_list(text: str) -> list[float]:
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly calibrate",
+        description="Sweep synthetic bias and test parameters; measure bits-to-detection and false-alarm rates.",
+    )
+    ap.add_argument("--p", type=_float_list, default=[0.5, 0.501, 0.51],
+                    help="Comma-separated P(1) values; 0.5 measures false alarms (default 0.5,0.501,0.51).")
+    ap.add_argument("--alpha", type=_float_list, default=[1e-6],
+                    help="Comma-separated alpha values for RCT/APT/SPRT(/Z).")
+    ap.add_argument("--delta", type=_float_list, default=[1e-4],
+                    help="Comma-separated SPRT delta values.")
+    ap.add_argument("--apt-window", type=_int_list, default=[1024],
+                    help="Comma-separated APT window sizes.")
+    ap.add_argument("--beta", type=float, default=1e-2,
+                    help="Beta level for SPRT.")
+    ap.add_argument("--ztest", action="store_true", default=False,
+                    help="Include the monobit Z-test.")
+    ap.add_argument("--z-min-bits", type=int, default=10000,
+                    help="Minimum bits before evaluating Z (default 10000).")
+    ap.add_argument("--trials", type=int, default=20,
+                    help="Independent streams per configuration (default 20).")
+    ap.add_argument("--max-bits", type=float, default=float(1 << 26),
+                    help="Bits per stream before giving up (default 2^26).")
+    ap.add_argument("--chunk", type=int, default=1 << 16,
+                    help="Block size in bytes (default 65536).")
+    ap.add_argument("--seed", type=int, default=1,
+                    help="Base seed; trial i of configuration j uses a seed derived from both.")
+    ap.add_argument("--processes", type=int, default=max(1, os.cpu_count() or 1),
+                    help="Pool size (default: CPU count).")
+    ap.add_argument("--source-bps", type=float, default=1e7,
+                    help="Throughput of the monitored source, for seconds and per-hour figures (default 1e7).")
+    ap.add_argument("--out", default=None, help="Write all results (JSON) to this path.")
+    ap.add_argument("--plot", default=None, help="Save bits-to-detection CDFs as a PNG.")
+    ap.add_argument("--json", action="store_true", default=False,
+                    help="Print one JSON line per configuration instead of the table.")
+    args = ap.parse_args(argv)
+    if args.trials <= 0 or args.processes <= 0 or args.chunk <= 0 or args.max_bits <= 0:
+        ap.error("--trials, --processes, --chunk and --max-bits must be > 0")
+    if any(not (0.0 <= p <= 1.0) for p in args.p):
+        ap.error("--p values must be in [0,1]")
+    if args.plot and importlib.util.find_spec("matplotlib") is None:
+        print("Error: --plot needs matplotlib", file=sys.stderr)
+        sys.exit(1)
+
+    configs = [
+        {"p": p, "alpha": a, "delta": d, "apt_window": w}
+        for p, a, d, w in itertools.product(args.p, args.alpha, args.delta, args.apt_window)
+    ]
+    tasks = [
+        {**cfg, "beta": args.beta, "ztest": args.ztest, "z_min_bits": args.z_min_bits,
+         "max_bits": int(args.max_bits), "chunk": args.chunk, "seed": (args.seed << 32) + (j << 20) + i}
+        for j, cfg in enumerate(configs) for i in range(args.trials)
+    ]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        results = list(pool.map(detection_trial, tasks, chunksize=max(1, len(tasks) // (4 * args.processes))))
+    elapsed = time.perf_counter() - t0
+
+    trials_by_config = [results[j * args.trials:(j + 1) * args.trials] for j in range(len(configs))]
+    rows = [summarize(cfg, trials, args.source_bps) for cfg, trials in zip(configs, trials_by_config)]
+    bits_total = sum(r["bits"] for r in results)
+
+    if args.out:
+        doc = {"ts": iso_now(), "params": {k: v for k, v in vars(args).items() if k not in ("out", "plot", "json")},
+               "elapsed_sec": round(elapsed, 3), "bits_total": bits_total, "rows": rows}
+        tmp = f"{args.out}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp, args.out)
+    if args.plot:
+        save_plot(args.plot, rows, trials_by_config)
+
+    if args.json:
+        for row in rows:
+            print(json.dumps({"ts": iso_now(), "calibration": row}, ensure_ascii=False))
+    else:
+        print(format_table(rows))
+        print(f"\n{len(tasks)} streams, {bits_total:,} bits in {elapsed:.1f}s "
+              f"({human_bps(bits_total / elapsed) if elapsed > 0 else 'n/a'})")
@@ -0,0 +1,91 @@
+import os
+from collections import deque
+
+
+class ContextRing:
+    """
+    Raw bytes around anomalies for one worker.
+
+    The most recent chunks are kept as memoryviews of the source's own
+    chunk objects (sources yield a fresh bytes object per read), so the
+    ring costs no copies; it holds just enough of them to cover half the
+    context before the current chunk. `capture` names a file after the
+    proc and bit offset and fills it with up to `context_bytes` centred on
+    the triggering byte, rewriting it once the part after that byte has
+    arrived; `flush` writes whatever is pending when the worker stops.
+    """
+
+    def __init__(self, directory: str, proc_id: int, context_bytes: int):
+        if context_bytes <= 0:
+            raise ValueError("context_bytes must be > 0")
+        self.directory = directory
+        self.proc_id = proc_id
+        self.before = context_bytes // 2
+        self.after = context_bytes - self.before
+        self.chunks = deque()
+        self.held = 0
+        self.end = 0
+        # [path, start byte, end byte] of captures waiting for later chunks.
+        self.pending = []
+        self.last = None
+
+    def push(self, byte_offset: int, data):
+        """Add the chunk starting at stream byte `byte_offset`."""
+        view = memoryview(data)
+        if self.chunks and byte_offset != self.end:
+            # Gap (or restart): earlier bytes are no longer adjacent.
+            self.flush()
+            self.chunks.clear()
+            self.held = 0
+        self.chunks.append((byte_offset, view))
+        self.held += len(view)
+        self.end = byte_offset + len(view)
+        if self.pending:
+            done = [p for p in self.pending if p[2] <= self.end]
+            for p in done:
+                self._write(*p)
+                self.pending.remove(p)
+        keep_from = min((p[1] for p in self.pending), default=self.end)
+        while len(self.chunks) > 1 and self.held - len(self.chunks[0][1]) >= self.before + len(view):
+            off, oldest = self.chunks[0]
+            if off + len(oldest) > keep_from:
+                break
+            self.held -= len(oldest)
+            self.chunks.popleft()
+
+    def capture(self, bit_offset: int) -> dict:
+        """
+        Schedule a dump around stream bit `bit_offset` (inside the last
+        pushed chunk). Returns the fields added to the ANOMALY event; a
+        byte already inside the previous dump reuses its file.
+        """
+        byte = bit_offset // 8
+        if self.last is not None and self.last[1] <= byte < self.last[2]:
+            path, start, end = self.last
+            return {"context_file": path, "context_start_bit": 8 * start, "context_bytes": end - start}
+        first = self.chunks[0][0] if self.chunks else byte
+        start = max(first, byte - self.before)
+        end = byte + self.after
+        path = os.path.join(self.directory, f"proc{self.proc_id}-bit{bit_offset}.bin")
+        entry = self.last = [path, start, end]
+        # Written at once so the file exists when the event is seen (and
+        # if the worker is terminated); rewritten when the rest arrives.
+        self._write(*entry)
+        if end > self.end:
+            self.pending.append(entry)
+        return {"context_file": path, "context_start_bit": 8 * start, "context_bytes": end - start}
+
+    def _write(self, path: str, start: int, end: int):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            for off, view in self.chunks:
+                lo, hi = max(start, off) - off, min(end, off + len(view)) - off
+                if lo < hi:
+                    f.write(view[lo:hi])
+        os.replace(tmp, path)
+
+    def flush(self):
+        """Write pending captures with the bytes available so far."""
+        for p in self.pending:
+            self._write(*p)
+        self.pending = []
@@ -0,0 +1,349 @@
+import os
+import sys
+import zlib
+import struct
+import threading
+from array import array
+
+
+# Per-process snapshot layout (little-endian). Version 2 adds the cutoffs
+# in effect after the counters and, after the variable-size APT window
+# buffers, one section per optional test; a CRC32 of everything before
+# it closes the record. Version 1 records (no cutoffs, no optional
+# tests) are still read.
+PROC_MAGIC = b"RNGC"
+MAIN_MAGIC = b"RNGM"
+VERSION = 2
+_PROC_VERSIONS = (1, 2)
+MAIN_VERSION = 1
+_PROC_HEAD = struct.Struct("<4sBBBIdddIdQ")
+_PROC_COUNTERS = struct.Struct("<QQbQIIIddQQ")
+# RCT cutoff, APT bounds, Z threshold (NaN without Z).
+_PROC_CUTOFFS = struct.Struct("<IIId")
+# Optional test section: name, then counts of float params, int and
+# float fields, int64 arrays (each prefixed by its length) and raw bytes.
+_EXTRA_HEAD = struct.Struct("<8sBBBBI")
+_ARRAY_LEN = struct.Struct("<Q")
+_MAIN_BODY = struct.Struct("<4sBQd")
+_BUCKET = struct.Struct("<BddQQ")
+_CRC = struct.Struct("<I")
+
+ENGINE_CODES = {"bit": 0, "block": 1}
+
+
+def proc_path(directory: str, proc_id: int) -> str:
+    return os.path.join(directory, f"proc-{proc_id}.ckpt")
+
+
+def main_path(directory: str) -> str:
+    return os.path.join(directory, "main.ckpt")
+
+
+def write_atomic(path: str, data: bytes):
+    """
+    Write `data` to `path` through a temp file, fsync and rename, so a
+    reader sees either the previous snapshot or the new one.
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def seal(body: bytes) -> bytes:
+    """Append the CRC32 of `body` (the framing of every snapshot file, also used by rollup files)."""
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def unseal(data: bytes) -> bytes:
+    """Check and strip the CRC32 added by `seal`; raises ValueError if it does not match."""
+    if len(data) < _CRC.size:
+        raise ValueError("snapshot truncated")
+    body, (crc,) = data[:-_CRC.size], _CRC.unpack(data[-_CRC.size:])
+    if zlib.crc32(body) != crc:
+        raise ValueError("snapshot CRC mismatch")
+    return body
+
+
+def to_le(arr: array) -> bytes:
+    """Bytes of `arr` in little-endian order, the byte order of every snapshot field."""
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def from_le(typecode: str, data: bytes) -> array:
+    """Inverse of `to_le`: an array of `typecode` from little-endian bytes."""
+    arr = array(typecode, data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _pack_bits(bits) -> bytes:
+    out = bytearray((len(bits) + 7) // 8)
+    for i, b in enumerate(bits):
+        if b:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+def _unpack_bits(data: bytes, n: int) -> list[int]:
+    return [(data[i >> 3] >> (i & 7)) & 1 for i in range(n)]
+
+
+def _cutoffs(rct, apt, z) -> tuple:
+    return rct.cutoff, apt.lo, apt.hi, z.z_threshold if z is not None else float("nan")
+
+
+def capture_proc(proc_id: int, engine: str, params: dict, rct, apt, sprt, z, bits: int, ones: int,
+                 extras: list | None = None) -> tuple:
+    """
+    Copy the per-process state into plain values. Cheap enough for the
+    worker loop; encoding and I/O happen later on the writer thread.
+    `extras` lists the optional tests as (name, test); each provides
+    ``checkpoint()``.
+    """
+    return (
+        proc_id, engine, params,
+        rct.last_bit, rct.run_len,
+        apt.ones, tuple(apt.buf), bytes(apt.byte_buf),
+        sprt.s_up, sprt.s_dn,
+        (z.n, z.ones) if z is not None else None,
+        bits, ones,
+        _cutoffs(rct, apt, z),
+        [(name, test.checkpoint()) for name, test in (extras or [])],
+    )
+
+
+def _encode_extra(name: str, state: tuple) -> bytes:
+    params, ints, floats, arrays, raw = state
+    out = [
+        _EXTRA_HEAD.pack(name.encode("ascii"), len(params), len(ints), len(floats), len(arrays), len(raw)),
+        struct.pack(f"<{len(params)}d{len(ints)}q{len(floats)}d", *params, *ints, *floats),
+    ]
+    for arr in arrays:
+        out += [_ARRAY_LEN.pack(len(arr)), to_le(arr)]
+    out.append(bytes(raw))
+    return b"".join(out)
+
+
+def _decode_extra(body: bytes, off: int) -> tuple[tuple, int]:
+    name, n_params, n_ints, n_floats, n_arrays, n_raw = _EXTRA_HEAD.unpack_from(body, off)
+    off += _EXTRA_HEAD.size
+    fields = struct.Struct(f"<{n_params}d{n_ints}q{n_floats}d")
+    values = fields.unpack_from(body, off)
+    off += fields.size
+    arrays = []
+    for _ in range(n_arrays):
+        (n,) = _ARRAY_LEN.unpack_from(body, off)
+        off += _ARRAY_LEN.size
+        arrays.append(from_le("q", body[off:off + 8 * n]))
+        off += 8 * n
+    raw = body[off:off + n_raw]
+    off += n_raw
+    params, ints, floats = values[:n_params], values[n_params:n_params + n_ints], values[n_params + n_ints:]
+    return (name.rstrip(b"\0").decode("ascii"), params, ints, floats, arrays, raw), off
+
+
+def encode_proc(snap: tuple) -> bytes:
+    (proc_id, engine, params, last_bit, run_len, apt_ones, apt_bits, apt_bytes,
+     s_up, s_dn, z_state, bits, ones, cutoffs, extras) = snap
+    has_z = z_state is not None
+    z_n, z_ones = z_state if has_z else (0, 0)
+    head = _PROC_HEAD.pack(
+        PROC_MAGIC, VERSION, ENGINE_CODES[engine], 1 if has_z else 0, proc_id,
+        params["alpha"], params["beta"], params["delta"], params["apt_window"],
+        params["z_alpha"] if params["z_alpha"] is not None else float("nan"), params["z_min_bits"],
+    )
+    packed = _pack_bits(apt_bits)
+    counters = _PROC_COUNTERS.pack(
+        bits, ones,
+        -1 if last_bit is None else last_bit, run_len,
+        apt_ones, len(apt_bits), len(apt_bytes),
+        s_up, s_dn, z_n, z_ones,
+    )
+    sections = [struct.pack("<H", len(extras))] + [_encode_extra(name, st) for name, st in extras]
+    return seal(head + counters + _PROC_CUTOFFS.pack(*cutoffs) + packed + apt_bytes + b"".join(sections))
+
+
+def decode_proc(data: bytes) -> dict:
+    body = unseal(data)
+    (magic, version, engine_code, has_z, proc_id, alpha, beta, delta, window,
+     z_alpha, z_min_bits) = _PROC_HEAD.unpack_from(body, 0)
+    if magic != PROC_MAGIC or version not in _PROC_VERSIONS:
+        raise ValueError("not a process checkpoint (or unsupported version)")
+    (bits, ones, last_bit, run_len, apt_ones, n_apt_bits, n_apt_bytes,
+     s_up, s_dn, z_n, z_ones) = _PROC_COUNTERS.unpack_from(body, _PROC_HEAD.size)
+    off = _PROC_HEAD.size + _PROC_COUNTERS.size
+    cutoffs = None
+    if version >= 2:
+        cutoffs = _PROC_CUTOFFS.unpack_from(body, off)
+        off += _PROC_CUTOFFS.size
+    packed_len = (n_apt_bits + 7) // 8
+    apt_bits = _unpack_bits(body[off:off + packed_len], n_apt_bits)
+    off += packed_len
+    apt_bytes = body[off:off + n_apt_bytes]
+    off += n_apt_bytes
+    extras = []
+    if version >= 2:
+        (count,) = struct.unpack_from("<H", body, off)
+        off += 2
+        for _ in range(count):
+            extra, off = _decode_extra(body, off)
+            extras.append(extra)
+    engine = {v: k for k, v in ENGINE_CODES.items()}[engine_code]
+    return {
+        "proc": proc_id,
+        "engine": engine,
+        "params": {
+            "alpha": alpha, "beta": beta, "delta": delta, "apt_window": window,
+            "z_alpha": None if z_alpha != z_alpha else z_alpha, "z_min_bits": z_min_bits,
+            "ztest": bool(has_z),
+        },
+        "bits": bits,
+        "ones": ones,
+        "rct": (None if last_bit < 0 else last_bit, run_len),
+        "apt": (apt_ones, apt_bits, apt_bytes),
+        "sprt": (s_up, s_dn),
+        "z": (z_n, z_ones) if has_z else None,
+        "cutoffs": cutoffs,
+        "extras": extras,
+    }
+
+
+def restore_proc(state: dict, engine: str, params: dict, rct, apt, sprt, z,
+                 extras: list | None = None) -> tuple[int, int]:
+    """
+    Load a decoded snapshot into freshly built tests. Raises ValueError if
+    it was taken with different parameters, cutoffs (--thresholds),
+    optional tests or another engine (the window buffers of the two
+    engines are not interchangeable). `extras` is the (name, test) list
+    given to `capture_proc`. Returns the restored (bits, ones) counters.
+    """
+    saved = state["params"]
+    for key in ("alpha", "beta", "delta", "apt_window", "z_min_bits"):
+        if saved[key] != params[key]:
+            raise ValueError(f"checkpoint {key}={saved[key]} differs from {params[key]}")
+    if saved["ztest"] != (z is not None) or (z is not None and saved["z_alpha"] != params["z_alpha"]):
+        raise ValueError("checkpoint Z-test settings differ")
+    if state["engine"] != engine:
+        raise ValueError(f"checkpoint engine {state['engine']} differs from {engine}")
+    current = _cutoffs(rct, apt, z)
+    saved_cut = state["cutoffs"]
+    if saved_cut is not None and any(a != b and not (a != a and b != b) for a, b in zip(saved_cut, current)):
+        raise ValueError(f"checkpoint cutoffs (RCT, APT lo/hi, Z) {list(saved_cut)} differ from {list(current)}")
+    extras = extras or []
+    names = [name for name, _ in extras]
+    saved_names = [e[0] for e in state["extras"]]
+    if saved_names != names:
+        raise ValueError(f"checkpoint optional tests {saved_names} differ from {names}")
+    for (name, saved_params, _, _, _, _), (_, test) in zip(state["extras"], extras):
+        if tuple(saved_params) != tuple(float(v) for v in test.checkpoint()[0]):
+            raise ValueError(f"checkpoint {name} parameters differ")
+    rct.last_bit, rct.run_len = state["rct"]
+    apt.ones, bits, raw = state["apt"]
+    apt.buf.clear()
+    apt.buf.extend(bits)
+    apt.byte_buf.clear()
+    apt.byte_buf.extend(raw)
+    sprt.s_up, sprt.s_dn = state["sprt"]
+    if z is not None:
+        z.n, z.ones = state["z"]
+    for (_, _, ints, floats, arrays, raw), (_, test) in zip(state["extras"], extras):
+        test.restore(ints, floats, arrays, raw)
+    return state["bits"], state["ones"]
+
+
+def encode_main(anomalies: int, elapsed: float, buckets: list[dict | None]) -> bytes:
+    """
+    Main-process state: anomaly count, elapsed time and the bucket
+    accumulators as ages relative to now (perf_counter values do not
+    survive a restart).
+    """
+    out = [_MAIN_BODY.pack(MAIN_MAGIC, MAIN_VERSION, anomalies, elapsed)]
+    for b in buckets:
+        if b is None:
+            out.append(_BUCKET.pack(0, 0.0, 0.0, 0, 0))
+        else:
+            out.append(_BUCKET.pack(1, b["ref_age"], b["start_age"], b["bits_at_start"], b["ones_at_start"]))
+    return seal(b"".join(out))
+
+
+def decode_main(data: bytes) -> dict:
+    body = unseal(data)
+    magic, version, anomalies, elapsed = _MAIN_BODY.unpack_from(body, 0)
+    if magic != MAIN_MAGIC or version != MAIN_VERSION:
+        raise ValueError("not a main checkpoint (or unsupported version)")
+    buckets = []
+    off = _MAIN_BODY.size
+    while off + _BUCKET.size <= len(body):
+        valid, ref_age, start_age, bits, ones = _BUCKET.unpack_from(body, off)
+        off += _BUCKET.size
+        buckets.append({"ref_age": ref_age, "start_age": start_age, "bits_at_start": bits,
+                        "ones_at_start": ones} if valid else None)
+    return {"anomalies": anomalies, "elapsed": elapsed, "buckets": buckets}
+
+
+def load(path: str, decoder):
+    """
+    Decode the snapshot at `path`, or return None if there is none.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return decoder(data)
+
+
+class Checkpointer:
+    """
+    Background writer for snapshots.
+
+    `submit` only stores the latest captured snapshot and wakes the
+    thread, which encodes it and writes it atomically; if the writer falls
+    behind, intermediate snapshots are skipped rather than queued.
+    """
+
+    def __init__(self, path: str, encoder):
+        self.path = path
+        self.encoder = encoder
+        self.writes = 0
+        self.last_error = None
+        self._pending = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        with self._cond:
+            self._pending = snapshot
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                snap, self._pending = self._pending, None
+                closed = self._closed
+            if snap is not None:
+                try:
+                    write_atomic(self.path, self.encoder(snap))
+                    self.writes += 1
+                except Exception as e:
+                    self.last_error = repr(e)
+            if closed and snap is None:
+                return
+
+    def close(self, timeout: float = 5.0):
+        """Write any pending snapshot and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=timeout)
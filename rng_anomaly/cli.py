@@ -1,16 +1,31 @@
 import os
 import sys
-import json
 import time
+import secrets
 import argparse
-import multiprocessing as mp
 
-from .utils import iso_now, human_bps
-from .worker import worker
-from .tui import LiveUI, stdout_live_update
+from .utils import iso_now
+from .worker import ENGINES, EXEC_MODES, launch_workers, stop_workers, gil_enabled
+from .tui import LiveUI, StdoutLive
+from .aggregate import Aggregator
+from .sinks import OutputWriter, parse_sink
 
 
-def run():
+# Subcommands dispatched by `main` to `<module>.main(argv)`.
+SUBCOMMANDS = {
+    "autotune": "autotune",
+    "supervise": "supervisor",
+    "collect": "collector",
+    "analyze": "analyze",
+    "query": "store",
+    "rollup": "rollup",
+    "bench": "bench",
+    "calibrate": "calibrate",
+    "thresholds": "thresholds",
+}
+
+
+def run(argv: list[str] | None = None):
     ap = argparse.ArgumentParser(
         description="Online anomaly detector for /dev/(u)random (RCT, APT, SPRT)."
     )
@@ -32,6 +47,36 @@ def run():
                     help="Time limit per process in seconds (default 30s).")
     ap.add_argument("--chunk", type=int, default=1 << 16,
                     help="Read chunk size in bytes (default 65536).")
+    ap.add_argument("--engine", choices=ENGINES, default="bit",
+                    help="Test engine: 'bit' (per-bit) or 'block' (per-chunk fast paths).")
+    ap.add_argument("--exec", choices=EXEC_MODES, default="process",
+                    help="Run workers as processes (default) or as threads in this process.")
+    ap.add_argument("--collector", type=str, default=None,
+                    help="Also stream stats/events to a collector (tcp://host:port or unix:/path).")
+    ap.add_argument("--node", type=str, default=None,
+                    help="Node name reported to the collector (default hostname).")
+    ap.add_argument("--metrics-listen", type=str, default=None, metavar="HOST:PORT",
+                    help="Serve Prometheus metrics at http://HOST:PORT/metrics.")
+    ap.add_argument("--store", type=str, default=None, metavar="DB",
+                    help="Record anomalies, bucket ratios and the summary in a SQLite database.")
+    ap.add_argument("--store-label", type=str, default=None,
+                    help="Source label for --store rows (default: the source path, or synthetic:p).")
+    ap.add_argument("--thresholds", nargs="?", const="", default=None, metavar="PATH",
+                    help="Use RCT/APT/Z cutoffs from a cache written by 'rng-anomaly thresholds' "
+                         "(default path if PATH is omitted).")
+    ap.add_argument("--context-dir", type=str, default=None,
+                    help="Dump the raw bytes around each anomaly to a file in this directory "
+                         "(proc<N>-bit<OFFSET>.bin, referenced as context_file in the event).")
+    ap.add_argument("--context-kb", type=float, default=64.0,
+                    help="Bytes dumped around each anomaly, in KiB, half before and half after (default 64).")
+    ap.add_argument("--checkpoint-dir", type=str, default=None,
+                    help="Directory for periodic binary snapshots of the test state.")
+    ap.add_argument("--checkpoint-interval", type=float, default=60.0,
+                    help="Seconds between snapshots (default 60).")
+    ap.add_argument("--resume", action="store_true", default=False,
+                    help="Restore test state from --checkpoint-dir at startup.")
+    ap.add_argument("--profile", type=str, default=None,
+                    help="Tuning profile (from `rng-anomaly autotune`) providing defaults for --chunk/--processes/--engine.")
     ap.add_argument("--live-interval", type=float, default=0.5,
                     help="Live report interval in seconds.")
     ap.add_argument("--stop-on-anomaly", action="store_true", default=False,
@@ -43,7 +88,7 @@ def run():
     ap.add_argument("--tui", action="store_true", default=False,
                     help="Terminal UI (curses): shows 1/0 and live percentages.")
     ap.add_argument("--tui-refresh", type=float, default=0.1,
-                    help="Minimum TUI refresh interval in seconds.")
+                    help="Frame interval in seconds for the TUI and --stdout-live (default 0.1).")
     ap.add_argument("--tui-scale", type=int, default=1,
                     help="ASCII art scale factor for TUI (default 1).")
     ap.add_argument("--tui-gap", type=int, default=2,
@@ -51,9 +96,17 @@ def run():
     ap.add_argument("--pct-decimals", type=int, default=6,
                     help="Number of decimals for percentages in TUI/pretty (default 6).")
     ap.add_argument("--stdout-live", action="store_true", default=False,
-                    help="Update one line in stdout with %1s/%0s each iteration.")
+                    help="Update one line in stdout with %%1s/%%0s each iteration.")
     ap.add_argument("--quiet-json", action="store_true", default=False,
                     help="Suppress heartbeats/STATS/ITER in JSON for clean output.")
+    ap.add_argument("--sink", action="append", default=None, metavar="SPEC",
+                    help="Output sink: stdout, jsonl:PATH or binlog:PATH (repeatable; default stdout).")
+    ap.add_argument("--jsonl-max-mb", type=float, default=64.0,
+                    help="Rotate jsonl sinks at this size in MiB (default 64).")
+    ap.add_argument("--jsonl-backups", type=int, default=5,
+                    help="Rotated jsonl files to keep (default 5).")
+    ap.add_argument("--sink-buffer", type=int, default=65536,
+                    help="Records buffered for the output writer; ITER/heartbeats are dropped when full.")
     ap.add_argument("--no-limit", action="store_true", default=False,
                     help="Ignore time and bit limits; run indefinitely.")
     ap.add_argument("--stdout-pretty", action="store_true", default=False,
@@ -67,13 +120,52 @@ def run():
     ap.add_argument("--p", type=float, default=0.5,
                     help="Probability P(1)=p for synthetic source (default 0.5).")
     ap.add_argument("--seed", type=int, default=None,
-                    help="Base seed for synthetic source (optional).")
+                    help="Seed of the synthetic stream (random if omitted; printed in the config record).")
     ap.add_argument("--ztest", action="store_true", default=False,
                     help="Enable bilateral online monobit Z-test.")
     ap.add_argument("--z-alpha", type=float, default=None,
                     help="Bilateral α for monobit Z (defaults to --alpha).")
     ap.add_argument("--z-min-bits", type=int, default=10000,
                     help="Minimum bits before evaluating Z (default 10000).")
+    ap.add_argument("--bitpos", nargs="?", type=int, const=1, default=None, metavar="WORD_BYTES",
+                    help="Per-bit-position bias and stuck-bit monitor over words of 1, 2, 4 or 8 bytes "
+                         "(default 1 if WORD_BYTES is omitted).")
+    ap.add_argument("--bitpos-alpha", type=float, default=None,
+                    help="α for the bit-position monitor, split over all positions (defaults to --alpha).")
+    ap.add_argument("--serial", nargs="?", type=int, const=8, default=None, metavar="M",
+                    help="Overlapping M-bit serial test, 2 <= M <= 16 (default 8 if M is omitted).")
+    ap.add_argument("--serial-alpha", type=float, default=None,
+                    help="α for the serial test (defaults to --alpha).")
+    ap.add_argument("--maurer", nargs="?", type=int, const=8, default=None, metavar="L",
+                    help="Maurer universal test over L-bit blocks, 6 <= L <= 16 (default 8 if L is omitted).")
+    ap.add_argument("--maurer-alpha", type=float, default=None,
+                    help="α per evaluated segment for the Maurer test (defaults to --alpha).")
+    ap.add_argument("--maurer-init", type=int, default=None,
+                    help="Initialization blocks that only fill the table (default 10*2^L).")
+    ap.add_argument("--maurer-blocks", type=int, default=None,
+                    help="Blocks per evaluated segment (default 1000*2^L).")
+    ap.add_argument("--lincomp", action="store_true", default=False,
+                    help="Linear complexity test (Berlekamp-Massey) on sampled chunks in side processes "
+                         "(--engine block).")
+    ap.add_argument("--lincomp-m", type=int, default=500,
+                    help="Linear complexity block length M in bits (default 500).")
+    ap.add_argument("--lincomp-blocks", type=int, default=200,
+                    help="Blocks per sample; each sample is one chi-square test (default 200).")
+    ap.add_argument("--lincomp-every", type=int, default=16,
+                    help="Sample the start of one chunk in N per worker (default 16).")
+    ap.add_argument("--lincomp-processes", type=int, default=1,
+                    help="Side processes for the linear complexity test (default 1).")
+    ap.add_argument("--lincomp-alpha", type=float, default=None,
+                    help="α per sample for the linear complexity test (defaults to --alpha).")
+    ap.add_argument("--budget", type=float, default=None, metavar="FRACTION",
+                    help="CPU budget per optional test (--bitpos/--serial/--maurer) as a fraction of one core "
+                         "per worker, e.g. 0.05; chunks beyond it are skipped (--engine block).")
+    ap.add_argument("--pipeline", nargs="?", const="auto", default=None, metavar="STAGES",
+                    help="Run every test on one stream, split across processes: a reader fills shared memory "
+                         "and each stage runs its tests on every chunk, e.g. RCT+APT,SPRT+Z,SERIAL+MAURER "
+                         "(default 'auto'; --engine block).")
+    ap.add_argument("--pipeline-slots", type=int, default=8,
+                    help="Chunks held in the shared-memory ring for --pipeline (default 8).")
     ap.add_argument("--mpl-plot", action="store_true", default=False,
                     help="Live matplotlib plot of bias (1s-0s).")
     ap.add_argument("--mpl-interval", type=float, default=0.5,
@@ -96,7 +188,18 @@ def run():
                     help="Aggregate points every N hours (default 1h).")
     ap.add_argument("--macro-save", type=str, default=None,
                     help="Path to save macro plot PNG at the end.")
-    args = ap.parse_args()
+    ap.add_argument("--rollup-file", type=str, default=None,
+                    help="Keep second/minute/hour/day bias rollups in this file (saved every "
+                         "--checkpoint-interval and at exit, restored at startup).")
+    pre, _ = ap.parse_known_args(argv)
+    if pre.profile:
+        from .autotune import load_profile
+        try:
+            ap.set_defaults(**load_profile(pre.profile))
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot load profile {pre.profile}: {e}", file=sys.stderr)
+            sys.exit(1)
+    args = ap.parse_args(argv)
 
     if args.tui and not args.per_iter:
         args.per_iter = True
@@ -109,193 +212,322 @@ def run():
     if args.no_limit:
         args.bits = None
         args.time = None
+    if args.synthetic and args.seed is None:
+        args.seed = secrets.randbits(63)
+    if args.resume and not args.checkpoint_dir:
+        print("Error: --resume requires --checkpoint-dir", file=sys.stderr)
+        sys.exit(1)
+    if args.checkpoint_dir:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+    if args.context_dir:
+        if args.context_kb <= 0:
+            print("Error: --context-kb must be > 0", file=sys.stderr)
+            sys.exit(1)
+        os.makedirs(args.context_dir, exist_ok=True)
+    thresholds = None
+    if args.thresholds is not None:
+        from .thresholds import load_thresholds, default_cache_path
+        args.thresholds = args.thresholds or default_cache_path()
+        try:
+            thresholds = load_thresholds(args.thresholds)
+        except (OSError, ValueError) as e:
+            print(f"Error: threshold cache {args.thresholds}: {e}", file=sys.stderr)
+            sys.exit(1)
+    extras = {}
+    if args.bitpos is not None:
+        if args.bitpos not in (1, 2, 4, 8):
+            print("Error: --bitpos WORD_BYTES must be 1, 2, 4 or 8", file=sys.stderr)
+            sys.exit(1)
+        extras["BITPOS"] = {"alpha": args.bitpos_alpha or args.alpha, "word_bytes": args.bitpos}
+    if args.serial is not None:
+        if not (2 <= args.serial <= 16):
+            print("Error: --serial M must be in [2, 16]", file=sys.stderr)
+            sys.exit(1)
+        extras["SERIAL"] = {"alpha": args.serial_alpha or args.alpha, "m": args.serial}
+    if args.maurer is not None:
+        if not (6 <= args.maurer <= 16):
+            print("Error: --maurer L must be in [6, 16]", file=sys.stderr)
+            sys.exit(1)
+        if (args.maurer_init is not None and args.maurer_init < 0) or \
+                (args.maurer_blocks is not None and args.maurer_blocks <= 0):
+            print("Error: --maurer-init must be >= 0 and --maurer-blocks > 0", file=sys.stderr)
+            sys.exit(1)
+        extras["MAURER"] = {"alpha": args.maurer_alpha or args.alpha, "L": args.maurer,
+                            "init_blocks": args.maurer_init, "test_blocks": args.maurer_blocks}
+    if args.lincomp:
+        if args.engine != "block":
+            print("Error: --lincomp requires --engine block", file=sys.stderr)
+            sys.exit(1)
+        if args.lincomp_m < 2 or args.lincomp_blocks <= 0 or args.lincomp_every <= 0 or args.lincomp_processes <= 0:
+            print("Error: --lincomp-m must be >= 2; --lincomp-blocks, --lincomp-every and --lincomp-processes > 0",
+                  file=sys.stderr)
+            sys.exit(1)
+        from .lincomp import MIN_BLOCKS
+        from .sources import SYNTHETIC_BLOCK_BYTES
+        # Samples with fewer than MIN_BLOCKS blocks never give a verdict.
+        chunk = max(SYNTHETIC_BLOCK_BYTES, args.chunk - args.chunk % SYNTHETIC_BLOCK_BYTES) if args.synthetic \
+            else args.chunk
+        if args.lincomp_blocks < MIN_BLOCKS:
+            print(f"Error: --lincomp-blocks must be >= {MIN_BLOCKS}", file=sys.stderr)
+            sys.exit(1)
+        if 8 * chunk // args.lincomp_m < MIN_BLOCKS:
+            print(f"Error: --lincomp needs chunks of at least {(args.lincomp_m * MIN_BLOCKS + 7) // 8} bytes "
+                  f"({MIN_BLOCKS} blocks of {args.lincomp_m} bits); raise --chunk or lower --lincomp-m",
+                  file=sys.stderr)
+            sys.exit(1)
+    if args.budget is not None:
+        if args.engine != "block":
+            print("Error: --budget requires --engine block", file=sys.stderr)
+            sys.exit(1)
+        if not (0 < args.budget <= 1):
+            print("Error: --budget must be in (0, 1]", file=sys.stderr)
+            sys.exit(1)
+    stages = None
+    if args.pipeline is not None:
+        if args.engine != "block":
+            print("Error: --pipeline requires --engine block", file=sys.stderr)
+            sys.exit(1)
+        unsupported = [flag for flag, on in (("--lincomp", args.lincomp), ("--budget", args.budget is not None),
+                                             ("--context-dir", args.context_dir),
+                                             ("--checkpoint-dir", args.checkpoint_dir)) if on]
+        if unsupported:
+            print(f"Error: --pipeline does not support {', '.join(unsupported)}", file=sys.stderr)
+            sys.exit(1)
+        if args.pipeline_slots < 2:
+            print("Error: --pipeline-slots must be >= 2", file=sys.stderr)
+            sys.exit(1)
+        from .pipeline import parse_stages
+        try:
+            stages = parse_stages(args.pipeline, args.ztest, extras)
+        except ValueError as e:
+            print(f"Error: --pipeline {args.pipeline}: {e}", file=sys.stderr)
+            sys.exit(1)
+    rollup = None
+    if args.rollup_file:
+        from .rollup import Rollup
+        try:
+            rollup = Rollup.load(args.rollup_file)
+        except (OSError, ValueError) as e:
+            print(f"Error: rollup file {args.rollup_file}: {e}", file=sys.stderr)
+            sys.exit(1)
 
     if not args.synthetic:
         if not os.path.exists(args.source):
             print(f"Error: path does not exist {args.source}", file=sys.stderr)
             sys.exit(1)
 
-    if not args.quiet_json:
-        print(json.dumps({
-            "ts": iso_now(),
-            "config": {
-                "source": args.source,
-                "processes": args.processes,
-                "alpha": args.alpha,
-                "beta": args.beta,
-                "delta": args.delta,
-                "apt_window": args.apt_window,
-                "bits_limit": args.bits,
-                "time_limit_sec": args.time,
-                "chunk_bytes": args.chunk,
-                "live_interval_sec": args.live_interval,
-                "stop_on_anomaly": args.stop_on_anomaly,
-                "per_iter": args.per_iter,
-                "iter_sample": args.iter_sample,
-                "tui": args.tui,
-                "stdout_live": args.stdout_live,
-                "quiet_json": args.quiet_json,
-                "no_limit": args.no_limit,
-                "synthetic": args.synthetic,
-                "p": args.p,
-                "seed": args.seed,
-                "ztest": args.ztest,
-                "z_alpha": args.z_alpha,
-                "z_min_bits": args.z_min_bits,
-                "macro_plot": args.macro_plot,
-                "macro_window_hours": args.macro_window_hours,
-                "macro_bucket_hours": args.macro_bucket_hours,
-                "macro_save": args.macro_save,
-            },
-        }, ensure_ascii=False))
-
-    q = mp.Queue()
-    procs = []
-    for i in range(args.processes):
-        p = mp.Process(
-            target=worker,
-            args=(
-                i,
-                args.source,
-                args.alpha,
-                args.beta,
-                args.delta,
-                args.apt_window,
-                q,
-                args.bits,
-                args.time,
-                args.chunk,
-                args.live_interval,
-                args.stop_on_anomaly,
-                args.per_iter,
-                args.iter_sample,
-                args.synthetic,
-                args.p,
-                args.seed,
-                args.ztest,
-                args.z_alpha,
-                args.z_min_bits,
-            ),
-            daemon=True,
+    specs = args.sink or ["stdout"]
+    if args.quiet_json:
+        specs = [s for s in specs if s != "stdout"]
+    try:
+        sinks = [parse_sink(s, int(args.jsonl_max_mb * (1 << 20)), args.jsonl_backups) for s in specs]
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    out = OutputWriter(sinks, max_pending=args.sink_buffer)
+
+    config = {
+        "ts": iso_now(),
+        "config": {
+            "source": args.source,
+            "processes": args.processes,
+            "alpha": args.alpha,
+            "beta": args.beta,
+            "delta": args.delta,
+            "apt_window": args.apt_window,
+            "bits_limit": args.bits,
+            "time_limit_sec": args.time,
+            "chunk_bytes": args.chunk,
+            "engine": args.engine,
+            "exec": args.exec,
+            "gil_enabled": gil_enabled(),
+            "profile": args.profile,
+            "collector": args.collector,
+            "metrics_listen": args.metrics_listen,
+            "store": args.store,
+            "thresholds": args.thresholds,
+            "context_dir": args.context_dir,
+            "context_kb": args.context_kb,
+            "checkpoint_dir": args.checkpoint_dir,
+            "resume": args.resume,
+            "live_interval_sec": args.live_interval,
+            "stop_on_anomaly": args.stop_on_anomaly,
+            "per_iter": args.per_iter,
+            "iter_sample": args.iter_sample,
+            "tui": args.tui,
+            "stdout_live": args.stdout_live,
+            "quiet_json": args.quiet_json,
+            "sinks": specs,
+            "no_limit": args.no_limit,
+            "synthetic": args.synthetic,
+            "p": args.p,
+            "seed": args.seed,
+            "ztest": args.ztest,
+            "z_alpha": args.z_alpha,
+            "z_min_bits": args.z_min_bits,
+            "bitpos": args.bitpos,
+            "bitpos_alpha": args.bitpos_alpha,
+            "serial": args.serial,
+            "serial_alpha": args.serial_alpha,
+            "maurer": args.maurer,
+            "maurer_alpha": args.maurer_alpha,
+            "maurer_init": args.maurer_init,
+            "maurer_blocks": args.maurer_blocks,
+            "lincomp": args.lincomp,
+            "lincomp_m": args.lincomp_m,
+            "lincomp_blocks": args.lincomp_blocks,
+            "lincomp_every": args.lincomp_every,
+            "lincomp_processes": args.lincomp_processes,
+            "lincomp_alpha": args.lincomp_alpha,
+            "budget": args.budget,
+            "pipeline": ["+".join(stage) for stage in stages] if stages else None,
+            "pipeline_slots": args.pipeline_slots,
+            "macro_plot": args.macro_plot,
+            "macro_window_hours": args.macro_window_hours,
+            "macro_bucket_hours": args.macro_bucket_hours,
+            "macro_save": args.macro_save,
+            "rollup_file": args.rollup_file,
+        },
+    }
+    out.emit(config)
+
+    def worker_kwargs(i, queue_out, stop_event):
+        return dict(
+            proc_id=i,
+            source_path=args.source,
+            alpha=args.alpha,
+            beta=args.beta,
+            delta=args.delta,
+            apt_window=args.apt_window,
+            queue_out=queue_out,
+            max_bits=args.bits,
+            max_seconds=args.time,
+            chunk_size=args.chunk,
+            report_interval=args.live_interval,
+            stop_on_anomaly=args.stop_on_anomaly,
+            per_iter=args.per_iter,
+            iter_sample=args.iter_sample,
+            use_synthetic=args.synthetic,
+            synthetic_p=args.p,
+            synthetic_seed=args.seed,
+            ztest_enabled=args.ztest,
+            z_alpha=args.z_alpha,
+            z_min_bits=args.z_min_bits,
+            engine=args.engine,
+            stop_event=stop_event,
+            checkpoint_dir=args.checkpoint_dir,
+            checkpoint_interval=args.checkpoint_interval,
+            resume=args.resume,
+            num_procs=args.processes,
+            thresholds=thresholds,
+            extras=extras,
+            lincomp_queue=lincomp.tasks if lincomp is not None else None,
+            lincomp_bytes=(args.lincomp_m * args.lincomp_blocks + 7) // 8,
+            lincomp_every=args.lincomp_every,
+            budget=args.budget,
+            context_dir=args.context_dir,
+            context_bytes=max(1, int(args.context_kb * 1024)),
         )
-        p.start()
-        procs.append(p)
 
-    active = len(procs)
+    client = None
+    if args.collector:
+        from .collector import CollectorClient
+        try:
+            client = CollectorClient(args.collector, node=args.node,
+                                     info={"processes": args.processes, "source": args.source})
+        except ValueError as e:
+            out.close()
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    agg = Aggregator()
+    metrics = metrics_server = None
+    if args.metrics_listen:
+        from .metrics import Metrics, MetricsServer
+        metrics = Metrics(agg, output=out)
+        try:
+            metrics_server = MetricsServer(args.metrics_listen, metrics)
+        except (OSError, ValueError) as e:
+            if client is not None:
+                client.close()
+            out.close()
+            print(f"Error: metrics endpoint {args.metrics_listen}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    store = None
+    if args.store:
+        from .store import ResultsStore
+        label = args.store_label or (f"synthetic:{args.p}" if args.synthetic else args.source)
+        try:
+            store = ResultsStore(args.store, label, config["config"])
+        except Exception as e:
+            if client is not None:
+                client.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            out.close()
+            print(f"Error: results store {args.store}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    lincomp = None
+    if args.lincomp:
+        from .lincomp import LinearComplexityPool
+        lincomp = LinearComplexityPool(args.lincomp_processes, args.lincomp_m, args.lincomp_alpha or args.alpha)
+
+    if stages is not None:
+        from .pipeline import launch_pipeline
+        q, procs, stop_event = launch_pipeline(stages, worker_kwargs(0, None, None), args.pipeline_slots)
+    else:
+        q, procs, stop_event = launch_workers(args.exec, args.processes, worker_kwargs)
+    if metrics is not None:
+        metrics.queue = q
+    if lincomp is not None:
+        lincomp.attach(q)
+
+    # A pipeline reports as one worker however many stages it has.
+    active = 1 if stages is not None else len(procs)
     t_start = time.perf_counter()
     last_hb = t_start
     anomalies = 0
-    totals_bits = 0
-    per_proc_bps = {}
-    per_proc_bits = {}
-    per_proc_ones = {}
-    per_proc_win_ones = {}
-    per_proc_win_len = {}
-
-    ui = LiveUI(args.tui, args.tui_refresh, pct_decimals=args.pct_decimals, scale=args.tui_scale, gap=args.tui_gap)
+
+    ui = LiveUI(args.tui, args.tui_refresh, pct_decimals=args.pct_decimals, scale=args.tui_scale, gap=args.tui_gap,
+                agg=agg)
     ui.start()
-    pretty_state = {"printed": False, "lines": 0}
+    live = None
+    if args.stdout_live:
+        live = StdoutLive(agg, args.tui_refresh, pretty=getattr(args, "stdout_pretty", False),
+                          pretty_scale=getattr(args, "pretty_scale", 1), pretty_gap=getattr(args, "pretty_gap", 3),
+                          pct_decimals=getattr(args, "pct_decimals", 6))
+        live.start()
 
-    # Matplotlib state
-    mpl = {"enabled": False, "ax": None, "xs": [], "ys": [], "last_draw": 0.0, "line": None}
+    plot = None
+    figures = []
     if args.mpl_plot:
+        figures.append(("bias", args.mpl_window_min, args.mpl_save))
+    if args.macro_plot:
+        figures.append(("macro", args.macro_window_hours, args.macro_save))
+    if figures:
+        from .plot import PlotClient, figure_spec
         try:
-            import matplotlib.pyplot as plt  # type: ignore
-            import matplotlib.ticker as mticker  # type: ignore
-            plt.ion()
-            fig, ax = plt.subplots()
-            ax.set_title("Bias per window — 100*(1s-0s) = 200*ones% - 100")
-            ax.set_xlabel("Time (min)")
-            ax.set_ylabel("Bias (percentage points)")
-            ax.grid(True, alpha=0.3)
-            line, = ax.plot([], [], "-", lw=2.0)
-            ax.xaxis.set_major_formatter(mticker.FormatStrFormatter('%.1f'))
-            mpl.update({"enabled": True, "ax": ax, "line": line})
+            plot = PlotClient([figure_spec(*f) for f in figures], interval=args.mpl_interval)
         except Exception as e:
-            if not args.quiet_json:
-                print(json.dumps({"ts": iso_now(), "event": "WARN", "mpl": "disabled", "error": repr(e)}, ensure_ascii=False))
+            for name, _, _ in figures:
+                key = "mpl" if name == "bias" else "macro"
+                out.emit({"ts": iso_now(), "event": "WARN", key: "disabled", "error": repr(e)})
 
-    def mpl_update(now_t: float, ones_ratio: float | None):
-        if not mpl["enabled"] or ones_ratio is None:
-            return
-        bias_pp = (2.0 * ones_ratio - 1.0) * 100.0
-        x_val = now_t / 60.0
-        mpl["xs"].append(x_val)
-        mpl["ys"].append(bias_pp)
-        if len(mpl["xs"]) > 10000:
-            mpl["xs"] = mpl["xs"][-5000:]
-            mpl["ys"] = mpl["ys"][-5000:]
-        now = time.perf_counter()
-        if (now - mpl["last_draw"]) >= args.mpl_interval:
-            mpl["last_draw"] = now
-            try:
-                ax = mpl["ax"]
-                xs = mpl["xs"]
-                ys = mpl["ys"]
-                win_min = max(0.5, float(args.mpl_window_min))
-                x_max = xs[-1] if xs else 0.0
-                x_min = max(0.0, x_max - win_min)
-                ax.set_xlim(x_min, x_max if x_max > x_min else x_min + win_min)
-                line = mpl["line"]
-                line.set_data(xs, ys)
-                ax.relim()
-                ax.autoscale_view(scalex=False, scaley=True)
-                ax.axhline(0.0, color="#888", lw=0.8)
-                import matplotlib.pyplot as plt  # type: ignore
-                plt.draw()
-                plt.pause(0.001)
-            except Exception:
-                pass
+    if plot is not None and args.macro_plot and rollup is not None:
+        # Earlier runs: hourly points before t=0 from the restored rollup.
+        wall_start = time.time() - (time.perf_counter() - t_start)
+        for t_mid, r in rollup.ratios("hour", wall_start - args.macro_window_hours * 3600.0, wall_start):
+            plot.add("macro", t_mid - wall_start, r)
 
-    macro = {"enabled": False, "ax": None, "xs": [], "ys": [], "last_draw": 0.0, "line": None}
-    if args.macro_plot:
-        try:
-            import matplotlib.pyplot as plt  # type: ignore
-            import matplotlib.ticker as mticker  # type: ignore
-            plt.ion()
-            fig2, ax2 = plt.subplots()
-            ax2.set_title("Hourly bias — 100*(1s-0s)")
-            ax2.set_xlabel("Time (hours)")
-            ax2.set_ylabel("Bias (percentage points)")
-            ax2.grid(True, alpha=0.3)
-            line2, = ax2.plot([], [], "-", lw=2.0)
-            ax2.xaxis.set_major_formatter(mticker.FormatStrFormatter('%.1f'))
-            macro.update({"enabled": True, "ax": ax2, "line": line2})
-        except Exception as e:
-            if not args.quiet_json:
-                print(json.dumps({"ts": iso_now(), "event": "WARN", "macro": "disabled", "error": repr(e)}, ensure_ascii=False))
+    def mpl_update(now_t: float, ones_ratio: float | None):
+        if plot is not None and args.mpl_plot and ones_ratio is not None:
+            plot.add("bias", now_t, ones_ratio)
 
     def macro_update(now_t: float, ones_ratio: float | None):
-        if not macro["enabled"] or ones_ratio is None:
-            return
-        bias_pp = (2.0 * ones_ratio - 1.0) * 100.0
-        x_val = now_t / 3600.0
-        macro["xs"].append(x_val)
-        macro["ys"].append(bias_pp)
-        if len(macro["xs"]) > 20000:
-            macro["xs"] = macro["xs"][-10000:]
-            macro["ys"] = macro["ys"][-10000:]
-        now = time.perf_counter()
-        if (now - macro["last_draw"]) >= max(0.5, float(args.mpl_interval)):
-            macro["last_draw"] = now
-            try:
-                ax2 = macro["ax"]
-                xs2 = macro["xs"]
-                ys2 = macro["ys"]
-                win_h = max(1.0, float(args.macro_window_hours))
-                x_max = xs2[-1] if xs2 else 0.0
-                x_min = max(0.0, x_max - win_h)
-                ax2.set_xlim(x_min, x_max if x_max > x_min else x_min + win_h)
-                line2 = macro["line"]
-                line2.set_data(xs2, ys2)
-                ax2.relim()
-                ax2.autoscale_view(scalex=False, scaley=True)
-                ax2.axhline(0.0, color="#888", lw=0.8)
-                import matplotlib.pyplot as plt  # type: ignore
-                plt.draw()
-                plt.pause(0.001)
-            except Exception:
-                pass
+        if plot is not None and args.macro_plot and ones_ratio is not None:
+            plot.add("macro", now_t, ones_ratio)
 
     bucket_state = {"t_ref": None, "t_bucket_start": None, "bits_at_start": 0, "ones_at_start": 0}
     macro_bucket_state = {"t_ref": None, "t_bucket_start": None, "bits_at_start": 0, "ones_at_start": 0}
@@ -323,7 +555,7 @@ def run():
             if delta_bits > 0:
                 ratio = delta_ones / delta_bits
                 t_rel = (bucket_state["t_bucket_start"] + bucket_len) - bucket_state["t_ref"]
-                out_points.append((t_rel, ratio))
+                out_points.append((t_rel, ratio, delta_bits, delta_ones))
             bucket_state["t_bucket_start"] += bucket_len
             bucket_state["bits_at_start"] = bits_total
             bucket_state["ones_at_start"] = ones_total
@@ -340,209 +572,196 @@ def run():
             if delta_bits > 0:
                 ratio = delta_ones / delta_bits
                 t_rel = (macro_bucket_state["t_bucket_start"] + bucket_len) - macro_bucket_state["t_ref"]
-                out_points.append((t_rel, ratio))
+                out_points.append((t_rel, ratio, delta_bits, delta_ones))
             macro_bucket_state["t_bucket_start"] += bucket_len
             macro_bucket_state["bits_at_start"] = bits_total
             macro_bucket_state["ones_at_start"] = ones_total
         return out_points
 
+    main_ckpt = None
+    last_main_ckpt = time.perf_counter()
+    rollup_ckpt = None
+    # Totals already pushed to the rollups. Counters a worker restored with
+    # --resume are already in --rollup-file, so they are added here when
+    # the worker first reports and only later progress is rolled up.
+    rolled = {"bits": 0, "ones": 0}
+    rolled_resumed = set()
+    if rollup is not None:
+        from .checkpoint import Checkpointer
+        rollup_ckpt = Checkpointer(args.rollup_file, bytes)
+    if args.checkpoint_dir:
+        from . import checkpoint as ckpt
+        if args.resume:
+            try:
+                saved = ckpt.load(ckpt.main_path(args.checkpoint_dir), ckpt.decode_main)
+            except ValueError as e:
+                saved = None
+                out.emit({"ts": iso_now(), "event": "WARN", "resume": "main state ignored",
+                          "error": repr(e)})
+            if saved is not None:
+                now = time.perf_counter()
+                anomalies = saved["anomalies"]
+                t_start = now - saved["elapsed"]
+                for st, b in zip((bucket_state, macro_bucket_state), saved["buckets"]):
+                    if b is not None:
+                        st["t_ref"] = now - b["ref_age"]
+                        st["t_bucket_start"] = now - b["start_age"]
+                        st["bits_at_start"] = b["bits_at_start"]
+                        st["ones_at_start"] = b["ones_at_start"]
+        main_ckpt = ckpt.Checkpointer(ckpt.main_path(args.checkpoint_dir), lambda snap: ckpt.encode_main(*snap))
+
+    def main_snapshot() -> tuple:
+        now = time.perf_counter()
+        buckets = []
+        for st in (bucket_state, macro_bucket_state):
+            if st["t_ref"] is None:
+                buckets.append(None)
+            else:
+                buckets.append({
+                    "ref_age": now - st["t_ref"],
+                    "start_age": now - st["t_bucket_start"],
+                    "bits_at_start": st["bits_at_start"],
+                    "ones_at_start": st["ones_at_start"],
+                })
+        return anomalies, now - t_start, buckets
+
+    def refresh(now_perf: float):
+        """Push the current totals to the plot buckets and rollups (the TUI reads `agg` itself)."""
+        if rollup is not None and agg.bits_total > rolled["bits"]:
+            rollup.add(time.time(), agg.bits_total - rolled["bits"], agg.ones_total - rolled["ones"])
+            rolled["bits"], rolled["ones"] = agg.bits_total, agg.ones_total
+        if agg.bits_total > 0:
+            wall = time.time() - now_perf
+            for t_rel, r, bits, ones in maybe_emit_buckets(now_perf, agg.bits_total, agg.ones_total):
+                mpl_update(t_rel, r)
+                if store is not None:
+                    store.bucket("short", wall + bucket_state["t_ref"] + t_rel, bits, ones)
+            if args.macro_plot or store is not None:
+                for t_rel, r, bits, ones in maybe_emit_macro_buckets(now_perf, agg.bits_total, agg.ones_total):
+                    macro_update(t_rel, r)
+                    if store is not None:
+                        store.bucket("macro", wall + macro_bucket_state["t_ref"] + t_rel, bits, ones)
+
+    store_dropped = 0
+
+    def store_warn():
+        """WARN when the results store has dropped rows since the last check."""
+        nonlocal store_dropped
+        if store is not None and store.dropped > store_dropped:
+            store_dropped = store.dropped
+            out.emit({"ts": iso_now(), "event": "WARN", "store": "rows dropped", "dropped": store.dropped,
+                      "error": store.last_error})
+
+    def heartbeat(now_perf: float):
+        nonlocal last_hb
+        out.emit(agg.heartbeat_record(now_perf - t_start))
+        last_hb = now_perf
+        refresh(now_perf)
+        store_warn()
+
+    last_rollup_ckpt = time.perf_counter()
     try:
         while active > 0:
+            if main_ckpt is not None and (time.perf_counter() - last_main_ckpt) >= args.checkpoint_interval:
+                main_ckpt.submit(main_snapshot())
+                last_main_ckpt = time.perf_counter()
+            if rollup_ckpt is not None and (time.perf_counter() - last_rollup_ckpt) >= args.checkpoint_interval:
+                rollup_ckpt.submit(rollup.encode())
+                last_rollup_ckpt = time.perf_counter()
             try:
                 tag, payload = q.get(timeout=0.5)
             except Exception:
-                elapsed = time.perf_counter() - t_start
-                agg_bps = sum(per_proc_bps.values()) if per_proc_bps else 0.0
-                bits_total = sum(per_proc_bits.values()) if per_proc_bits else 0
-                ones_total = sum(per_proc_ones.values()) if per_proc_ones else 0
-                ones_ratio = (ones_total / bits_total) if bits_total > 0 else None
-                ones_percent = (ones_ratio * 100.0) if ones_ratio is not None else None
-                window_len_total = sum(per_proc_win_len.values()) if per_proc_win_len else 0
-                window_ones_total = sum(per_proc_win_ones.values()) if per_proc_win_ones else 0
-                window_ratio = (window_ones_total / window_len_total) if window_len_total > 0 else None
-                window_percent = (window_ratio * 100.0) if window_ratio is not None else None
-                if not args.quiet_json:
-                    print(json.dumps({
-                        "ts": iso_now(),
-                        "heartbeat": True,
-                        "elapsed_sec": round(elapsed, 3),
-                        "procs_reporting": len(per_proc_bits),
-                        "bits_total": bits_total,
-                        "ones_total": ones_total,
-                        "ones_ratio_global": ones_ratio,
-                        "ones_percent_global": ones_percent,
-                        "window_len_total": window_len_total,
-                        "window_ones_total": window_ones_total,
-                        "ones_ratio_window": window_ratio,
-                        "ones_percent_window": window_percent,
-                        "aggregate_bps": agg_bps,
-                        "aggregate_bps_human": human_bps(agg_bps),
-                    }, ensure_ascii=False))
-                last_hb = time.perf_counter()
-                zeros_ratio = (1 - ones_ratio) if ones_ratio is not None else None
-                ui.update(ones_ratio, zeros_ratio)
-                if bits_total > 0:
-                    pts = maybe_emit_buckets(time.perf_counter(), bits_total, ones_total)
-                    for t_rel, r in pts:
-                        mpl_update(t_rel, r)
-                    if args.macro_plot:
-                        pts2 = maybe_emit_macro_buckets(time.perf_counter(), bits_total, ones_total)
-                        for t_rel, r in pts2:
-                            macro_update(t_rel, r)
+                heartbeat(time.perf_counter())
                 continue
+            if "bits_resumed" in payload and payload["proc"] not in rolled_resumed:
+                rolled_resumed.add(payload["proc"])
+                rolled["bits"] += payload["bits_resumed"]
+                rolled["ones"] += payload["ones_resumed"]
+
+            if client is not None and tag != "ITER":
+                # Side-process events (LINCOMP) carry no worker counters.
+                if tag in ("STATS", "ANOMALY", "DONE") and "bits_processed" in payload:
+                    client.send_stat(payload, done=(tag == "DONE"))
+                if tag in ("ANOMALY", "ERROR"):
+                    client.send_event(tag, payload)
 
             if tag == "ANOMALY":
                 anomalies += 1
-                totals_bits += payload.get("bits_processed", 0)
-                per_proc_bps[payload["proc"]] = payload.get("bps", 0.0)
-                per_proc_bits[payload["proc"]] = payload.get("bits_processed", 0)
-                per_proc_ones[payload["proc"]] = payload.get("ones_total", 0)
-                per_proc_win_ones[payload["proc"]] = payload.get("apt_ones", 0)
-                per_proc_win_len[payload["proc"]] = payload.get("apt_len", 0)
-                if not args.quiet_json:
-                    print(json.dumps({"ts": iso_now(), "event": "ANOMALY", **payload}, ensure_ascii=False))
+                agg.update(payload)
+                out.emit({"ts": iso_now(), "event": "ANOMALY", **payload})
+                if metrics is not None:
+                    metrics.anomaly(payload)
+                if store is not None:
+                    store.anomaly(payload)
                 if args.stop_on_anomaly:
-                    for p in procs:
-                        if p.is_alive():
-                            p.terminate()
+                    stop_workers(procs, stop_event)
                     break
 
             elif tag == "STATS":
-                pid = payload["proc"]
-                per_proc_bps[pid] = payload.get("bps", 0.0)
-                per_proc_bits[pid] = payload.get("bits_processed", 0)
-                per_proc_ones[pid] = payload.get("ones_total", 0)
-                per_proc_win_ones[pid] = payload.get("apt_ones", 0)
-                per_proc_win_len[pid] = payload.get("apt_len", 0)
-                now = time.perfCounter()
+                agg.update(payload)
+                now = time.perf_counter()
                 if (now - last_hb) >= args.live_interval:
-                    elapsed = now - t_start
-                    agg_bps = sum(per_proc_bps.values()) if per_proc_bps else 0.0
-                    bits_total = sum(per_proc_bits.values()) if per_proc_bits else 0
-                    ones_total = sum(per_proc_ones.values()) if per_proc_ones else 0
-                    ones_ratio = (ones_total / bits_total) if bits_total > 0 else None
-                    ones_percent = (ones_ratio * 100.0) if ones_ratio is not None else None
-                    window_len_total = sum(per_proc_win_len.values()) if per_proc_win_len else 0
-                    window_ones_total = sum(per_proc_win_ones.values()) if per_proc_win_ones else 0
-                    window_ratio = (window_ones_total / window_len_total) if window_len_total > 0 else None
-                    window_percent = (window_ratio * 100.0) if window_ratio is not None else None
-                    if not args.quiet_json:
-                        print(json.dumps({
-                            "ts": iso_now(),
-                            "heartbeat": True,
-                            "elapsed_sec": round(elapsed, 3),
-                            "procs_reporting": len(per_proc_bits),
-                            "bits_total": bits_total,
-                            "ones_total": ones_total,
-                            "ones_ratio_global": ones_ratio,
-                            "ones_percent_global": ones_percent,
-                            "window_len_total": window_len_total,
-                            "window_ones_total": window_ones_total,
-                            "ones_ratio_window": window_ratio,
-                            "ones_percent_window": window_percent,
-                            "aggregate_bps": agg_bps,
-                            "aggregate_bps_human": human_bps(agg_bps),
-                        }, ensure_ascii=False))
-                    last_hb = now
-                    zeros_ratio = (1 - ones_ratio) if ones_ratio is not None else None
-                    ui.update(ones_ratio, zeros_ratio)
-                    if bits_total > 0 and args.macro_plot:
-                        pts2 = maybe_emit_macro_buckets(time.perf_counter(), bits_total, ones_total)
-                        for t_rel, r in pts2:
-                            macro_update(t_rel, r)
+                    heartbeat(now)
 
             elif tag == "ITER":
-                if not args.quiet_json:
-                    print(json.dumps({"ts": iso_now(), "event": "ITER", **payload}, ensure_ascii=False))
-                pid = payload["proc"]
-                per_proc_bits[pid] = payload.get("bits_processed", per_proc_bits.get(pid, 0))
-                per_proc_ones[pid] = payload.get("ones_total", per_proc_ones.get(pid, 0))
-                bits_total = sum(per_proc_bits.values()) if per_proc_bits else 0
-                ones_total = sum(per_proc_ones.values()) if per_proc_ones else 0
-                ones_ratio = (ones_total / bits_total) if bits_total > 0 else None
-                zeros_ratio = (1 - ones_ratio) if ones_ratio is not None else None
-                ui.update(ones_ratio, zeros_ratio)
-                if bits_total > 0:
-                    pts = maybe_emit_buckets(time.perf_counter(), bits_total, ones_total)
-                    for t_rel, r in pts:
-                        mpl_update(t_rel, r)
-                ui.update(ones_ratio, zeros_ratio)
-                if bits_total > 0:
-                    pts = maybe_emit_buckets(time.perf_counter(), bits_total, ones_total)
-                    for t_rel, r in pts:
-                        mpl_update(t_rel, r)
-                if bits_total > 0 and args.macro_plot:
-                    pts2 = maybe_emit_macro_buckets(time.perf_counter(), bits_total, ones_total)
-                    for t_rel, r in pts2:
-                        macro_update(t_rel, r)
-                if args.stdout_live and ones_ratio is not None:
-                    stdout_live_update(
-                        getattr(args, "stdout_pretty", False),
-                        bits_total,
-                        ones_ratio,
-                        pretty_state,
-                        getattr(args, "pretty_scale", 1),
-                        getattr(args, "pretty_gap", 3),
-                        getattr(args, "pct_decimals", 6),
-                    )
+                out.emit({"ts": iso_now(), "event": "ITER", **payload})
+                agg.update_counts(payload)
+                refresh(time.perf_counter())
 
             elif tag == "DONE":
-                totals_bits += payload.get("bits_processed", 0)
-                per_proc_bps[payload["proc"]] = payload.get("bps", 0.0)
-                per_proc_bits[payload["proc"]] = payload.get("bits_processed", 0)
-                per_proc_ones[payload["proc"]] = payload.get("ones_total", 0)
-                per_proc_win_ones[payload["proc"]] = payload.get("apt_ones", 0)
-                per_proc_win_len[payload["proc"]] = payload.get("apt_len", 0)
-                if not args.quiet_json:
-                    print(json.dumps({"ts": iso_now(), "event": "DONE", **payload}, ensure_ascii=False))
+                agg.update(payload)
+                out.emit({"ts": iso_now(), "event": "DONE", **payload})
                 active -= 1
 
             elif tag == "ERROR":
-                if not args.quiet_json:
-                    print(json.dumps({"ts": iso_now(), "event": "ERROR", **payload}, ensure_ascii=False))
+                out.emit({"ts": iso_now(), "event": "ERROR", **payload})
                 active -= 1
 
-        elapsed = time.perf_counter() - t_start
-        agg_bps = sum(per_proc_bps.values()) if per_proc_bps else 0.0
-        bits_total = sum(per_proc_bits.values()) if per_proc_bits else 0
-        ones_total = sum(per_proc_ones.values()) if per_proc_ones else 0
-        ones_ratio = (ones_total / bits_total) if bits_total > 0 else None
-        ones_percent = (ones_ratio * 100.0) if ones_ratio is not None else None
-        window_len_total = sum(per_proc_win_len.values()) if per_proc_win_len else 0
-        window_ones_total = sum(per_proc_win_ones.values()) if per_proc_win_ones else 0
-        window_ratio = (window_ones_total / window_len_total) if window_len_total > 0 else None
-        window_percent = (window_ratio * 100.0) if window_ratio is not None else None
-        if not args.quiet_json:
-            print(json.dumps({
-                "ts": iso_now(),
-                "summary": {
-                    "elapsed_sec": round(elapsed, 3),
-                    "processes": args.processes,
-                    "anomalies": anomalies,
-                    "total_bits": bits_total,
-                    "ones_total": ones_total,
-                    "ones_ratio_global": ones_ratio,
-                    "ones_percent_global": ones_percent,
-                    "window_len_total": window_len_total,
-                    "window_ones_total": window_ones_total,
-                    "ones_ratio_window": window_ratio,
-                    "ones_percent_window": window_percent,
-                    "aggregate_bps": agg_bps,
-                    "aggregate_bps_human": human_bps(agg_bps),
-                },
-            }, ensure_ascii=False))
-        if args.stdout_live and not args.quiet_json:
-            sys.stdout.write("\n")
+        refresh(time.perf_counter())
+        summary = agg.summary_record(time.perf_counter() - t_start, 1 if stages is not None else args.processes,
+                                     anomalies)
+        summary["summary"]["output"] = out.stats()
+        if store is not None:
+            summary["summary"]["store"] = store.stats()
+        if lincomp is not None:
+            lc = summary["summary"]["lincomp"] = lincomp.stats()
+            lc["coverage"] = (lc["blocks"] * lc["block_bits"] / agg.bits_total) if agg.bits_total else None
+        out.emit(summary)
+        if store is not None:
+            store.summary(summary["summary"])
     finally:
         ui.stop()
-        for p in procs:
-            if p.is_alive():
-                p.terminate()
-        for p in procs:
-            p.join(timeout=1.0)
+        if live is not None:
+            live.stop()
+        stop_workers(procs, stop_event)
+        if lincomp is not None:
+            lincomp.close()
+        if client is not None:
+            client.close()
+        if metrics_server is not None:
+            metrics_server.close()
+        if store is not None:
+            store.close()
+            store_warn()
+        if plot is not None:
+            plot.close()
+        if main_ckpt is not None:
+            main_ckpt.submit(main_snapshot())
+            main_ckpt.close()
+        if rollup_ckpt is not None:
+            rollup_ckpt.submit(rollup.encode())
+            rollup_ckpt.close()
+        out.close()
+        if args.stdout_live and not args.quiet_json:
+            sys.stdout.write("\n")
 
 
-def main():
-    run()
+def main(argv: list[str] | None = None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in SUBCOMMANDS:
+        import importlib
+        mod = importlib.import_module(f".{SUBCOMMANDS[argv[0]]}", __package__)
+        return mod.main(argv[1:])
+    run(argv)
 
 
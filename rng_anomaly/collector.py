@@ -0,0 +1,449 @@
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import struct
+import stat
+import signal
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+from collections import deque, OrderedDict
+
+from .utils import iso_now, human_bps
+
+
+# Frame: 1-byte type, 4-byte big-endian payload length, payload.
+FRAME_HEADER = struct.Struct(">BI")
+FRAME_HELLO = 1
+FRAME_STAT = 2
+FRAME_EVENT = 3
+MAX_FRAME = 1 << 20
+
+# STAT payload: proc, done flag, bits, ones, apt_len, apt_ones, bps.
+STAT_STRUCT = struct.Struct(">IBQQIId")
+
+
+def parse_address(text: str) -> tuple[str, object]:
+    """
+    Parse "tcp://host:port", "host:port" or "unix:/path" into
+    ("tcp", (host, port)) or ("unix", path).
+    """
+    if text.startswith("unix:"):
+        path = text[len("unix:"):]
+        if path.startswith("//"):
+            path = path[2:]
+        if not path:
+            raise ValueError("empty unix socket path")
+        return "unix", path
+    if text.startswith("tcp://"):
+        text = text[len("tcp://"):]
+    host, sep, port = text.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"bad collector address {text!r} (expected host:port or unix:/path)")
+    return "tcp", (host.strip("[]") or "0.0.0.0", int(port))
+
+
+def encode_frame(kind: int, payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_json(kind: int, obj: dict) -> bytes:
+    return encode_frame(kind, json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def encode_stat(payload: dict, done: bool = False) -> bytes:
+    bps = payload.get("bps")
+    return encode_frame(FRAME_STAT, STAT_STRUCT.pack(
+        int(payload.get("proc", 0)),
+        1 if done else 0,
+        int(payload.get("bits_processed", 0)),
+        int(payload.get("ones_total", 0)),
+        int(payload.get("apt_len", 0) or 0),
+        int(payload.get("apt_ones", 0) or 0),
+        float(bps) if bps is not None else float("nan"),
+    ))
+
+
+def decode_stat(data: bytes) -> dict:
+    proc, done, bits, ones, apt_len, apt_ones, bps = STAT_STRUCT.unpack(data)
+    return {
+        "proc": proc,
+        "done": bool(done),
+        "bits_processed": bits,
+        "ones_total": ones,
+        "apt_len": apt_len,
+        "apt_ones": apt_ones,
+        "bps": bps,
+    }
+
+
+class FleetState:
+    """
+    Fleet-wide totals merged incrementally from node streams.
+
+    Each connected (node, pid, proc) keeps its last counters; a new STAT
+    adds the difference to the running totals, so merging is O(1) per
+    frame. The pid from HELLO separates instances sharing a node name.
+    Bit counts are cumulative: counters that go backwards are a restart
+    and count again from zero, the earlier bits staying in the totals.
+    The APT window and the rate are current values: a restart or a
+    disconnect takes them out of the totals. Disconnected instances move
+    to an LRU of `max_retired` entries so a reconnect resumes from their
+    last counters; beyond that, state grows only with the connected
+    processes, and anomalies are kept in a bounded deque.
+    """
+
+    def __init__(self, max_anomalies: int = 1000, max_retired: int = 1024):
+        self.procs = {}
+        self.retired = OrderedDict()
+        self.max_retired = max_retired
+        self.nodes = {}
+        self.bits_total = 0
+        self.ones_total = 0
+        self.window_len_total = 0
+        self.window_ones_total = 0
+        self.bps_total = 0.0
+        self.anomalies_total = 0
+        self.anomalies_by_test = {}
+        self.recent_anomalies = deque(maxlen=max_anomalies)
+        self.frames = 0
+        self.lock = threading.Lock()
+
+    def hello(self, node: str, info: dict):
+        with self.lock:
+            entry = self.nodes.setdefault(node, {"anomalies": 0, "connected": 0})
+            entry.update({"info": info, "last_seen": time.time()})
+            entry["connected"] += 1
+            self.frames += 1
+
+    def _drop_current(self, prev: dict):
+        self.window_len_total -= prev["apt_len"]
+        self.window_ones_total -= prev["apt_ones"]
+        self.bps_total -= prev["bps"]
+        prev.update({"apt_len": 0, "apt_ones": 0, "bps": 0.0})
+
+    def disconnect(self, node: str, pid: int | None = None):
+        with self.lock:
+            if node in self.nodes:
+                self.nodes[node]["connected"] = max(0, self.nodes[node]["connected"] - 1)
+            for key in [k for k in self.procs if k[:2] == (node, pid)]:
+                prev = self.procs.pop(key)
+                self._drop_current(prev)
+                self.retired[key] = prev
+                self.retired.move_to_end(key)
+            while len(self.retired) > self.max_retired:
+                self.retired.popitem(last=False)
+
+    def stat(self, node: str, st: dict, pid: int | None = None):
+        key = (node, pid, st["proc"])
+        with self.lock:
+            prev = self.procs.get(key)
+            if prev is None:
+                prev = self.retired.pop(key, None)
+            bps = st["bps"] if st["bps"] == st["bps"] else 0.0
+            if st["done"]:
+                bps = 0.0
+            if prev is not None and (st["bits_processed"] < prev["bits"] or st["ones_total"] < prev["ones"]):
+                # Restarted worker: its earlier bits stay in the totals,
+                # its old window and rate do not.
+                self._drop_current(prev)
+                prev = None
+            if prev is None:
+                prev = {"bits": 0, "ones": 0, "apt_len": 0, "apt_ones": 0, "bps": 0.0}
+            self.bits_total += st["bits_processed"] - prev["bits"]
+            self.ones_total += st["ones_total"] - prev["ones"]
+            self.window_len_total += st["apt_len"] - prev["apt_len"]
+            self.window_ones_total += st["apt_ones"] - prev["apt_ones"]
+            self.bps_total += bps - prev["bps"]
+            self.procs[key] = {
+                "bits": st["bits_processed"],
+                "ones": st["ones_total"],
+                "apt_len": st["apt_len"],
+                "apt_ones": st["apt_ones"],
+                "bps": bps,
+                "done": st["done"],
+            }
+            self.nodes.setdefault(node, {"anomalies": 0, "connected": 0})["last_seen"] = time.time()
+            self.frames += 1
+
+    def event(self, node: str, evt: dict):
+        with self.lock:
+            self.frames += 1
+            if evt.get("event") != "ANOMALY":
+                return
+            self.anomalies_total += 1
+            test = evt.get("test", "?")
+            self.anomalies_by_test[test] = self.anomalies_by_test.get(test, 0) + 1
+            self.nodes.setdefault(node, {"anomalies": 0, "connected": 0})["anomalies"] += 1
+            self.recent_anomalies.append({"node": node, **evt})
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            ratio = (self.ones_total / self.bits_total) if self.bits_total else None
+            wratio = (self.window_ones_total / self.window_len_total) if self.window_len_total else None
+            return {
+                "nodes": len(self.nodes),
+                "nodes_connected": sum(1 for n in self.nodes.values() if n["connected"] > 0),
+                "procs": len(self.procs),
+                "procs_active": sum(1 for p in self.procs.values() if not p["done"]),
+                "bits_total": self.bits_total,
+                "ones_total": self.ones_total,
+                "ones_ratio_global": ratio,
+                "window_len_total": self.window_len_total,
+                "window_ones_total": self.window_ones_total,
+                "ones_ratio_window": wratio,
+                "aggregate_bps": self.bps_total,
+                "aggregate_bps_human": human_bps(self.bps_total),
+                "anomalies": self.anomalies_total,
+                "anomalies_by_test": dict(self.anomalies_by_test),
+                "anomalies_by_node": {k: v["anomalies"] for k, v in self.nodes.items()},
+                "frames": self.frames,
+            }
+
+
+async def _serve_connection(state: FleetState, reader, writer):
+    node = pid = None
+    try:
+        while True:
+            header = await reader.readexactly(FRAME_HEADER.size)
+            kind, length = FRAME_HEADER.unpack(header)
+            if length > MAX_FRAME:
+                break
+            data = await reader.readexactly(length)
+            if kind == FRAME_HELLO:
+                info = json.loads(data)
+                node = str(info.get("node", "?"))
+                pid = info.get("pid")
+                state.hello(node, info)
+            elif node is None:
+                break
+            elif kind == FRAME_STAT:
+                state.stat(node, decode_stat(data), pid)
+            elif kind == FRAME_EVENT:
+                state.event(node, json.loads(data))
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+        pass
+    finally:
+        if node is not None:
+            state.disconnect(node, pid)
+        writer.close()
+
+
+async def start_server(state: FleetState, address: str):
+    kind, where = parse_address(address)
+
+    async def handler(reader, writer):
+        await _serve_connection(state, reader, writer)
+
+    if kind == "unix":
+        if os.path.exists(where) and stat.S_ISSOCK(os.stat(where).st_mode):
+            os.unlink(where)
+        return await asyncio.start_unix_server(handler, path=where)
+    host, port = where
+    return await asyncio.start_server(handler, host=host, port=port)
+
+
+class LocalCollector:
+    """
+    In-process collector running its server on a background thread.
+
+    Listens on an ephemeral TCP port (default) or a temporary UNIX socket,
+    which makes it a stand-in for the real service in tests::
+
+        with LocalCollector() as col:
+            client = CollectorClient(col.address, node="a")
+            ...
+            col.snapshot()["bits_total"]
+    """
+
+    def __init__(self, unix: bool = False, max_anomalies: int = 1000):
+        self.state = FleetState(max_anomalies=max_anomalies)
+        self._tmpdir = tempfile.mkdtemp(prefix="rng-collector-") if unix else None
+        self.address = f"unix:{os.path.join(self._tmpdir, 'collector.sock')}" if unix else "tcp://127.0.0.1:0"
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        fut = asyncio.run_coroutine_threadsafe(start_server(self.state, self.address), self._loop)
+        self._server = fut.result(timeout=5.0)
+        if self.address.startswith("tcp://"):
+            port = self._server.sockets[0].getsockname()[1]
+            self.address = f"tcp://127.0.0.1:{port}"
+        return self
+
+    def snapshot(self) -> dict:
+        return self.state.snapshot()
+
+    def close(self):
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            asyncio.run_coroutine_threadsafe(self._server.wait_closed(), self._loop).result(timeout=5.0)
+            self._server = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5.0)
+        if self._tmpdir is not None:
+            try:
+                os.unlink(os.path.join(self._tmpdir, "collector.sock"))
+            except OSError:
+                pass
+            os.rmdir(self._tmpdir)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CollectorClient:
+    """
+    Ship STAT/EVENT frames to a collector from a background thread.
+
+    Frames are queued without blocking the caller and sent in batches
+    (one sendall per batch). On connection loss the client reconnects with
+    exponential backoff and re-sends HELLO; frames that do not fit in the
+    bounded queue are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, address: str, node: str | None = None, batch_max: int = 256,
+                 flush_interval: float = 0.2, max_pending: int = 10000, info: dict | None = None):
+        self.kind, self.where = parse_address(address)
+        self.node = node or platform.node() or "node"
+        self.info = dict(info or {})
+        self.batch_max = max(1, int(batch_max))
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.sent_frames = 0
+        self.reconnects = 0
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, frame: bytes):
+        try:
+            self.pending.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+
+    def send_stat(self, payload: dict, done: bool = False):
+        self._put(encode_stat(payload, done))
+
+    def send_event(self, tag: str, payload: dict):
+        self._put(encode_json(FRAME_EVENT, {"event": tag, **payload}))
+
+    def _connect(self):
+        if self.kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET6 if ":" in self.where[0] else socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(5.0)
+        sock.connect(self.where)
+        sock.sendall(encode_json(FRAME_HELLO, {"node": self.node, "pid": os.getpid(), **self.info}))
+        self._sock = sock
+
+    def _drop_connection(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _run(self):
+        backoff = 0.1
+        batch = []
+        while not (self._stop.is_set() and not batch and self.pending.empty()):
+            if not batch:
+                try:
+                    batch.append(self.pending.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_max:
+                    try:
+                        batch.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+            try:
+                if self._sock is None:
+                    self._connect()
+                    backoff = 0.1
+                self._sock.sendall(b"".join(batch))
+                self.sent_frames += len(batch)
+                batch = []
+            except OSError:
+                self._drop_connection()
+                self.reconnects += 1
+                if self._stop.is_set():
+                    self.dropped += len(batch)
+                    batch = []
+                    break
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 5.0)
+        self._drop_connection()
+
+    def close(self, timeout: float = 2.0):
+        """Flush what can be sent within `timeout` and stop the thread."""
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly collect",
+        description="Collect stat/event streams from many rng-anomaly instances into fleet totals.",
+    )
+    ap.add_argument("--listen", default="tcp://0.0.0.0:7700",
+                    help="Listen address: tcp://host:port or unix:/path (default tcp://0.0.0.0:7700).")
+    ap.add_argument("--live-interval", type=float, default=5.0,
+                    help="Fleet heartbeat interval in seconds (default 5).")
+    ap.add_argument("--max-anomalies", type=int, default=1000,
+                    help="Recent anomalies kept in memory (default 1000).")
+    ap.add_argument("--quiet-json", action="store_true", default=False,
+                    help="Do not print fleet heartbeats or anomalies, only the final summary.")
+    args = ap.parse_args(argv)
+    try:
+        parse_address(args.listen)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    state = FleetState(max_anomalies=args.max_anomalies)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        server = await start_server(state, args.listen)
+        seen = 0
+        async with server:
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=args.live_interval)
+                except asyncio.TimeoutError:
+                    pass
+                if args.quiet_json:
+                    continue
+                with state.lock:
+                    fresh = list(state.recent_anomalies)[-(state.anomalies_total - seen):] \
+                        if state.anomalies_total > seen else []
+                    seen = state.anomalies_total
+                for evt in fresh:
+                    print(json.dumps({"ts": iso_now(), **evt}, ensure_ascii=False))
+                print(json.dumps({"ts": iso_now(), "heartbeat": True, "fleet": state.snapshot()},
+                                 ensure_ascii=False), flush=True)
+
+    asyncio.run(serve())
+    print(json.dumps({"ts": iso_now(), "summary": {"fleet": state.snapshot()}}, ensure_ascii=False))
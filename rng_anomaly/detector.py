@@ -0,0 +1,156 @@
+import time
+
+from .worker import build_tests
+
+
+# Keys of a run's "config" record (or a dict of CLI option names) that
+# configure a Detector; everything else is ignored by `from_config`.
+CONFIG_KEYS = ("alpha", "beta", "delta", "apt_window", "ztest", "z_alpha", "z_min_bits", "chunk_bytes", "chunk",
+               "thresholds", "bitpos", "bitpos_alpha", "serial", "serial_alpha",
+               "maurer", "maurer_alpha", "maurer_init", "maurer_blocks")
+
+
+class Detector:
+    """
+    The RCT/APT/SPRT(/Z) battery for use inside another program.
+
+    `feed` takes any C-contiguous buffer (bytes, bytearray, memoryview,
+    numpy array, mmap) and reads its raw bytes through a memoryview, bits
+    LSB-first, without copying. Events follow the CLI's block engine: at
+    most one per test per `chunk` bytes, with chunks on a fixed grid of
+    the whole stream, so results do not depend on how the stream is split
+    between calls. Each event carries the absolute `bit_offset` of the
+    triggering bit and the counters up to and including it.
+
+    Parameters match the CLI options of the same name; `thresholds` is a
+    cache dict or path from `rng-anomaly thresholds`, `bitpos` is the
+    word size in bytes of the bit-position monitor, `serial` the pattern
+    length of the serial test and `maurer` the block length of the Maurer
+    test (each off when None).
+    """
+
+    def __init__(self, alpha: float = 1e-6, beta: float = 1e-2, delta: float = 1e-4, apt_window: int = 1024,
+                 ztest: bool = False, z_alpha: float | None = None, z_min_bits: int = 10000,
+                 chunk: int = 1 << 16, thresholds: dict | str | None = None, bitpos: int | None = None,
+                 bitpos_alpha: float | None = None, serial: int | None = None, serial_alpha: float | None = None,
+                 maurer: int | None = None, maurer_alpha: float | None = None, maurer_init: int | None = None,
+                 maurer_blocks: int | None = None):
+        if chunk <= 0:
+            raise ValueError("chunk must be > 0")
+        if isinstance(thresholds, str):
+            from .thresholds import load_thresholds
+            thresholds = load_thresholds(thresholds)
+        self.params = {
+            "alpha": alpha, "beta": beta, "delta": delta, "apt_window": apt_window,
+            "ztest": ztest, "z_alpha": z_alpha, "z_min_bits": z_min_bits, "chunk": chunk,
+            "bitpos": bitpos, "bitpos_alpha": bitpos_alpha, "serial": serial, "serial_alpha": serial_alpha,
+            "maurer": maurer, "maurer_alpha": maurer_alpha, "maurer_init": maurer_init, "maurer_blocks": maurer_blocks,
+        }
+        extras = {}
+        if bitpos is not None:
+            extras["BITPOS"] = {"alpha": bitpos_alpha or alpha, "word_bytes": bitpos}
+        if serial is not None:
+            extras["SERIAL"] = {"alpha": serial_alpha or alpha, "m": serial}
+        if maurer is not None:
+            extras["MAURER"] = {"alpha": maurer_alpha or alpha, "L": maurer, "init_blocks": maurer_init,
+                                "test_blocks": maurer_blocks}
+        self.rct, self.apt, self.sprt, self.tests = build_tests(alpha, beta, delta, apt_window, ztest, z_alpha,
+                                                                z_min_bits, thresholds, extras)
+        self.zmono = self.tests[3] if ztest else None
+        self.extra_tests = self.tests[4 if ztest else 3:]
+        self.chunk = chunk
+        self.bits = 0
+        self.ones = 0
+        self.anomalies = {}
+        # Grid chunk of the last event per test, so a chunk split across
+        # calls still reports at most one event per test.
+        self._fired = [-1] * len(self.tests)
+        self.t_start = time.perf_counter()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Detector":
+        """
+        Build from a dict of CLI option names (underscored), such as the
+        "config" record a run prints at startup or a loaded profile.
+        """
+        kwargs = {k: config[k] for k in CONFIG_KEYS if config.get(k) is not None}
+        if "chunk_bytes" in kwargs:
+            kwargs["chunk"] = kwargs.pop("chunk_bytes")
+        return cls(**kwargs)
+
+    def feed(self, buffer) -> list[dict]:
+        """Run the tests over `buffer` and return its events in stream order."""
+        view = memoryview(buffer)
+        if not view.c_contiguous:
+            raise ValueError("buffer must be C-contiguous")
+        if view.format != "B" or view.ndim != 1:
+            view = view.cast("B")
+        events = []
+        pos = 0
+        size = len(view)
+        chunk = self.chunk
+        while pos < size:
+            byte_base = self.bits >> 3
+            end = min(size, pos + chunk - (byte_base % chunk))
+            events += self._feed_chunk(view[pos:end], byte_base // chunk)
+            pos = end
+        return events
+
+    def _feed_chunk(self, data, grid: int) -> list[dict]:
+        found = []
+        for i, test in enumerate(self.tests):
+            evt = test.update_bytes(data)
+            if evt is not None and self._fired[i] != grid:
+                self._fired[i] = grid
+                found.append(evt)
+        bits_before, ones_before = self.bits, self.ones
+        self.bits += 8 * len(data)
+        self.ones += int.from_bytes(data, "little").bit_count()
+        if not found:
+            return found
+        wall = time.time()
+        for evt in found:
+            offset = evt.pop("offset")
+            prefix = int.from_bytes(data[:offset // 8 + 1], "little") & ((1 << (offset + 1)) - 1)
+            ones = ones_before + prefix.bit_count()
+            evt.update({
+                "bit_offset": bits_before + offset,
+                "bits_processed": bits_before + offset + 1,
+                "ones_total": ones,
+                "ones_pct": ones / (bits_before + offset + 1),
+                "detected_at": wall,
+            })
+            self.anomalies[evt["test"]] = self.anomalies.get(evt["test"], 0) + 1
+        found.sort(key=lambda e: e["bit_offset"])
+        return found
+
+    def snapshot(self) -> dict:
+        """Counters and test statistics after the last `feed`."""
+        apt = self.apt
+        apt_len = apt.filled
+        elapsed = time.perf_counter() - self.t_start
+        snap = {
+            "bits_processed": self.bits,
+            "ones_total": self.ones,
+            "zeros_total": self.bits - self.ones,
+            "ones_pct": (self.ones / self.bits) if self.bits else None,
+            "apt_window_len": apt_len,
+            "apt_window_ones": apt.ones,
+            "apt_pct": (apt.ones / apt_len) if apt_len > 0 else None,
+            "apt_bounds": [apt.lo, apt.hi],
+            "rct_run_len": self.rct.run_len,
+            "rct_cutoff": self.rct.cutoff,
+            "sprt_up": self.sprt.s_up,
+            "sprt_dn": self.sprt.s_dn,
+            "sprt_threshold": self.sprt.A,
+            "anomalies": dict(self.anomalies),
+            "elapsed_sec": elapsed,
+            "bps": self.bits / elapsed if elapsed > 0 else None,
+        }
+        if self.zmono is not None:
+            z = self.zmono
+            snap["z_stat"] = (z.ones - 0.5 * z.n) / (0.5 * z.n ** 0.5) if z.n else None
+            snap["z_threshold"] = z.z_threshold
+        for test in self.extra_tests:
+            snap.update(test.stats())
+        return snap
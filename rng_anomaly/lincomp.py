@@ -0,0 +1,169 @@
+import math
+import time
+import queue
+import threading
+import multiprocessing as mp
+
+
+# SP 800-22 2.10: probabilities of the T classes (≤-2.5, ..., >2.5).
+CLASS_PROBS = (0.010417, 0.03125, 0.125, 0.5, 0.25, 0.0625, 0.020833)
+MIN_BLOCKS = 200
+
+
+def berlekamp_massey(seq: int, n: int) -> int:
+    """
+    Linear complexity of the n-bit GF(2) sequence packed in `seq` (s_k at
+    bit k). Connection polynomials are ints (c_j at bit j); the sequence is
+    reversed once so the window s_i, s_(i-1), ... is a right shift of it.
+    """
+    rev = int(format(seq, f"0{n}b")[::-1], 2) if n else 0
+    c, b = 1, 1
+    length, m = 0, 1
+    for i in range(n):
+        if (c & (rev >> (n - 1 - i))).bit_count() & 1:
+            t = c
+            c ^= b << m
+            if 2 * length <= i:
+                length = i + 1 - length
+                b = t
+                m = 1
+                continue
+        m += 1
+    return length
+
+
+def complexity_test(data, block_bits: int) -> dict:
+    """
+    SP 800-22 linear complexity test over the whole `block_bits` blocks
+    of `data` (bits LSB-first). Returns the block count, class counts,
+    chi-square (6 degrees of freedom) and p-value.
+    """
+    blocks = 8 * len(data) // block_bits
+    value = int.from_bytes(data, "little")
+    mask = (1 << block_bits) - 1
+    sign = -1 if block_bits % 2 else 1
+    mu = block_bits / 2 + (9 - sign) / 36 - (block_bits / 3 + 2 / 9) / 2 ** block_bits
+    nu = [0] * len(CLASS_PROBS)
+    for j in range(blocks):
+        lc = berlekamp_massey((value >> (j * block_bits)) & mask, block_bits)
+        t = sign * (lc - mu) + 2 / 9
+        nu[min(6, max(0, math.ceil(t + 2.5)))] += 1
+    chi2 = sum((v - blocks * p) ** 2 / (blocks * p) for v, p in zip(nu, CLASS_PROBS)) if blocks else 0.0
+    x = chi2 / 2
+    # igamc(3, x) has a closed form for the integer shape 6/2.
+    p_value = math.exp(-x) * (1 + x + x * x / 2)
+    return {"blocks": blocks, "nu": nu, "chi2": chi2, "p_value": p_value}
+
+
+def _serve(tasks, results, block_bits: int):
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        proc, offset, stream_off, data = task
+        try:
+            res = complexity_test(data, block_bits)
+        except Exception as e:
+            results.put({"proc": proc, "error": repr(e)})
+            continue
+        res.update({"proc": proc, "block_offset": offset, "bits": 8 * len(data)})
+        if stream_off is not None:
+            res["stream_offset"] = stream_off
+        results.put(res)
+
+
+class LinearComplexityPool:
+    """
+    Side processes running the linear complexity test on sampled blocks.
+
+    Workers put (proc, bit_offset, stream_offset, bytes) on `tasks` with
+    `put_nowait` and drop the sample when it is full, so the O(M²)
+    Berlekamp–Massey cost never blocks the online tests. A thread
+    forwards results to the queue given to `attach` (the workers' queue,
+    created after this pool): p-values below alpha become ANOMALY events
+    (test LINCOMP) tagged with the sample's block offset.
+    """
+
+    def __init__(self, processes: int = 1, block_bits: int = 500, alpha: float = 1e-6, max_pending: int = 16):
+        if not (0 < alpha < 1):
+            raise ValueError("alpha must be in (0,1)")
+        if block_bits < 2 or processes <= 0 or max_pending <= 0:
+            raise ValueError("block_bits must be >= 2, processes and max_pending > 0")
+        self.queue_out = None
+        self._attached = threading.Event()
+        self.block_bits = block_bits
+        self.alpha = alpha
+        self.tasks = mp.Queue(maxsize=max_pending)
+        self.results = mp.Queue()
+        self.samples = 0
+        self.blocks = 0
+        self.anomalies = 0
+        self.errors = 0
+        self.min_p = None
+        self.procs = [mp.Process(target=_serve, args=(self.tasks, self.results, block_bits), daemon=True)
+                      for _ in range(processes)]
+        for p in self.procs:
+            p.start()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._forward, name="lincomp-forward", daemon=True)
+        self._thread.start()
+
+    def attach(self, queue_out):
+        self.queue_out = queue_out
+        self._attached.set()
+
+    def _forward(self):
+        while not self._attached.wait(0.2):
+            if self._stop.is_set():
+                return
+        while True:
+            try:
+                res = self.results.get(timeout=0.2)
+            except queue.Empty:
+                if self._stop.is_set():
+                    break
+                continue
+            except (EOFError, OSError):
+                break
+            if "error" in res:
+                self.errors += 1
+                continue
+            self.samples += 1
+            self.blocks += res["blocks"]
+            p = res["p_value"]
+            self.min_p = p if self.min_p is None else min(self.min_p, p)
+            if res["blocks"] >= MIN_BLOCKS and p < self.alpha:
+                self.anomalies += 1
+                evt = {
+                    "test": "LINCOMP",
+                    "block_bits": self.block_bits,
+                    **res,
+                    "detected_at": time.time(),
+                    "message": f"Linear complexity of {res['blocks']} blocks of {self.block_bits} bits "
+                               f"off (p={p:.2e} < {self.alpha:g})",
+                }
+                self.queue_out.put(("ANOMALY", evt))
+
+    def stats(self) -> dict:
+        return {
+            "block_bits": self.block_bits,
+            "samples": self.samples,
+            "blocks": self.blocks,
+            "anomalies": self.anomalies,
+            "errors": self.errors,
+            "min_p": self.min_p,
+        }
+
+    def close(self, timeout: float = 1.0):
+        for _ in self.procs:
+            try:
+                self.tasks.put_nowait(None)
+            except queue.Full:
+                break
+        for p in self.procs:
+            p.join(timeout=timeout)
+            if p.is_alive():
+                p.terminate()
+                p.join(timeout=timeout)
+        self._stop.set()
+        self._thread.join(timeout=timeout)
@@ -0,0 +1,186 @@
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .collector import parse_address
+
+
+# Upper bounds (seconds) of the detection -> emission latency histogram.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        out = []
+        acc = 0
+        sep = "," if labels else ""
+        for bound, n in zip(self.bounds, self.counts):
+            acc += n
+            out.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {acc}')
+        out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+def _num(value) -> str:
+    if value is None or value != value:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    Scrape-side view of a run.
+
+    The main loop calls `anomaly(payload)` once per ANOMALY (a counter
+    and a histogram update); everything else is read from the Aggregator,
+    the worker queue and the output writer when `/metrics` is rendered,
+    so scrapes add nothing to the per-message path.
+    """
+
+    def __init__(self, agg, queue=None, output=None):
+        self.agg = agg
+        self.queue = queue
+        self.output = output
+        self.t_start = time.time()
+        self.anomalies_by_test = {}
+        self.latency = {}
+        self.lock = threading.Lock()
+
+    def anomaly(self, payload: dict):
+        test = payload.get("test", "unknown")
+        detected = payload.get("detected_at")
+        with self.lock:
+            self.anomalies_by_test[test] = self.anomalies_by_test.get(test, 0) + 1
+            if detected is not None:
+                hist = self.latency.get(test)
+                if hist is None:
+                    hist = self.latency[test] = Histogram()
+                hist.observe(max(0.0, time.time() - detected))
+
+    def queue_depth(self) -> int | None:
+        if self.queue is None:
+            return None
+        try:
+            return self.queue.qsize()
+        except NotImplementedError:
+            return None
+
+    def render(self) -> str:
+        agg = self.agg
+        procs = sorted(dict(agg.procs).items())
+        lines = [
+            "# HELP rng_anomaly_up Detector process is running.",
+            "# TYPE rng_anomaly_up gauge",
+            "rng_anomaly_up 1",
+            "# HELP rng_anomaly_elapsed_seconds Seconds since the run started.",
+            "# TYPE rng_anomaly_elapsed_seconds gauge",
+            f"rng_anomaly_elapsed_seconds {time.time() - self.t_start}",
+        ]
+        for name, kind, help_text, idx in (
+            ("rng_anomaly_bits", "counter", "Bits processed per worker.", 1),
+            ("rng_anomaly_ones", "counter", "One bits seen per worker.", 2),
+            ("rng_anomaly_bps", "gauge", "Throughput per worker (bits/s).", 0),
+        ):
+            metric = f"{name}_total" if kind == "counter" else name
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for pid, slot in procs:
+                lines.append(f'{metric}{{proc="{pid}"}} {_num(slot[idx])}')
+        lines += [
+            "# HELP rng_anomaly_aggregate_bps Sum of worker throughput (bits/s).",
+            "# TYPE rng_anomaly_aggregate_bps gauge",
+            f"rng_anomaly_aggregate_bps {_num(agg.bps_total)}",
+        ]
+        with self.lock:
+            by_test = sorted(self.anomalies_by_test.items())
+            hists = [(t, h.lines("rng_anomaly_event_latency_seconds", f'test="{t}"'))
+                     for t, h in sorted(self.latency.items())]
+        lines.append("# HELP rng_anomaly_anomalies_total ANOMALY events per test.")
+        lines.append("# TYPE rng_anomaly_anomalies_total counter")
+        for test, n in by_test:
+            lines.append(f'rng_anomaly_anomalies_total{{test="{test}"}} {n}')
+        lines.append("# HELP rng_anomaly_event_latency_seconds Worker detection to main-process emission.")
+        lines.append("# TYPE rng_anomaly_event_latency_seconds histogram")
+        for _, hl in hists:
+            lines += hl
+        depth = self.queue_depth()
+        if depth is not None:
+            lines += [
+                "# HELP rng_anomaly_queue_depth Messages waiting in the worker queue.",
+                "# TYPE rng_anomaly_queue_depth gauge",
+                f"rng_anomaly_queue_depth {depth}",
+            ]
+        if self.output is not None:
+            st = self.output.stats()
+            lines += [
+                "# HELP rng_anomaly_output_pending Records waiting for the output writer.",
+                "# TYPE rng_anomaly_output_pending gauge",
+                f"rng_anomaly_output_pending {st['pending']}",
+                "# HELP rng_anomaly_output_dropped_total ITER/heartbeat records dropped on a full buffer.",
+                "# TYPE rng_anomaly_output_dropped_total counter",
+                f"rng_anomaly_output_dropped_total {st['dropped']}",
+                "# HELP rng_anomaly_sink_flush_seconds_max Slowest batch write+flush per sink.",
+                "# TYPE rng_anomaly_sink_flush_seconds_max gauge",
+            ]
+            for name, s in st["sinks"].items():
+                lines.append(f'rng_anomaly_sink_flush_seconds_max{{sink="{name}"}} {s["flush_ms_max"] / 1000.0}')
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class MetricsServer:
+    """
+    Serve `/metrics` for `metrics` on a daemon thread. `address` is
+    "host:port" (port 0 picks a free one; see `port`).
+    """
+
+    def __init__(self, address: str, metrics: Metrics):
+        kind, where = parse_address(address)
+        if kind != "tcp":
+            raise ValueError("metrics endpoint needs a TCP address (host:port)")
+        handler = type("MetricsHandler", (_Handler,), {"metrics": metrics})
+        self.httpd = ThreadingHTTPServer(where, handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.5}, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join(timeout=2.0)
@@ -0,0 +1,310 @@
+import math
+import time
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from .worker import build_tests
+from .sources import chunk_stream_synthetic, SYNTHETIC_BLOCK_BYTES
+
+
+CORE_TESTS = ("RCT", "APT", "SPRT", "ZMONO")
+ALIASES = {"Z": "ZMONO"}
+
+
+def parse_stages(spec: str, ztest_enabled: bool = False, extras: dict | None = None) -> list[list[str]]:
+    """
+    Split the enabled tests between pipeline stages. `spec` lists stages
+    separated by commas and their tests by '+', e.g. "RCT+APT,SPRT+Z,SERIAL"
+    (names as in ANOMALY events, Z for ZMONO); "auto" gives RCT+APT,
+    SPRT(+ZMONO) and one stage with the optional tests. Every enabled test
+    must be in exactly one stage.
+    """
+    enabled = ["RCT", "APT", "SPRT"] + (["ZMONO"] if ztest_enabled else []) + list(extras or {})
+    if spec == "auto":
+        stages = [["RCT", "APT"], ["SPRT"] + (["ZMONO"] if ztest_enabled else [])]
+        if extras:
+            stages.append(list(extras))
+        return stages
+    stages = []
+    for part in spec.split(","):
+        names = [n.strip().upper() for n in part.split("+") if n.strip()]
+        if not names:
+            raise ValueError(f"empty stage in {spec!r}")
+        stages.append([ALIASES.get(n, n) for n in names])
+    listed = [n for stage in stages for n in stage]
+    unknown = [n for n in listed if n not in enabled]
+    if unknown:
+        raise ValueError(f"tests not enabled: {', '.join(unknown)}")
+    twice = sorted({n for n in listed if listed.count(n) > 1})
+    if twice:
+        raise ValueError(f"tests in more than one stage: {', '.join(twice)}")
+    missing = [n for n in enabled if n not in listed]
+    if missing:
+        raise ValueError(f"tests in no stage: {', '.join(missing)}")
+    return stages
+
+
+def _stage_stats(names: list[str], by_name: dict) -> dict:
+    snap = {}
+    for name in names:
+        test = by_name[name]
+        if name == "RCT":
+            snap["rct_run_len"] = test.run_len
+        elif name == "APT":
+            snap.update({
+                "apt_window": test.window,
+                "apt_len": test.filled,
+                "apt_ones": test.ones,
+                "apt_pct": (test.ones / test.filled) if test.filled > 0 else None,
+            })
+        elif name == "SPRT":
+            snap.update({"sprt_up": test.s_up, "sprt_dn": test.s_dn})
+        elif name not in CORE_TESTS:
+            snap.update(test.stats())
+    return snap
+
+
+def _stage(index: int, names: list[str], shm, slot_bytes: int, inbox, credit, results, test_kwargs: dict):
+    try:
+        extras = {k: v for k, v in (test_kwargs.get("extras") or {}).items() if k in names}
+        kwargs = dict(test_kwargs, extras=extras)
+        _, _, _, tests = build_tests(**kwargs)
+        order = ["RCT", "APT", "SPRT"] + (["ZMONO"] if kwargs.get("ztest_enabled") else []) + list(extras)
+        by_name = dict(zip(order, tests))
+        mine = [by_name[n] for n in names]
+        while True:
+            msg = inbox.get()
+            if msg is None:
+                break
+            seq, slot, size = msg
+            data = shm.buf[slot * slot_bytes:slot * slot_bytes + size]
+            events = []
+            for test in mine:
+                evt = test.update_bytes(data)
+                if evt is not None:
+                    offset = evt["offset"]
+                    prefix = int.from_bytes(data[:offset // 8 + 1], "little") & ((1 << (offset + 1)) - 1)
+                    evt["prefix_ones"] = prefix.bit_count()
+                    events.append(evt)
+            del data
+            credit.release()
+            # Stats as of this chunk (cheap next to the update), so events
+            # carry the state at the end of their chunk like a block worker.
+            results.put(("CHUNK", index, seq, events, _stage_stats(names, by_name)))
+        results.put(("FINAL", index, _stage_stats(names, by_name)))
+    except Exception as e:
+        results.put(("ERROR", {"proc": 0, "stage": index, "error": repr(e)}))
+
+
+def _read(shm, slots: int, slot_bytes: int, credits: list, inboxes: list, results, source_path: str,
+          use_synthetic: bool, synthetic_p: float, synthetic_seed: int | None, chunk_size: int,
+          max_bits: int | None, max_seconds: float | None):
+    f = None
+    try:
+        t0 = time.perf_counter()
+        if use_synthetic:
+            gen = chunk_stream_synthetic(p=synthetic_p, seed=synthetic_seed, chunk_size=chunk_size)
+        else:
+            f = open(source_path, "rb", buffering=0)
+        seq = bits = 0
+        while max_bits is None or bits < max_bits:
+            # One credit per stage: the slot is free once every stage
+            # has finished the chunk `slots` places back.
+            for c in credits:
+                c.acquire()
+            base = (seq % slots) * slot_bytes
+            want = slot_bytes if max_bits is None else min(slot_bytes, math.ceil((max_bits - bits) / 8))
+            if f is not None:
+                view = shm.buf[base:base + want]
+                size = f.readinto(view) or 0
+                del view
+            else:
+                data = next(gen)[:want]
+                size = len(data)
+                shm.buf[base:base + size] = data
+            if size == 0:
+                break
+            ones = int.from_bytes(shm.buf[base:base + size], "little").bit_count()
+            results.put(("READ", seq, size, ones))
+            for box in inboxes:
+                box.put((seq, seq % slots, size))
+            seq += 1
+            bits += 8 * size
+            if max_seconds is not None and (time.perf_counter() - t0) >= max_seconds:
+                break
+        for box in inboxes:
+            box.put(None)
+        results.put(("EOF", seq))
+    except Exception as e:
+        results.put(("ERROR", {"proc": 0, "stage": "reader", "error": repr(e)}))
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _merge(stages: list[list[str]], results, queue_out, stop, shm, use_synthetic: bool, report_interval: float,
+           stop_on_anomaly: bool, per_iter: bool, iter_sample: int):
+    pending = {}
+    stats = {}
+    final = {}
+    next_seq = 0
+    eof = None
+    finished = 0
+    bits = ones = 0
+    sample = max(1, iter_sample)
+    t0 = last_report = time.perf_counter()
+
+    def state(now: float) -> dict:
+        return {
+            "proc": 0,
+            "bits_processed": bits,
+            "ones_total": ones,
+            "ones_pct": (ones / bits) if bits else None,
+            **stats,
+            "bps": bits / (now - t0) if now > t0 else float("nan"),
+        }
+
+    try:
+        while not stop.is_set():
+            try:
+                msg = results.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            kind = msg[0]
+            if kind == "ERROR":
+                queue_out.put(msg)
+                return
+            if kind == "READ":
+                entry = pending.setdefault(msg[1], [None, 0, 0, [], {}])
+                entry[0], entry[1] = msg[2], msg[3]
+            elif kind == "CHUNK":
+                _, index, seq, events, st = msg
+                entry = pending.setdefault(seq, [None, 0, 0, [], {}])
+                entry[2] += 1
+                for evt in events:
+                    evt["stage"] = index
+                entry[3] += events
+                # Stages run ahead of the release: their stats apply only
+                # once the chunk is released.
+                entry[4].update(st)
+            elif kind == "FINAL":
+                final.update(msg[2])
+                finished += 1
+            elif kind == "EOF":
+                eof = msg[1]
+
+            # Chunks are released in stream order once the reader and every
+            # stage have reported them.
+            while next_seq in pending and pending[next_seq][0] is not None \
+                    and pending[next_seq][2] == len(stages):
+                size, ones_chunk, _, events, st = pending.pop(next_seq)
+                next_seq += 1
+                stats.update(st)
+                bits_before, ones_before = bits, ones
+                bits += 8 * size
+                ones += ones_chunk
+                if per_iter and (bits // sample) > (bits_before // sample):
+                    queue_out.put((
+                        "ITER",
+                        {
+                            "proc": 0,
+                            "bits_processed": bits,
+                            "ones_total": ones,
+                            "zeros_total": bits - ones,
+                            "ones_pct": ones / bits,
+                            "zeros_pct": (bits - ones) / bits,
+                        },
+                    ))
+                if not events:
+                    continue
+                snap = state(time.perf_counter())
+                wall = time.time()
+                for evt in sorted(events, key=lambda e: (e["offset"], e["stage"])):
+                    offset = evt.pop("offset")
+                    ones_at = ones_before + evt.pop("prefix_ones")
+                    evt.update(snap)
+                    evt.update({
+                        "bits_processed": bits_before + offset + 1,
+                        "ones_total": ones_at,
+                        "ones_pct": ones_at / (bits_before + offset + 1),
+                    })
+                    if use_synthetic:
+                        evt["stream_offset"] = bits_before + offset
+                    evt["detected_at"] = wall
+                    queue_out.put(("ANOMALY", evt))
+                if stop_on_anomaly:
+                    return
+
+            now = time.perf_counter()
+            if (now - last_report) >= report_interval:
+                queue_out.put(("STATS", state(now)))
+                last_report = now
+            if eof is not None and next_seq == eof and finished == len(stages):
+                stats.update(final)
+                done = state(time.perf_counter())
+                for key in ("rct_run_len", "sprt_up", "sprt_dn"):
+                    done.pop(key, None)
+                done["pipeline_stages"] = ["+".join(s) for s in stages]
+                queue_out.put(("DONE", done))
+                return
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def launch_pipeline(stages: list[list[str]], kwargs: dict, slots: int = 8) -> tuple:
+    """
+    Run one stream through `stages` (see `parse_stages`) on separate cores.
+
+    A reader process copies each chunk once into a shared-memory ring of
+    `slots` chunk slots (device reads land there directly), every stage
+    process runs its tests on the slot in place, and a slot is reused only
+    after all stages have released it, so the slowest stage sets the pace.
+    A thread in this process merges the per-chunk results in stream order
+    into the STATS/ANOMALY/ITER/DONE messages of a single block-engine
+    worker (proc 0); events also carry their `stage`. `kwargs` are the
+    `worker` keyword arguments for that stream. Returns (queue, handles,
+    stop_event) for `stop_workers`.
+    """
+    if slots < 2:
+        raise ValueError("slots must be >= 2")
+    chunk_size = kwargs.get("chunk_size", 1 << 16)
+    use_synthetic = kwargs.get("use_synthetic", False)
+    slot_bytes = max(chunk_size, SYNTHETIC_BLOCK_BYTES) if use_synthetic else chunk_size
+    test_kwargs = {
+        "alpha": kwargs["alpha"],
+        "beta": kwargs["beta"],
+        "delta": kwargs["delta"],
+        "apt_window": kwargs["apt_window"],
+        "ztest_enabled": kwargs.get("ztest_enabled", False),
+        "z_alpha": kwargs.get("z_alpha"),
+        "z_min_bits": kwargs.get("z_min_bits", 10000),
+        "thresholds": kwargs.get("thresholds"),
+        "extras": kwargs.get("extras"),
+    }
+    report_interval = kwargs.get("report_interval", 0.5)
+
+    shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+    results = mp.Queue()
+    credits = [mp.Semaphore(slots) for _ in stages]
+    inboxes = [mp.Queue() for _ in stages]
+    q = queue.Queue()
+    stop = threading.Event()
+    handles = []
+    for i, names in enumerate(stages):
+        handles.append(mp.Process(target=_stage, daemon=True, args=(
+            i, names, shm, slot_bytes, inboxes[i], credits[i], results, test_kwargs)))
+    handles.append(mp.Process(target=_read, daemon=True, args=(
+        shm, slots, slot_bytes, credits, inboxes, results, kwargs.get("source_path"), use_synthetic,
+        kwargs.get("synthetic_p", 0.5), kwargs.get("synthetic_seed"), chunk_size,
+        kwargs.get("max_bits"), kwargs.get("max_seconds"))))
+    handles.append(threading.Thread(target=_merge, name="pipeline-merge", daemon=True, args=(
+        stages, results, q, stop, shm, use_synthetic, report_interval, kwargs.get("stop_on_anomaly", True),
+        kwargs.get("per_iter", False), kwargs.get("iter_sample", 1))))
+    for h in handles:
+        h.start()
+    return q, handles, stop
@@ -0,0 +1,280 @@
+import time
+import queue
+import threading
+import importlib.util
+import multiprocessing as mp
+
+
+# Figures known to the renderer. `x_div` converts seconds to the axis unit.
+FIGURES = {
+    "bias": {"title": "Bias per window — 100*(1s-0s) = 200*ones% - 100", "xlabel": "Time (min)",
+             "x_div": 60.0, "min_window": 0.5},
+    "macro": {"title": "Hourly bias — 100*(1s-0s)", "xlabel": "Time (hours)",
+              "x_div": 3600.0, "min_window": 1.0},
+}
+
+
+def figure_spec(name: str, window: float, save: str | None = None) -> dict:
+    """Renderer spec for one of FIGURES; `window` is in axis units."""
+    return {"name": name, **FIGURES[name], "window": window, "save": save}
+
+
+def decimate_minmax(xs, ys, x0: float, x1: float, width_px: int):
+    """
+    Reduce the points of sorted `xs` inside [x0, x1] to at most two per
+    pixel column (the min and the max, at the column's first x), which
+    keeps the visual envelope of the series.
+    """
+    import numpy as np
+    i0 = int(np.searchsorted(xs, x0, side="left"))
+    i1 = int(np.searchsorted(xs, x1, side="right"))
+    x, y = xs[max(0, i0 - 1):i1 + 1], ys[max(0, i0 - 1):i1 + 1]
+    width_px = max(1, int(width_px))
+    if len(x) <= 2 * width_px or x1 <= x0:
+        return x, y
+    cols = np.clip(((x - x0) * (width_px / (x1 - x0))).astype(np.int64), -1, width_px)
+    starts = np.flatnonzero(np.diff(cols, prepend=cols[0] - 1))
+    lo = np.minimum.reduceat(y, starts)
+    hi = np.maximum.reduceat(y, starts)
+    return np.repeat(x[starts], 2), np.column_stack((lo, hi)).ravel()
+
+
+class _Series:
+    """
+    Growable float64 arrays (amortized doubling) holding at most
+    `max_points`; past that the oldest half is dropped in place.
+    """
+
+    def __init__(self, max_points: int = 1 << 20):
+        import numpy as np
+        self.np = np
+        self.max_points = max(1024, int(max_points))
+        self.xs = np.empty(1024)
+        self.ys = np.empty(1024)
+        self.n = 0
+
+    def extend(self, points):
+        points = points[-self.max_points:]
+        if self.n + len(points) > self.max_points:
+            keep = min(self.n, self.max_points // 2, self.max_points - len(points))
+            for arr in (self.xs, self.ys):
+                arr[:keep] = arr[self.n - keep:self.n]
+            self.n = keep
+        need = self.n + len(points)
+        if need > len(self.xs):
+            cap = max(need, 2 * len(self.xs))
+            for name in ("xs", "ys"):
+                arr = self.np.empty(cap)
+                arr[:self.n] = getattr(self, name)[:self.n]
+                setattr(self, name, arr)
+        for i, (x, y) in enumerate(points, self.n):
+            self.xs[i] = x
+            self.ys[i] = y
+        self.n = need
+
+    def view(self):
+        return self.xs[:self.n], self.ys[:self.n]
+
+
+class _LivePlot:
+    """
+    One figure with a fixed set of artists: the series line (animated, so
+    it is only drawn by blitting) and a single zero line. The background
+    is re-rendered only when the axis limits have to move.
+    """
+
+    def __init__(self, plt, spec: dict, interactive: bool):
+        import matplotlib.ticker as mticker
+        self.spec = spec
+        self.series = _Series()
+        self.fig, self.ax = plt.subplots()
+        ax = self.ax
+        ax.set_title(spec["title"])
+        ax.set_xlabel(spec["xlabel"])
+        ax.set_ylabel("Bias (percentage points)")
+        ax.grid(True, alpha=0.3)
+        ax.xaxis.set_major_formatter(mticker.FormatStrFormatter('%.1f'))
+        ax.axhline(0.0, color="#888", lw=0.8)
+        self.line, = ax.plot([], [], "-", lw=2.0, animated=interactive)
+        self.interactive = interactive and getattr(self.fig.canvas, "supports_blit", False)
+        self.background = None
+        self.xlim = None
+        self.dirty = False
+        if self.interactive:
+            self.fig.canvas.mpl_connect("draw_event", self._on_draw)
+            plt.show(block=False)
+
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.ax.draw_artist(self.line)
+
+    def _window(self) -> float:
+        return max(self.spec["min_window"], float(self.spec["window"]))
+
+    def _set_data(self, x0: float, x1: float):
+        xs, ys = self.series.view()
+        width = self.ax.bbox.width
+        dx, dy = decimate_minmax(xs, ys, x0, x1, width)
+        self.line.set_data(dx, dy)
+        return dy
+
+    def render(self):
+        if not self.dirty or self.series.n == 0:
+            return
+        self.dirty = False
+        xs, _ = self.series.view()
+        win = self._window()
+        x_last = float(xs[-1])
+        relayout = self.background is None
+        if self.xlim is None or not (self.xlim[0] <= x_last <= self.xlim[1]):
+            # Leave 10% of the window ahead so limits move in steps.
+            x0 = max(min(0.0, float(xs[0])), x_last - win)
+            self.xlim = (x0, x0 + win * 1.1)
+            self.ax.set_xlim(*self.xlim)
+            relayout = True
+        lo, hi = self.xlim
+        dy = self._set_data(lo, hi)
+        if len(dy):
+            y_lo, y_hi = float(dy.min()), float(dy.max())
+            c_lo, c_hi = self.ax.get_ylim()
+            span = max(y_hi - y_lo, 1e-9)
+            if y_lo < c_lo or y_hi > c_hi or (c_hi - c_lo) > 4 * span + 1e-6:
+                pad = 0.15 * span
+                self.ax.set_ylim(min(y_lo - pad, -pad), max(y_hi + pad, pad))
+                relayout = True
+        canvas = self.fig.canvas
+        if relayout:
+            canvas.draw()
+            canvas.blit(self.fig.bbox)
+        else:
+            canvas.restore_region(self.background)
+            self.ax.draw_artist(self.line)
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def save(self, path: str):
+        xs, ys = self.series.view()
+        self.line.set_animated(False)
+        if self.series.n:
+            x0, x1 = float(xs[0]), float(xs[-1])
+            self.ax.set_xlim(x0, x1 if x1 > x0 else x0 + self._window())
+            dy = self._set_data(x0, x1)
+            if len(dy):
+                pad = 0.15 * max(float(dy.max() - dy.min()), 1e-9)
+                self.ax.set_ylim(min(float(dy.min()) - pad, -pad), max(float(dy.max()) + pad, pad))
+        self.fig.savefig(path)
+
+
+def render_main(conn, specs: list[dict], interval: float):
+    """
+    Render process: read point batches from `conn`, redraw every
+    `interval` seconds, save the requested PNGs when the pipe closes.
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+    interactive = matplotlib.get_backend().lower() not in ("agg", "pdf", "ps", "svg", "cairo", "template")
+    if interactive:
+        plt.ion()
+    plots = {s["name"]: _LivePlot(plt, s, interactive) for s in specs}
+    last_draw = 0.0
+    running = True
+    while running:
+        try:
+            ready = conn.poll(min(0.05, interval))
+        except (EOFError, OSError):
+            break
+        while ready:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                running = False
+                break
+            if msg is None:
+                running = False
+                break
+            for name, points in msg.items():
+                p = plots.get(name)
+                if p is not None:
+                    p.series.extend(points)
+                    p.dirty = True
+            ready = conn.poll(0)
+        now = time.perf_counter()
+        if interactive:
+            if now - last_draw >= interval:
+                last_draw = now
+                for p in plots.values():
+                    if p.interactive:
+                        try:
+                            p.render()
+                        except Exception:
+                            pass
+            for p in plots.values():
+                p.fig.canvas.flush_events()
+    for s in specs:
+        if s.get("save"):
+            try:
+                plots[s["name"]].save(s["save"])
+            except Exception:
+                pass
+    conn.close()
+
+
+class PlotClient:
+    """
+    Main-process side of the renderer. `add` only queues a point; a
+    sender thread batches queued points into one pipe message per
+    `interval`, so the drain loop never waits on matplotlib. Points that
+    do not fit in the bounded queue are dropped and counted.
+    """
+
+    def __init__(self, specs: list[dict], interval: float = 0.5, max_pending: int = 100000):
+        if importlib.util.find_spec("matplotlib") is None:
+            raise RuntimeError("matplotlib is not installed")
+        ctx = mp.get_context("spawn")
+        recv_end, self._send_end = ctx.Pipe(duplex=False)
+        self.interval = max(0.02, float(interval))
+        self.proc = ctx.Process(target=render_main, args=(recv_end, specs, self.interval), daemon=True)
+        self.proc.start()
+        recv_end.close()
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, name: str, t_sec: float, ones_ratio: float):
+        """Queue a bucket point: time in seconds, plotted as bias in pp."""
+        try:
+            self.pending.put_nowait((name, t_sec / FIGURES[name]["x_div"], (2.0 * ones_ratio - 1.0) * 100.0))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        alive = True
+        while alive and not (self._stop.is_set() and self.pending.empty()):
+            self._stop.wait(self.interval)
+            batch = {}
+            while True:
+                try:
+                    name, x, y = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                batch.setdefault(name, []).append((x, y))
+            if batch:
+                try:
+                    self._send_end.send(batch)
+                except (OSError, ValueError):
+                    alive = False
+        try:
+            self._send_end.send(None)
+        except (OSError, ValueError):
+            pass
+
+    def close(self, timeout: float = 30.0):
+        """Flush queued points, let the renderer save its PNGs and exit."""
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self.proc.join(timeout=timeout)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self._send_end.close()
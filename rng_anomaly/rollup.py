@@ -0,0 +1,164 @@
+import sys
+import json
+import time
+import struct
+import argparse
+from array import array
+from datetime import datetime, timezone
+
+from .checkpoint import write_atomic, seal, unseal, to_le, from_le
+
+
+# (name, slot length in seconds, slots kept). 24 bytes per slot: about
+# 260 KB for one hour of seconds, a day of minutes, 90 days of hours and
+# ten years of days.
+DEFAULT_LEVELS = (
+    ("second", 1, 3600),
+    ("minute", 60, 1440),
+    ("hour", 3600, 2160),
+    ("day", 86400, 3650),
+)
+
+MAGIC = b"RNGR"
+VERSION = 1
+_HEAD = struct.Struct("<4sBH")
+_LEVEL = struct.Struct("<16sII")
+
+
+class Level:
+    """
+    Fixed-size ring of time slots. Slot `k` covers [k*span, (k+1)*span)
+    seconds of Unix time and lives at position k % capacity; `ids` tells
+    whether a position still holds that slot or an older one it replaced.
+    """
+
+    def __init__(self, name: str, span: int, capacity: int):
+        self.name = name
+        self.span = int(span)
+        self.capacity = int(capacity)
+        self.ids = array("q", [-1]) * self.capacity
+        self.bits = array("Q", [0]) * self.capacity
+        self.ones = array("Q", [0]) * self.capacity
+
+    def add(self, t: float, bits: int, ones: int):
+        slot = int(t // self.span)
+        pos = slot % self.capacity
+        if self.ids[pos] != slot:
+            self.ids[pos] = slot
+            self.bits[pos] = 0
+            self.ones[pos] = 0
+        self.bits[pos] += bits
+        self.ones[pos] += ones
+
+    def series(self, t0: float, t1: float) -> list[tuple[float, int, int]]:
+        """(slot start, bits, ones) for the non-empty slots in [t0, t1), oldest first."""
+        first = max(int(t0 // self.span), int(t1 // self.span) - self.capacity + 1)
+        out = []
+        for slot in range(first, int(-(-t1 // self.span))):
+            pos = slot % self.capacity
+            if self.ids[pos] == slot and self.bits[pos] > 0:
+                out.append((slot * self.span, self.bits[pos], self.ones[pos]))
+        return out
+
+
+class Rollup:
+    """
+    Bits/ones aggregated at several resolutions at once. `add` costs one
+    ring update per level; memory is fixed by the level capacities.
+    """
+
+    def __init__(self, levels=DEFAULT_LEVELS):
+        self.levels = {name: Level(name, span, cap) for name, span, cap in levels}
+
+    def add(self, t: float, bits: int, ones: int):
+        if bits <= 0:
+            return
+        for level in self.levels.values():
+            level.add(t, bits, ones)
+
+    def series(self, level: str, t0: float, t1: float) -> list[tuple[float, int, int]]:
+        return self.levels[level].series(t0, t1)
+
+    def ratios(self, level: str, t0: float, t1: float) -> list[tuple[float, float]]:
+        """(slot midpoint, ones ratio) per non-empty slot."""
+        span = self.levels[level].span
+        return [(t + span / 2.0, ones / bits) for t, bits, ones in self.series(level, t0, t1)]
+
+    def encode(self) -> bytes:
+        out = [_HEAD.pack(MAGIC, VERSION, len(self.levels))]
+        for lv in self.levels.values():
+            out.append(_LEVEL.pack(lv.name.encode("ascii"), lv.span, lv.capacity))
+            out += [to_le(lv.ids), to_le(lv.bits), to_le(lv.ones)]
+        return seal(b"".join(out))
+
+    def restore(self, data: bytes):
+        """
+        Load levels saved by `encode`. Levels whose span or capacity no
+        longer match the configuration are skipped. Raises ValueError on
+        a damaged or foreign file.
+        """
+        data = unseal(data)
+        if len(data) < _HEAD.size:
+            raise ValueError("rollup file truncated")
+        magic, version, count = _HEAD.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a rollup file (or unsupported version)")
+        off = _HEAD.size
+        for _ in range(count):
+            raw_name, span, cap = _LEVEL.unpack_from(data, off)
+            off += _LEVEL.size
+            if off + 24 * cap > len(data):
+                raise ValueError("rollup file truncated")
+            arrays = []
+            for code in ("q", "Q", "Q"):
+                arrays.append(from_le(code, data[off:off + 8 * cap]))
+                off += 8 * cap
+            lv = self.levels.get(raw_name.rstrip(b"\0").decode("ascii"))
+            if lv is not None and lv.span == span and lv.capacity == cap:
+                lv.ids, lv.bits, lv.ones = arrays
+
+    def save(self, path: str):
+        write_atomic(path, self.encode())
+
+    @classmethod
+    def load(cls, path: str, levels=DEFAULT_LEVELS) -> "Rollup":
+        """Rollup restored from `path`, or an empty one if there is no file."""
+        rollup = cls(levels)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return rollup
+        rollup.restore(data)
+        return rollup
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly rollup",
+        description="Print the bias history kept in a --rollup-file.",
+    )
+    ap.add_argument("path", help="Rollup file written with --rollup-file.")
+    ap.add_argument("--level", choices=[name for name, _, _ in DEFAULT_LEVELS], default="hour",
+                    help="Resolution (default hour).")
+    ap.add_argument("--since", default="30d",
+                    help="Start time: ISO-8601 (UTC if naive) or an age like 30d, 12h (default 30d).")
+    ap.add_argument("--until", default=None, help="End time (exclusive), same formats as --since.")
+    args = ap.parse_args(argv)
+
+    from .store import parse_time
+    try:
+        rollup = Rollup.load(args.path)
+        t0 = parse_time(args.since)
+        t1 = parse_time(args.until) if args.until else time.time()
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    for t, bits, ones in rollup.series(args.level, t0, t1):
+        print(json.dumps({
+            "t": datetime.fromtimestamp(t, timezone.utc).isoformat(),
+            "bits": bits,
+            "ones": ones,
+            "ones_ratio": ones / bits,
+            "bias_pp": 200.0 * ones / bits - 100.0,
+        }, ensure_ascii=False))
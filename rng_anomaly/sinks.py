@@ -0,0 +1,338 @@
+import os
+import sys
+import json
+import time
+import queue
+import struct
+import threading
+
+
+# Binary log: file magic + version, then records of
+# (1-byte kind, float64 unix time, 4-byte big-endian length, payload).
+BINLOG_MAGIC = b"RNGL"
+BINLOG_VERSION = 1
+BINLOG_HEADER = struct.Struct(">BdI")
+REC_JSON = 1
+REC_ITER = 2
+REC_HEARTBEAT = 3
+REC_STAT = 4
+
+# ITER: proc, bits, ones.  Heartbeat: elapsed, procs, bits, ones,
+# window_len, window_ones, bps.  STAT (proc, done flag, bits, ones,
+# apt_len, apt_ones, bps) is only read: older logs stored DONE that way.
+ITER_STRUCT = struct.Struct(">IQQ")
+HEARTBEAT_STRUCT = struct.Struct(">dIQQQQd")
+STAT_STRUCT = struct.Struct(">IBQQIId")
+
+# Records of these kinds may be dropped when the buffer is full.
+DROPPABLE = frozenset({"ITER", "heartbeat"})
+
+
+def record_kind(record: dict) -> str:
+    if "event" in record:
+        return record["event"]
+    if "heartbeat" in record:
+        return "heartbeat"
+    for key in ("summary", "config"):
+        if key in record:
+            return key
+    return "other"
+
+
+class Sink:
+    """
+    Base class of an output sink. `write` receives a batch of
+    (unix_time, record) pairs on the writer thread; `flush` makes them
+    durable or visible. Per-sink counters are kept here.
+    """
+
+    name = "sink"
+
+    def __init__(self):
+        self.records = 0
+        self.batches = 0
+        self.bytes = 0
+        self.errors = 0
+        self.last_error = None
+        self.flush_ms_last = 0.0
+        self.flush_ms_max = 0.0
+        self.flush_ms_total = 0.0
+
+    def write(self, batch: list[tuple[float, dict]]):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "records": self.records,
+            "batches": self.batches,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "flush_ms_last": round(self.flush_ms_last, 3),
+            "flush_ms_avg": round(self.flush_ms_total / self.batches, 3) if self.batches else None,
+            "flush_ms_max": round(self.flush_ms_max, 3),
+        }
+
+
+def _json_lines(batch: list[tuple[float, dict]]) -> str:
+    return "".join(json.dumps(rec, ensure_ascii=False) + "\n" for _, rec in batch)
+
+
+class StdoutSink(Sink):
+    """JSON lines on stdout (or another text stream), one write per batch."""
+
+    name = "stdout"
+
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream if stream is not None else sys.stdout
+
+    def write(self, batch):
+        data = _json_lines(batch)
+        self.stream.write(data)
+        self.bytes += len(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class JsonlSink(Sink):
+    """
+    JSON lines appended to `path`. When the file would exceed `max_bytes`
+    it is renamed to `path.1` (older files shift to `path.2` ... up to
+    `backups`) and a new file is started.
+    """
+
+    name = "jsonl"
+
+    def __init__(self, path: str, max_bytes: int = 64 << 20, backups: int = 5):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max(1, int(max_bytes))
+        self.backups = max(0, int(backups))
+        self.rotations = 0
+        self.f = open(path, "ab")
+        self.size = self.f.tell()
+
+    def _rotate(self):
+        self.f.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.f = open(self.path, "wb")
+        self.size = 0
+        self.rotations += 1
+
+    def write(self, batch):
+        pending = []
+        pending_len = 0
+        for _, rec in batch:
+            line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+            if self.size + pending_len + len(line) > self.max_bytes and self.size + pending_len > 0:
+                self.f.write(b"".join(pending))
+                pending, pending_len = [], 0
+                self._rotate()
+            pending.append(line)
+            pending_len += len(line)
+        self.f.write(b"".join(pending))
+        self.size += pending_len
+        self.bytes += pending_len
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "rotations": self.rotations}
+
+
+def encode_record(ts: float, record: dict) -> bytes:
+    """
+    Compact binary form of one output record. ITER and heartbeat records
+    use fixed structs; everything else, DONE included (its final per-test
+    stats vary with the enabled tests), is compact JSON.
+    """
+    kind = record_kind(record)
+    if kind == "ITER":
+        rtype = REC_ITER
+        payload = ITER_STRUCT.pack(record["proc"], record["bits_processed"], record["ones_total"])
+    elif kind == "heartbeat":
+        rtype = REC_HEARTBEAT
+        payload = HEARTBEAT_STRUCT.pack(
+            record["elapsed_sec"], record["procs_reporting"], record["bits_total"], record["ones_total"],
+            record["window_len_total"], record["window_ones_total"], record["aggregate_bps"],
+        )
+    else:
+        rtype = REC_JSON
+        payload = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return BINLOG_HEADER.pack(rtype, ts, len(payload)) + payload
+
+
+def read_binlog(path: str):
+    """
+    Yield (unix_time, record) from a binary log written by BinaryLogSink.
+    Fixed-struct records come back as dicts with the fields they carry.
+    A truncated last record (crash while writing) is ignored.
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(BINLOG_MAGIC) + 1)
+        if head[:len(BINLOG_MAGIC)] != BINLOG_MAGIC or head[len(BINLOG_MAGIC):] != bytes([BINLOG_VERSION]):
+            raise ValueError("not a binary log (or unsupported version)")
+        while True:
+            hdr = f.read(BINLOG_HEADER.size)
+            if len(hdr) < BINLOG_HEADER.size:
+                return
+            rtype, ts, length = BINLOG_HEADER.unpack(hdr)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            if rtype == REC_ITER:
+                proc, bits, ones = ITER_STRUCT.unpack(payload)
+                yield ts, {"event": "ITER", "proc": proc, "bits_processed": bits, "ones_total": ones}
+            elif rtype == REC_HEARTBEAT:
+                elapsed, procs, bits, ones, wlen, wones, bps = HEARTBEAT_STRUCT.unpack(payload)
+                yield ts, {"heartbeat": True, "elapsed_sec": elapsed, "procs_reporting": procs,
+                           "bits_total": bits, "ones_total": ones, "window_len_total": wlen,
+                           "window_ones_total": wones, "aggregate_bps": bps}
+            elif rtype == REC_STAT:
+                proc, _, bits, ones, apt_len, apt_ones, bps = STAT_STRUCT.unpack(payload)
+                yield ts, {"event": "DONE", "proc": proc, "bits_processed": bits, "ones_total": ones,
+                           "apt_len": apt_len, "apt_ones": apt_ones, "bps": bps}
+            else:
+                yield ts, json.loads(payload)
+
+
+class BinaryLogSink(Sink):
+    """Append-only binary log (see `encode_record` / `read_binlog`)."""
+
+    name = "binlog"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.f = open(path, "ab")
+        if self.f.tell() == 0:
+            self.f.write(BINLOG_MAGIC + bytes([BINLOG_VERSION]))
+
+    def write(self, batch):
+        data = b"".join(encode_record(ts, rec) for ts, rec in batch)
+        self.f.write(data)
+        self.bytes += len(data)
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def parse_sink(spec: str, jsonl_max_bytes: int = 64 << 20, jsonl_backups: int = 5) -> Sink:
+    """
+    Build a sink from "stdout", "jsonl:PATH" or "binlog:PATH".
+    """
+    kind, _, path = spec.partition(":")
+    if kind == "stdout" and not path:
+        return StdoutSink()
+    if kind == "jsonl" and path:
+        return JsonlSink(path, jsonl_max_bytes, jsonl_backups)
+    if kind == "binlog" and path:
+        return BinaryLogSink(path)
+    raise ValueError(f"bad sink {spec!r} (expected stdout, jsonl:PATH or binlog:PATH)")
+
+
+class OutputWriter:
+    """
+    Fan records out to sinks from a background thread.
+
+    `emit` only enqueues; the thread collects up to `batch_max` records
+    (or what arrived within `flush_interval`), serializes them and writes
+    one batch per sink, timing write+flush. When the bounded buffer is
+    full, ITER and heartbeat records are dropped (counted in `dropped`);
+    other records wait for room, so anomalies are never lost.
+    """
+
+    def __init__(self, sinks: list[Sink], max_pending: int = 65536, batch_max: int = 1024,
+                 flush_interval: float = 0.1):
+        self.sinks = list(sinks)
+        self.batch_max = max(1, int(batch_max))
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max(1, int(max_pending)))
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if self.sinks:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def emit(self, record: dict):
+        if self._thread is None:
+            return
+        item = (time.time(), record)
+        try:
+            self.pending.put_nowait(item)
+        except queue.Full:
+            if record_kind(record) in DROPPABLE:
+                self.dropped += 1
+            else:
+                self.pending.put(item)
+
+    def _write(self, batch):
+        for sink in self.sinks:
+            t0 = time.perf_counter()
+            try:
+                sink.write(batch)
+                sink.flush()
+            except Exception as e:
+                sink.errors += 1
+                sink.last_error = repr(e)
+                continue
+            ms = (time.perf_counter() - t0) * 1000.0
+            sink.records += len(batch)
+            sink.batches += 1
+            sink.flush_ms_last = ms
+            sink.flush_ms_total += ms
+            if ms > sink.flush_ms_max:
+                sink.flush_ms_max = ms
+
+    def _run(self):
+        while not (self._stop.is_set() and self.pending.empty()):
+            try:
+                batch = [self.pending.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_max:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def stats(self) -> dict:
+        out = {}
+        for sink in self.sinks:
+            key = sink.name if sink.name not in out else f"{sink.name}#{len(out)}"
+            out[key] = sink.stats()
+        return {"pending": self.pending.qsize(), "dropped": self.dropped, "sinks": out}
+
+    def close(self, timeout: float = 10.0):
+        """Write everything still buffered, then close the sinks."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
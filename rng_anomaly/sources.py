@@ -1,5 +1,14 @@
+import sys
 import time
 import random
+import struct
+import hashlib
+from array import array
+
+
+# Synthetic streams are a sequence of fixed-size blocks; block k is a pure
+# function of (seed, k), so any worker can jump straight to any block.
+SYNTHETIC_BLOCK_BYTES = 4096
 
 
 def bit_stream_from_device(path: str, chunk_size: int = 1 << 16):
@@ -22,6 +31,18 @@ def bit_stream_from_device(path: str, chunk_size: int = 1 << 16):
                 yield (b >> 7) & 1
 
 
+def chunk_stream_from_device(path: str, chunk_size: int = 1 << 16):
+    """
+    Generate raw byte chunks from a byte device (block engine input).
+    """
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield data
+
+
 def bit_stream_synthetic(p: float = 0.5, seed: int | None = None):
     """
     Generate i.i.d. Bernoulli bits with probability p for 1s.
@@ -33,10 +54,145 @@ def bit_stream_synthetic(p: float = 0.5, seed: int | None = None):
         yield 1 if rng.random() < p else 0
 
 
+def _prf(key: bytes, domain: int, index: int, nbytes: int) -> bytes:
+    """
+    Counter-mode keyed BLAKE2b: 64 output bytes per (domain, index, j).
+    """
+    out = []
+    for j in range((nbytes + 63) // 64):
+        out.append(hashlib.blake2b(struct.pack("<BQQ", domain, index, j), key=key, digest_size=64).digest())
+    return b"".join(out)[:nbytes]
+
+
+def _seed_key(seed: int) -> bytes:
+    return seed.to_bytes(32, "little", signed=True)
+
+
+def synthetic_block(seed: int, index: int, p: float = 0.5, block_bytes: int = SYNTHETIC_BLOCK_BYTES) -> bytes:
+    """
+    Block `index` of the logical synthetic stream for `seed`, as packed
+    LSB-first Bernoulli(p) bits.
+
+    Blocks come from a keyed BLAKE2b in counter mode, so distinct blocks are
+    independent (as far as the PRF is) and computing block k does not
+    require generating blocks 0..k-1. p=0.5 uses the PRF bytes directly;
+    other p compare one 32-bit PRF word per bit against p*2^32.
+    """
+    if not (0.0 <= p <= 1.0):
+        raise ValueError("p must be in [0,1]")
+    if index < 0:
+        raise ValueError("index must be >= 0")
+    if p == 0.0:
+        return bytes(block_bytes)
+    if p == 1.0:
+        return b"\xff" * block_bytes
+    key = _seed_key(seed)
+    if p == 0.5:
+        return _prf(key, 0, index, block_bytes)
+    words = array("I")
+    if words.itemsize != 4:
+        words = array("L")
+    words.frombytes(_prf(key, 1, index, block_bytes * 8 * words.itemsize))
+    if sys.byteorder == "big":
+        words.byteswap()
+    thr = int(p * 4294967296.0)
+    out = bytearray(block_bytes)
+    for i in range(block_bytes):
+        base = i * 8
+        b = 0
+        for k in range(8):
+            if (words[base + k] & 0xFFFFFFFF) < thr:
+                b |= 1 << k
+        out[i] = b
+    return bytes(out)
+
+
+def chunk_stream_synthetic(
+    p: float = 0.5,
+    seed: int | None = None,
+    chunk_size: int = 1 << 16,
+    start_block: int = 0,
+    stride: int = 1,
+    block_bytes: int = SYNTHETIC_BLOCK_BYTES,
+):
+    """
+    Generate chunks of the logical synthetic stream made of blocks
+    start_block, start_block + stride, ... (see `synthetic_block`).
+    Chunks hold whole blocks, about `chunk_size` bytes each.
+    """
+    if not (0.0 <= p <= 1.0):
+        raise ValueError("p must be in [0,1]")
+    if stride <= 0 or start_block < 0:
+        raise ValueError("start_block must be >= 0 and stride > 0")
+    if seed is None:
+        seed = time.time_ns()
+    per_chunk = max(1, chunk_size // block_bytes)
+    k = start_block
+    # For contiguous ranges, end chunks on multiples of per_chunk blocks so
+    # chunk boundaries fall on the same logical grid for any partition.
+    n = per_chunk - (start_block % per_chunk) if stride == 1 else per_chunk
+    while True:
+        parts = []
+        for _ in range(n):
+            parts.append(synthetic_block(seed, k, p, block_bytes))
+            k += stride
+        yield b"".join(parts)
+        n = per_chunk
+
+
+def synthetic_partition(proc_id: int, num_procs: int, max_bits: int | None,
+                        block_bytes: int = SYNTHETIC_BLOCK_BYTES) -> tuple[int, int]:
+    """
+    Split the logical stream across workers; returns (start_block, stride).
+
+    With a per-process bit limit each worker gets a contiguous range
+    (jump-ahead to proc_id * blocks_per_proc), so N workers with --bits B
+    test the same bits as one worker with --bits N*B whenever B is a
+    multiple of the block size. Without a limit, blocks are dealt
+    round-robin (leapfrog), which covers the same prefix of the stream
+    regardless of the process count.
+    """
+    if num_procs <= 1:
+        return 0, 1
+    if max_bits is not None:
+        block_bits = block_bytes * 8
+        per_proc = (max_bits + block_bits - 1) // block_bits
+        return proc_id * per_proc, 1
+    return proc_id, num_procs
+
+
+def stream_offset(local_bit: int, start_block: int, stride: int,
+                  block_bytes: int = SYNTHETIC_BLOCK_BYTES) -> int:
+    """
+    Map a worker-local bit index to its offset in the logical stream.
+    """
+    block_bits = block_bytes * 8
+    k, r = divmod(local_bit, block_bits)
+    return (start_block + k * stride) * block_bits + r
+
+
+def bits_from_chunks(chunks):
+    """
+    Generate bits (LSB-first) from an iterable of byte chunks.
+    """
+    for data in chunks:
+        for b in data:
+            yield (b >> 0) & 1
+            yield (b >> 1) & 1
+            yield (b >> 2) & 1
+            yield (b >> 3) & 1
+            yield (b >> 4) & 1
+            yield (b >> 5) & 1
+            yield (b >> 6) & 1
+            yield (b >> 7) & 1
+
+
 def derive_process_seed(base_seed: int | None, proc_id: int) -> int:
     """
     Derive a per-process seed from a base seed and process id to avoid
-    correlation across synthetic generators.
+    correlation across synthetic generators. Workers of one run share a
+    partitioned stream instead (see `synthetic_partition`); this is used
+    for unrelated streams such as separate supervised sources.
     """
     if base_seed is None:
         base_seed = time.time_ns()
@@ -0,0 +1,279 @@
+import re
+import sys
+import json
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timezone
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS anomalies (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    proc INTEGER,
+    test TEXT NOT NULL,
+    bits_processed INTEGER,
+    stream_offset INTEGER,
+    message TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS anomalies_source_ts ON anomalies(source, ts);
+CREATE INDEX IF NOT EXISTS anomalies_test_ts ON anomalies(test, ts);
+CREATE TABLE IF NOT EXISTS buckets (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    source TEXT NOT NULL,
+    scale TEXT NOT NULL,
+    t_end REAL NOT NULL,
+    bits INTEGER NOT NULL,
+    ones INTEGER NOT NULL,
+    ratio REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS buckets_source_scale_t ON buckets(source, scale, t_end);
+CREATE TABLE IF NOT EXISTS summaries (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    elapsed_sec REAL,
+    total_bits INTEGER,
+    ones_total INTEGER,
+    anomalies INTEGER,
+    aggregate_bps REAL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS summaries_source_ts ON summaries(source, ts);
+"""
+
+_INSERT = {
+    "anomaly": "INSERT INTO anomalies (run_id, ts, source, proc, test, bits_processed, stream_offset, message, payload) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "bucket": "INSERT INTO buckets (run_id, source, scale, t_end, bits, ones, ratio) VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "summary": "INSERT INTO summaries (run_id, ts, source, elapsed_sec, total_bits, ones_total, anomalies, "
+               "aggregate_bps, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class ResultsStore:
+    """
+    Batch rows into a SQLite database from a background thread.
+
+    The run row is created synchronously so later rows can reference it;
+    anomalies, bucket ratios and the summary are queued and inserted with
+    one `executemany` per table and one commit per batch. The connection
+    lives on the writer thread only. A batch that fails is retried once
+    after `retry_delay` seconds, then dropped and counted in `dropped`.
+    """
+
+    def __init__(self, path: str, source: str, config: dict | None = None, batch_max: int = 500,
+                 flush_interval: float = 1.0, max_pending: int = 100000, retry_delay: float = 0.5):
+        self.path = path
+        self.source = source
+        self.batch_max = max(1, int(batch_max))
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.retry_delay = retry_delay
+        self.rows = 0
+        self.batches = 0
+        self.dropped = 0
+        self.last_error = None
+        conn = connect(path)
+        with conn:
+            cur = conn.execute("INSERT INTO runs (started_at, source, config) VALUES (?, ?, ?)",
+                               (time.time(), source, json.dumps(config or {}, ensure_ascii=False)))
+        self.run_id = cur.lastrowid
+        conn.close()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item: tuple):
+        try:
+            self.pending.put_nowait(item)
+        except queue.Full:
+            self.pending.put(item)
+
+    def anomaly(self, payload: dict):
+        self._put(("anomaly", (
+            self.run_id, payload.get("detected_at") or time.time(), self.source, payload.get("proc"),
+            payload.get("test", "unknown"), payload.get("bits_processed"), payload.get("stream_offset"),
+            payload.get("message"), json.dumps(payload, ensure_ascii=False),
+        )))
+
+    def bucket(self, scale: str, t_end: float, bits: int, ones: int):
+        if bits > 0:
+            self._put(("bucket", (self.run_id, self.source, scale, t_end, bits, ones, ones / bits)))
+
+    def summary(self, summary: dict):
+        self._put(("summary", (
+            self.run_id, time.time(), self.source, summary.get("elapsed_sec"), summary.get("total_bits"),
+            summary.get("ones_total"), summary.get("anomalies"), summary.get("aggregate_bps"),
+            json.dumps(summary, ensure_ascii=False),
+        )))
+
+    def _write(self, conn, batch):
+        by_kind = {}
+        for kind, row in batch:
+            by_kind.setdefault(kind, []).append(row)
+        for attempt in range(2):
+            try:
+                with conn:
+                    for kind, rows in by_kind.items():
+                        conn.executemany(_INSERT[kind], rows)
+                self.rows += len(batch)
+                self.batches += 1
+                return
+            except sqlite3.Error as e:
+                self.last_error = repr(e)
+                if attempt == 0:
+                    time.sleep(self.retry_delay)
+        self.dropped += len(batch)
+
+    def stats(self) -> dict:
+        return {"rows": self.rows, "batches": self.batches, "dropped": self.dropped, "last_error": self.last_error}
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while not (self._stop.is_set() and self.pending.empty()):
+                try:
+                    batch = [self.pending.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_max:
+                    try:
+                        batch.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def close(self, timeout: float = 10.0):
+        """Insert everything still queued and stop the thread."""
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+
+_RELATIVE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_time(text: str, now: float | None = None) -> float:
+    """
+    Unix time from ISO-8601 ("2025-01-31", "2025-01-31T12:00:00+00:00";
+    naive values are UTC) or a relative age such as "30d", "12h", "15m".
+    """
+    m = _RELATIVE.match(text.strip())
+    if m:
+        return (time.time() if now is None else now) - float(m.group(1)) * _UNITS[m.group(2)]
+    dt = datetime.fromisoformat(text.strip())
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+# SQLite strftime patterns for --group.
+GROUPS = {"minute": "%Y-%m-%dT%H:%M", "hour": "%Y-%m-%dT%H:00", "day": "%Y-%m-%d", "month": "%Y-%m"}
+
+
+def _where(args, time_col: str) -> tuple[str, list]:
+    clauses, params = [], []
+    if args.source:
+        clauses.append("source = ?")
+        params.append(args.source)
+    if args.since:
+        clauses.append(f"{time_col} >= ?")
+        params.append(parse_time(args.since))
+    if args.until:
+        clauses.append(f"{time_col} < ?")
+        params.append(parse_time(args.until))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def run_query(conn: sqlite3.Connection, args) -> list[dict]:
+    if args.what == "sources":
+        sql = ("SELECT source, COUNT(*) AS runs, MIN(started_at) AS first_run, MAX(started_at) AS last_run "
+               "FROM runs GROUP BY source ORDER BY source")
+        params = []
+    elif args.what == "runs":
+        where, params = _where(args, "started_at")
+        sql = f"SELECT id, started_at, source FROM runs{where} ORDER BY started_at"
+    elif args.what == "anomalies":
+        where, params = _where(args, "ts")
+        if args.test:
+            where += (" AND " if where else " WHERE ") + "test = ?"
+            params.append(args.test)
+        if args.group:
+            sql = (f"SELECT strftime('{GROUPS[args.group]}', ts, 'unixepoch') AS period, source, test, "
+                   f"COUNT(*) AS anomalies FROM anomalies{where} GROUP BY period, source, test ORDER BY period")
+        else:
+            sql = (f"SELECT ts, source, run_id, proc, test, bits_processed, stream_offset, message "
+                   f"FROM anomalies{where} ORDER BY ts LIMIT {int(args.limit)}")
+    elif args.what == "bias":
+        where, params = _where(args, "t_end")
+        where += (" AND " if where else " WHERE ") + "scale = ?"
+        params.append(args.scale)
+        group = GROUPS[args.group or "hour"]
+        sql = (f"SELECT strftime('{group}', t_end, 'unixepoch') AS period, source, SUM(bits) AS bits, "
+               f"SUM(ones) AS ones, CAST(SUM(ones) AS REAL) / SUM(bits) AS ones_ratio, "
+               f"200.0 * SUM(ones) / SUM(bits) - 100.0 AS bias_pp, COUNT(*) AS buckets "
+               f"FROM buckets{where} GROUP BY period, source ORDER BY period, source")
+    else:
+        where, params = _where(args, "ts")
+        sql = (f"SELECT ts, source, run_id, elapsed_sec, total_bits, ones_total, anomalies, aggregate_bps "
+               f"FROM summaries{where} ORDER BY ts LIMIT {int(args.limit)}")
+    cur = conn.execute(sql, params)
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly query",
+        description="Query a results store written with --store.",
+    )
+    ap.add_argument("db", help="SQLite database path.")
+    ap.add_argument("what", nargs="?", default="bias",
+                    choices=("bias", "anomalies", "summaries", "runs", "sources"),
+                    help="bias: ones ratio per period from the plot buckets (default); anomalies; "
+                         "summaries; runs; sources.")
+    ap.add_argument("--source", default=None, help="Only this source label.")
+    ap.add_argument("--since", default=None, help="Start time: ISO-8601 (UTC if naive) or an age like 30d, 12h.")
+    ap.add_argument("--until", default=None, help="End time (exclusive), same formats as --since.")
+    ap.add_argument("--group", choices=tuple(GROUPS), default=None,
+                    help="Period for bias (default hour) or to count anomalies per period.")
+    ap.add_argument("--scale", choices=("short", "macro"), default="short",
+                    help="Bucket series for bias: --mpl-bucket-sec (short) or --macro-bucket-hours (macro).")
+    ap.add_argument("--test", default=None, help="Only anomalies of this test (RCT, APT, SPRT, ZMONO).")
+    ap.add_argument("--limit", type=int, default=10000, help="Row limit for anomaly/summary listings.")
+    args = ap.parse_args(argv)
+
+    try:
+        conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+        rows = run_query(conn, args)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    for row in rows:
+        for key in ("ts", "started_at", "first_run", "last_run"):
+            if isinstance(row.get(key), float):
+                row[key] = datetime.fromtimestamp(row[key], timezone.utc).isoformat()
+        print(json.dumps(row, ensure_ascii=False))
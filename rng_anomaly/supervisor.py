@@ -0,0 +1,357 @@
+import os
+import sys
+import json
+import stat
+import time
+import signal
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import iso_now, human_bps
+from .worker import build_tests
+from .sources import chunk_stream_synthetic, derive_process_seed
+
+
+class SourceState:
+    """
+    Test battery and counters for one source.
+
+    `feed` is called from the executor, at most one chunk at a time per
+    source, so the state needs no locking of its own.
+    """
+
+    def __init__(self, label: str, alpha: float, beta: float, delta: float, apt_window: int,
+                 ztest_enabled: bool = False, z_alpha: float | None = None, z_min_bits: int = 10000):
+        self.label = label
+        self.rct, self.apt, self.sprt, self.tests = build_tests(
+            alpha, beta, delta, apt_window, ztest_enabled, z_alpha, z_min_bits
+        )
+        self.bits = 0
+        self.ones = 0
+        self.anomalies = 0
+        self.busy_sec = 0.0
+        self.t0 = time.perf_counter()
+        self.done = False
+        self.error = None
+
+    def feed(self, data: bytes) -> list[dict]:
+        t = time.perf_counter()
+        events = []
+        for test in self.tests:
+            evt = test.update_bytes(data)
+            if evt is not None:
+                evt["bit_offset"] = self.bits + evt.pop("offset")
+                evt["source"] = self.label
+                events.append(evt)
+        self.bits += len(data) * 8
+        self.ones += int.from_bytes(data, "little").bit_count()
+        self.anomalies += len(events)
+        self.busy_sec += time.perf_counter() - t
+        return sorted(events, key=lambda e: e["bit_offset"])
+
+    def stats(self, now: float) -> dict:
+        elapsed = now - self.t0
+        apt_len = self.apt.filled
+        return {
+            "source": self.label,
+            "bits_processed": self.bits,
+            "ones_total": self.ones,
+            "ones_pct": (self.ones / self.bits) if self.bits else None,
+            "apt_len": apt_len,
+            "apt_ones": self.apt.ones,
+            "apt_pct": (self.apt.ones / apt_len) if apt_len > 0 else None,
+            "rct_run_len": self.rct.run_len,
+            "sprt_up": self.sprt.s_up,
+            "sprt_dn": self.sprt.s_dn,
+            "anomalies": self.anomalies,
+            "bps": self.bits / elapsed if elapsed > 0 else float("nan"),
+            "busy_sec": round(self.busy_sec, 3),
+            "done": self.done,
+        }
+
+
+async def _wait_readable(loop, fd: int):
+    fut = loop.create_future()
+
+    def ready():
+        if not fut.done():
+            fut.set_result(None)
+
+    loop.add_reader(fd, ready)
+    try:
+        await fut
+    finally:
+        loop.remove_reader(fd)
+
+
+async def read_stream(loop, path: str, chunk_size: int, poll: float):
+    """
+    Yield chunks from a device, FIFO or regular file without blocking the
+    event loop. Character devices and FIFOs are read with O_NONBLOCK and
+    readiness notifications; an idle FIFO (no writer) is polled. Regular
+    files are read to EOF in the default executor.
+    """
+    st = os.stat(path)
+    if stat.S_ISREG(st.st_mode):
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                data = await loop.run_in_executor(None, f.read, chunk_size)
+                if not data:
+                    return
+                yield data
+    is_fifo = stat.S_ISFIFO(st.st_mode)
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        while True:
+            try:
+                data = os.read(fd, chunk_size)
+            except BlockingIOError:
+                await _wait_readable(loop, fd)
+                continue
+            if not data:
+                if is_fifo:
+                    await asyncio.sleep(poll)
+                    continue
+                return
+            yield data
+    finally:
+        os.close(fd)
+
+
+async def read_directory(loop, path: str, chunk_size: int, poll: float, follow: bool):
+    """
+    Yield chunks from every file of a capture directory in name order.
+    With `follow`, keep polling for files that appear later.
+    """
+    seen = set()
+    while True:
+        names = sorted(n for n in os.listdir(path) if n not in seen)
+        for name in names:
+            seen.add(name)
+            full = os.path.join(path, name)
+            if not os.path.isfile(full):
+                continue
+            async for data in read_stream(loop, full, chunk_size, poll):
+                yield data
+        if not follow:
+            return
+        await asyncio.sleep(poll)
+
+
+async def read_synthetic(p: float, seed: int | None, chunk_size: int):
+    gen = chunk_stream_synthetic(p=p, seed=seed, chunk_size=chunk_size)
+    for data in gen:
+        yield data
+        await asyncio.sleep(0)
+
+
+def parse_source(spec: str) -> tuple[str, str, dict]:
+    """
+    Parse a source spec into (label, kind, options).
+
+    `synthetic[:p]` is a Bernoulli source; an existing directory is read as
+    a capture directory; anything else is opened as a device/FIFO/file.
+    An optional `label=` prefix names the source in the output.
+    """
+    label = None
+    if "=" in spec and not spec.startswith("/"):
+        label, spec = spec.split("=", 1)
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        p = float(spec.split(":", 1)[1]) if ":" in spec else 0.5
+        if not (0.0 <= p <= 1.0):
+            raise ValueError("synthetic p must be in [0,1]")
+        return label or spec, "synthetic", {"p": p}
+    if not os.path.exists(spec):
+        raise ValueError(f"path does not exist {spec}")
+    kind = "directory" if os.path.isdir(spec) else "stream"
+    return label or spec, kind, {"path": spec}
+
+
+class Supervisor:
+    """
+    Multiplex many sources in one process.
+
+    Each source is an asyncio task that reads a chunk and then waits for a
+    slot on the bounded executor. The slot semaphore is FIFO, and a source
+    never has more than one chunk in flight, so busy sources cannot starve
+    quiet ones: every source waits its turn for each chunk it submits.
+    """
+
+    def __init__(self, args, specs: list[tuple[str, str, dict]]):
+        self.args = args
+        self.specs = specs
+        self.states = {}
+        self.pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="rng-src")
+        self.slots = None
+        self.stop = None
+
+    def emit(self, record: dict):
+        print(json.dumps({"ts": iso_now(), **record}, ensure_ascii=False), flush=True)
+
+    def open_reader(self, loop, idx: int, kind: str, opts: dict):
+        chunk = self.args.chunk
+        if kind == "synthetic":
+            seed = derive_process_seed(self.args.seed, idx) if self.args.seed is not None else None
+            return read_synthetic(opts["p"], seed, chunk)
+        if kind == "directory":
+            return read_directory(loop, opts["path"], chunk, self.args.poll, self.args.follow)
+        return read_stream(loop, opts["path"], chunk, self.args.poll)
+
+    async def run_source(self, idx: int, label: str, kind: str, opts: dict):
+        loop = asyncio.get_running_loop()
+        st = self.states[label]
+        reader = self.open_reader(loop, idx, kind, opts)
+        max_bits = self.args.bits
+        try:
+            async for data in reader:
+                if self.stop.is_set():
+                    break
+                if max_bits is not None:
+                    data = data[:max(0, (max_bits - st.bits + 7) // 8)]
+                    if not data:
+                        break
+                async with self.slots:
+                    events = await loop.run_in_executor(self.pool, st.feed, data)
+                for evt in events:
+                    if not self.args.quiet_json:
+                        self.emit({"event": "ANOMALY", **evt})
+                    if self.args.stop_on_anomaly:
+                        self.stop.set()
+                if max_bits is not None and st.bits >= max_bits:
+                    break
+        except Exception as e:
+            st.error = repr(e)
+            if not self.args.quiet_json:
+                self.emit({"event": "ERROR", "source": label, "error": st.error})
+        finally:
+            st.done = True
+            await reader.aclose()
+
+    def combined(self, now: float, t_start: float) -> dict:
+        states = list(self.states.values())
+        bits = sum(s.bits for s in states)
+        ones = sum(s.ones for s in states)
+        bps = sum((s.bits / (now - s.t0)) for s in states if now > s.t0)
+        return {
+            "elapsed_sec": round(now - t_start, 3),
+            "sources": len(states),
+            "sources_active": sum(1 for s in states if not s.done),
+            "anomalies": sum(s.anomalies for s in states),
+            "total_bits": bits,
+            "ones_total": ones,
+            "ones_ratio_global": (ones / bits) if bits else None,
+            "aggregate_bps": bps,
+            "aggregate_bps_human": human_bps(bps),
+        }
+
+    async def heartbeats(self, t_start: float):
+        while not self.stop.is_set():
+            try:
+                await asyncio.wait_for(self.stop.wait(), timeout=self.args.live_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self.args.quiet_json:
+                continue
+            now = time.perf_counter()
+            for st in self.states.values():
+                self.emit({"heartbeat": True, **st.stats(now)})
+            self.emit({"heartbeat": True, "combined": self.combined(now, t_start)})
+
+    async def main(self) -> dict:
+        loop = asyncio.get_running_loop()
+        self.stop = asyncio.Event()
+        self.slots = asyncio.Semaphore(self.args.workers)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        a = self.args
+        for label, _, _ in self.specs:
+            self.states[label] = SourceState(label, a.alpha, a.beta, a.delta, a.apt_window,
+                                             a.ztest, a.z_alpha, a.z_min_bits)
+        t_start = time.perf_counter()
+        tasks = [asyncio.create_task(self.run_source(i, *spec)) for i, spec in enumerate(self.specs)]
+        hb = asyncio.create_task(self.heartbeats(t_start))
+        all_done = asyncio.create_task(asyncio.wait(tasks))
+        stop_wait = asyncio.create_task(self.stop.wait())
+        await asyncio.wait([all_done, stop_wait], timeout=a.time, return_when=asyncio.FIRST_COMPLETED)
+        self.stop.set()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, all_done, hb, stop_wait, return_exceptions=True)
+        self.pool.shutdown(wait=True)
+        now = time.perf_counter()
+        return {
+            "per_source": [st.stats(now) for st in self.states.values()],
+            **self.combined(now, t_start),
+        }
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly supervise",
+        description="Monitor many entropy sources from one asyncio process.",
+    )
+    ap.add_argument("sources", nargs="+",
+                    help="Sources: device/FIFO/file path, capture directory, or synthetic[:p]. "
+                         "Prefix with LABEL= to name a source.")
+    ap.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                    help="Executor threads running test state (default min(4, cpus)).")
+    ap.add_argument("--alpha", type=float, default=1e-6,
+                    help="Alpha level for RCT/APT and SPRT (false positive rate).")
+    ap.add_argument("--beta", type=float, default=1e-2,
+                    help="Beta level for SPRT (false negative rate).")
+    ap.add_argument("--delta", type=float, default=1e-4,
+                    help="Minimum bias to detect with SPRT (p=0.5±δ).")
+    ap.add_argument("--apt-window", type=int, default=1024,
+                    help="Window size for APT.")
+    ap.add_argument("--ztest", action="store_true", default=False,
+                    help="Enable bilateral online monobit Z-test.")
+    ap.add_argument("--z-alpha", type=float, default=None,
+                    help="Bilateral α for monobit Z (defaults to --alpha).")
+    ap.add_argument("--z-min-bits", type=int, default=10000,
+                    help="Minimum bits before evaluating Z (default 10000).")
+    ap.add_argument("--chunk", type=int, default=1 << 16,
+                    help="Read chunk size in bytes; also the scheduling quantum (default 65536).")
+    ap.add_argument("--bits", type=int, default=None,
+                    help="Bit limit per source (optional).")
+    ap.add_argument("--time", type=float, default=30.0,
+                    help="Time limit in seconds (default 30s).")
+    ap.add_argument("--no-limit", action="store_true", default=False,
+                    help="Ignore time and bit limits; run until interrupted.")
+    ap.add_argument("--live-interval", type=float, default=1.0,
+                    help="Heartbeat interval in seconds (default 1).")
+    ap.add_argument("--poll", type=float, default=0.5,
+                    help="Poll interval for idle FIFOs and followed directories (default 0.5s).")
+    ap.add_argument("--follow", action="store_true", default=False,
+                    help="Keep watching capture directories for new files.")
+    ap.add_argument("--seed", type=int, default=None,
+                    help="Base seed for synthetic sources (optional).")
+    ap.add_argument("--stop-on-anomaly", action="store_true", default=False,
+                    help="Stop all sources at the first anomaly event.")
+    ap.add_argument("--quiet-json", action="store_true", default=False,
+                    help="Only print the final summary.")
+    args = ap.parse_args(argv)
+    if args.workers <= 0:
+        ap.error("--workers must be > 0")
+    if args.no_limit:
+        args.bits = None
+        args.time = None
+
+    specs = []
+    try:
+        for spec in args.sources:
+            specs.append(parse_source(spec))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    labels = [s[0] for s in specs]
+    if len(set(labels)) != len(labels):
+        print("Error: duplicate source labels", file=sys.stderr)
+        sys.exit(1)
+
+    sup = Supervisor(args, specs)
+    summary = asyncio.run(sup.main())
+    print(json.dumps({"ts": iso_now(), "summary": summary}, ensure_ascii=False))
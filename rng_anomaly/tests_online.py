@@ -1,8 +1,55 @@
 from dataclasses import dataclass
 from collections import deque
+from array import array
 import math
 
-from .utils import apt_bounds_binomial, rct_cutoff_from_alpha, inv_norm_cdf
+try:
+    import numpy as np
+except ImportError:
+    # The block paths of the optional tests fall back to per-bit updates.
+    np = None
+
+from .utils import apt_bounds_binomial, rct_cutoff_from_alpha, inv_norm_cdf, chi2_upper_quantile
+
+
+# Per-byte lookup tables for the block engine (bits are LSB-first).
+_POPCOUNT = tuple(bin(b).count("1") for b in range(256))
+
+
+def _lead_run(b: int) -> int:
+    first = b & 1
+    k = 1
+    while k < 8 and ((b >> k) & 1) == first:
+        k += 1
+    return k
+
+
+def _trail_run(b: int) -> int:
+    last = (b >> 7) & 1
+    k = 1
+    while k < 8 and ((b >> (7 - k)) & 1) == last:
+        k += 1
+    return k
+
+
+_LEAD_RUN = tuple(_lead_run(b) for b in range(256))
+_TRAIL_RUN = tuple(_trail_run(b) for b in range(256))
+
+
+def _update_bits(test, data) -> dict | None:
+    """Feed a block through ``test.update`` bit by bit (LSB-first).
+
+    Fallback used by ``update_bytes`` when no byte-level fast path applies.
+    Returns the first event with its ``offset`` in the block, if any.
+    """
+    first = None
+    for i, b in enumerate(data):
+        for k in range(8):
+            evt = test.update((b >> k) & 1)
+            if evt is not None and first is None:
+                evt["offset"] = i * 8 + k
+                first = evt
+    return first
 
 
 @dataclass
@@ -38,6 +85,43 @@ class RCT:
             self.run_len = 1
         return None
 
+    def update_bytes(self, data) -> dict | None:
+        """Block version of ``update`` over a bytes-like object.
+
+        Returns the first anomaly in the block (with its bit ``offset``) or
+        None. Runs are tracked per byte through lookup tables; only bytes
+        that extend the current run can cross the cutoff.
+        """
+        cutoff = self.cutoff
+        run = self.run_len
+        last = self.last_bit
+        first = None
+        for i, b in enumerate(data):
+            if b == 0 or b == 255:
+                bit = b & 1
+                prev = run if bit == last else 0
+                run = prev + 8
+                last = bit
+                if run >= cutoff and first is None:
+                    first = (i * 8 + max(cutoff - prev, 1) - 1, max(cutoff, prev + 1))
+            else:
+                if (b & 1) == last:
+                    if run + _LEAD_RUN[b] >= cutoff and first is None:
+                        first = (i * 8 + max(cutoff - run, 1) - 1, max(cutoff, run + 1))
+                run = _TRAIL_RUN[b]
+                last = b >> 7
+        self.run_len = run
+        self.last_bit = last
+        if first is None:
+            return None
+        offset, run_at = first
+        return {
+            "test": "RCT",
+            "cutoff": cutoff,
+            "offset": offset,
+            "message": f"Run of {run_at} identical bits (≥ {cutoff})"
+        }
+
 
 @dataclass
 class APT:
@@ -50,13 +134,20 @@ class APT:
     alpha: float
     ones: int = 0
     buf: deque = None
+    byte_buf: deque = None
     lo: int = None
     hi: int = None
 
     def __post_init__(self):
         self.buf = deque(maxlen=self.window)
+        self.byte_buf = deque(maxlen=self.window // 8)
         self.lo, self.hi = apt_bounds_binomial(self.window, self.alpha)
 
+    @property
+    def filled(self) -> int:
+        """Number of bits currently in the window (bit or block path)."""
+        return len(self.buf) + 8 * len(self.byte_buf)
+
     def update(self, bit: int):
         if len(self.buf) == self.window:
             old = self.buf.popleft()
@@ -74,6 +165,51 @@ class APT:
                 }
         return None
 
+    def update_bytes(self, data) -> dict | None:
+        """Block version of ``update`` over a bytes-like object.
+
+        The window is kept as whole bytes, so this path needs a window that
+        is a multiple of 8; otherwise it falls back to per-bit updates. The
+        count can move by at most 8 within a byte, so bytes whose count stays
+        8 away from the bounds are accepted without walking their bits.
+        """
+        if self.window % 8:
+            return _update_bits(self, data)
+        ring = self.byte_buf
+        cap = ring.maxlen
+        lo, hi = self.lo, self.hi
+        ones = self.ones
+        first = None
+        for i, b in enumerate(data):
+            if len(ring) == cap:
+                old = ring[0]
+                if first is None and not (lo + 8 <= ones <= hi - 8):
+                    c = ones
+                    for k in range(8):
+                        c += ((b >> k) & 1) - ((old >> k) & 1)
+                        if not (lo <= c <= hi):
+                            first = (i * 8 + k, c)
+                            break
+                ones += _POPCOUNT[b] - _POPCOUNT[old]
+                ring.append(b)
+            else:
+                ring.append(b)
+                ones += _POPCOUNT[b]
+                if len(ring) == cap and first is None and not (lo <= ones <= hi):
+                    first = (i * 8 + 7, ones)
+        self.ones = ones
+        if first is None:
+            return None
+        offset, ones_at = first
+        return {
+            "test": "APT",
+            "window": self.window,
+            "bounds": [lo, hi],
+            "ones": ones_at,
+            "offset": offset,
+            "message": f"Proportion out of [{lo},{hi}] in window {self.window}"
+        }
+
 
 @dataclass
 class SPRTDetector:
@@ -103,6 +239,16 @@ class SPRTDetector:
         self.p1u = min(max(self.p1u, eps), 1 - eps)
         self.p1d = min(max(self.p1d, eps), 1 - eps)
 
+        # Per-byte increments for the block engine.
+        up1 = math.log(self.p1u / self.p0)
+        up0 = math.log((1 - self.p1u) / (1 - self.p0))
+        dn1 = math.log(self.p1d / self.p0)
+        dn0 = math.log((1 - self.p1d) / (1 - self.p0))
+        self._up_step = 8 * max(up1, up0)
+        self._dn_step = 8 * max(dn1, dn0)
+        self._up_byte = tuple(c * up1 + (8 - c) * up0 for c in _POPCOUNT)
+        self._dn_byte = tuple(c * dn1 + (8 - c) * dn0 for c in _POPCOUNT)
+
     def update(self, bit: int):
         if bit == 1:
             self.s_up += math.log(self.p1u / self.p0)
@@ -131,6 +277,28 @@ class SPRTDetector:
             }
         return None
 
+    def update_bytes(self, data) -> dict | None:
+        """Block version of ``update`` over a bytes-like object.
+
+        Statistics advance one byte at a time; a byte is walked bit by bit
+        only when it could take either statistic across A.
+        """
+        A = self.A
+        up_byte, dn_byte = self._up_byte, self._dn_byte
+        up_step, dn_step = self._up_step, self._dn_step
+        first = None
+        for i, b in enumerate(data):
+            if first is None and (self.s_up + up_step >= A or self.s_dn + dn_step >= A):
+                for k in range(8):
+                    evt = self.update((b >> k) & 1)
+                    if evt is not None and first is None:
+                        evt["offset"] = i * 8 + k
+                        first = evt
+            else:
+                self.s_up += up_byte[b]
+                self.s_dn += dn_byte[b]
+        return first
+
 
 @dataclass
 class ZMonobit:
@@ -174,4 +342,524 @@ class ZMonobit:
             }
         return None
 
+    def update_bytes(self, data) -> dict | None:
+        """Block version of ``update`` over a bytes-like object.
+
+        |ones - n/2| moves by at most 4 per byte and the threshold grows with
+        n, so the limit at the start of the block is a safe bound for every
+        byte in it; only bytes close to it are walked bit by bit.
+        """
+        n_end = self.n + 8 * len(data)
+        if n_end < self.min_bits:
+            self.n = n_end
+            self.ones += int.from_bytes(data, "little").bit_count()
+            return None
+        limit = 0.5 * self.z_threshold * math.sqrt(self.n) if self.n >= self.min_bits else -1.0
+        first = None
+        for i, b in enumerate(data):
+            if first is None and abs(self.ones - 0.5 * self.n) + 4 >= limit:
+                for k in range(8):
+                    evt = self.update((b >> k) & 1)
+                    if evt is not None and first is None:
+                        evt["offset"] = i * 8 + k
+                        first = evt
+                if self.n >= self.min_bits and limit < 0:
+                    limit = 0.5 * self.z_threshold * math.sqrt(self.n)
+            else:
+                self.n += 8
+                self.ones += _POPCOUNT[b]
+        return first
+
+
+@dataclass
+class BitPosition:
+    """Per-bit-position bias and stuck-bit monitor.
+
+    Keeps a ones count for each of the ``8 * word_bytes`` bit positions of
+    a word (position ``8 * byte + bit``, bytes in stream order, bits
+    LSB-first). Flags a position whose Z statistic exceeds the threshold
+    for alpha split over all positions, or one that holds the same value
+    through a whole window of ``stuck_words`` consecutive words.
+    """
+    alpha: float
+    word_bytes: int = 1
+    min_bits: int = 1000
+    stuck_words: int = 64
+    ones: list = None
+    words: int = 0
+    z_threshold: float = None
+
+    def __post_init__(self):
+        if not (0 < self.alpha < 1):
+            raise ValueError("alpha must be in (0,1)")
+        if self.word_bytes not in (1, 2, 4, 8):
+            raise ValueError("word_bytes must be 1, 2, 4 or 8")
+        if self.min_bits <= 0 or self.stuck_words <= 0:
+            raise ValueError("min_bits and stuck_words must be > 0")
+        self.width = 8 * self.word_bytes
+        self.ones = [0] * self.width
+        self.z_threshold = inv_norm_cdf(1 - self.alpha / (2.0 * self.width))
+        # Bit path: position of the next bit and the current stuck window.
+        self._pos = 0
+        self._win = [0] * self.width
+        self._win_words = 0
+        # Block path: bytes short of a whole stuck window, carried over.
+        self._tail = b""
+
+    def _event(self, kind: str, pos: int, stat: float | None = None) -> dict:
+        evt = {
+            "test": "BITPOS",
+            "kind": kind,
+            "position": pos,
+            "word_bytes": self.word_bytes,
+            "ones": self.ones[pos],
+            "n": self.words,
+        }
+        if kind == "bias":
+            evt.update({
+                "direction": "p > 0.5" if stat > 0 else "p < 0.5",
+                "stat": stat,
+                "threshold": self.z_threshold,
+                "message": f"Bit position {pos} Z exceeds threshold (|Z|≥{self.z_threshold:.3f})",
+            })
+        else:
+            evt.update({
+                "window_words": self.stuck_words,
+                "message": f"Bit position {pos} stuck at {kind[-1]} for {self.stuck_words} words",
+            })
+        return evt
+
+    def _worst(self) -> tuple[int, float] | None:
+        """Position with the largest |Z| once min_bits words are in, or None."""
+        if self.words < self.min_bits:
+            return None
+        half, scale = 0.5 * self.words, 0.5 * math.sqrt(self.words)
+        pos = max(range(self.width), key=lambda p: abs(self.ones[p] - half))
+        return pos, (self.ones[pos] - half) / scale
+
+    def update(self, bit: int):
+        pos = self._pos
+        self.ones[pos] += bit
+        self._win[pos] += bit
+        if pos + 1 < self.width:
+            self._pos = pos + 1
+            return None
+        self._pos = 0
+        self.words += 1
+        self._win_words += 1
+        evt = None
+        if self._win_words == self.stuck_words:
+            for p, c in enumerate(self._win):
+                if c == 0 or c == self.stuck_words:
+                    evt = self._event(f"stuck_at_{int(c > 0)}", p)
+                    break
+            self._win = [0] * self.width
+            self._win_words = 0
+        if evt is None:
+            worst = self._worst()
+            if worst is not None and abs(worst[1]) >= self.z_threshold:
+                evt = self._event("bias", *worst)
+        return evt
+
+    def update_bytes(self, data) -> dict | None:
+        """Block version of ``update`` over a bytes-like object.
+
+        Whole stuck windows are unpacked and summed per position with
+        NumPy (reshape to windows x words x positions); the bytes of an
+        incomplete window wait for the next block. Z is evaluated once at
+        the end of the block rather than after every word. Falls back to
+        per-bit updates without NumPy.
+        """
+        if np is None or self._pos:
+            return _update_bits(self, data)
+        lead = len(self._tail)
+        if lead:
+            data = self._tail + bytes(data)
+        group = self.word_bytes * self.stuck_words
+        usable = len(data) - len(data) % group
+        self._tail = bytes(data[usable:])
+        if not usable:
+            return None
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=usable), bitorder="little")
+        per_win = bits.reshape(-1, self.stuck_words, self.width).sum(axis=1)
+        stuck = (per_win == 0) | (per_win == self.stuck_words)
+        first = None
+        if stuck.any():
+            w, pos = divmod(int(np.argmax(stuck)), self.width)
+            before = per_win[:w + 1].sum(axis=0)
+            self.ones = [a + int(b) for a, b in zip(self.ones, before)]
+            self.words += (w + 1) * self.stuck_words
+            first = self._event(f"stuck_at_{int(per_win[w, pos] > 0)}", pos)
+            first["offset"] = 8 * ((w + 1) * group - lead) - 1
+            rest = per_win[w + 1:].sum(axis=0)
+            self.ones = [a + int(b) for a, b in zip(self.ones, rest)]
+            self.words += (len(per_win) - w - 1) * self.stuck_words
+        else:
+            total = per_win.sum(axis=0)
+            self.ones = [a + int(b) for a, b in zip(self.ones, total)]
+            self.words += len(per_win) * self.stuck_words
+            worst = self._worst()
+            if worst is not None and abs(worst[1]) >= self.z_threshold:
+                first = self._event("bias", *worst)
+                first["offset"] = 8 * (usable - lead) - 1
+        return first
+
+    def skip(self):
+        """Drop the carried partial window before a gap in the stream (chunks skipped by a CPU budget)."""
+        self._tail = b""
+
+    def stats(self) -> dict:
+        """Counters for STATS payloads (summed across processes by the aggregator)."""
+        return {"bitpos_word_bytes": self.word_bytes, "bitpos_words": self.words, "bitpos_ones": list(self.ones)}
+
+    def checkpoint(self) -> tuple:
+        """Copy of the state for `checkpoint.capture_proc`: (params, ints, floats, arrays, raw bytes)."""
+        return ((self.alpha, self.word_bytes, self.min_bits, self.stuck_words),
+                (self.words, self._pos, self._win_words), (),
+                (array("q", self.ones), array("q", self._win)), self._tail)
+
+    def restore(self, ints, floats, arrays, raw):
+        """Inverse of ``checkpoint`` on a test built with the same params."""
+        self.words, self._pos, self._win_words = ints
+        self.ones, self._win = list(arrays[0]), list(arrays[1])
+        self._tail = bytes(raw)
+
+
+def _dot_exact(x, y) -> int:
+    """Exact dot product of two non-negative int64 count arrays.
+
+    Uses int64 when no sum can overflow and Python ints otherwise: a stuck
+    source piles every pattern into one counter, whose products with the
+    chunk counts outgrow int64 long before the counters themselves do.
+    """
+    if len(x) * int(x.max(initial=0)) * int(y.max(initial=0)) < (1 << 63):
+        return int(np.dot(x, y))
+    return sum(a * b for a, b in zip(x.tolist(), y.tolist()))
+
+
+@dataclass
+class SerialTest:
+    """Overlapping m-bit serial test (SP 800-22 2.11), streaming.
+
+    Counts every overlapping m-bit pattern (the earliest bit is bit 0 of
+    the pattern index) together with its (m-1)- and (m-2)-bit prefixes,
+    and keeps the sums of squared counts so the statistics are O(1) to
+    evaluate. Flags when ∇ψ²_m or ∇²ψ²_m exceeds its chi-square threshold
+    (2^(m-1) and 2^(m-2) degrees of freedom, alpha split between them)
+    after min_bits patterns.
+    """
+    alpha: float
+    m: int = 8
+    min_bits: int = None
+    n: int = 0
+    d1_threshold: float = None
+    d2_threshold: float = None
+
+    def __post_init__(self):
+        if not (0 < self.alpha < 1):
+            raise ValueError("alpha must be in (0,1)")
+        if not (2 <= self.m <= 16):
+            raise ValueError("m must be in [2, 16]")
+        if self.min_bits is None:
+            self.min_bits = max(10000, 5 << self.m)
+        self.d1_threshold = chi2_upper_quantile(1 << (self.m - 1), self.alpha / 2.0)
+        self.d2_threshold = chi2_upper_quantile(1 << (self.m - 2), self.alpha / 2.0)
+        # Preallocated counts for orders m, m-1, m-2 and their sums of squares.
+        self.counts = [array("q", bytes(8 << k)) for k in (self.m, self.m - 1, self.m - 2)]
+        self.sq = [0, 0, 0]
+        # Last bits seen: the newest at bit m-1, `filled` of them valid.
+        self.window = 0
+        self.filled = 0
+
+    def deltas(self) -> tuple[float, float] | None:
+        """(∇ψ²_m, ∇²ψ²_m) over the patterns so far, or None before any."""
+        n = self.n
+        if n == 0:
+            return None
+        m = self.m
+        # n * ψ²_k = 2^k * Σν_k² - n², exact in integers.
+        psi = [(s << (m - i)) - n * n for i, s in enumerate(self.sq)]
+        return (psi[0] - psi[1]) / n, (psi[0] - 2 * psi[1] + psi[2]) / n
+
+    def _check(self) -> dict | None:
+        if self.n < self.min_bits:
+            return None
+        d1, d2 = self.deltas()
+        if d1 < self.d1_threshold and d2 < self.d2_threshold:
+            return None
+        return {
+            "test": "SERIAL",
+            "m": self.m,
+            "n": self.n,
+            "stat": [d1, d2],
+            "threshold": [self.d1_threshold, self.d2_threshold],
+            "message": f"{self.m}-bit pattern frequencies off (∇ψ²={d1:.1f}, ∇²ψ²={d2:.1f})",
+        }
+
+    def update(self, bit: int):
+        m = self.m
+        w = self.window = (self.window >> 1) | (bit << (m - 1))
+        if self.filled < m:
+            self.filled += 1
+            if self.filled < m:
+                return None
+        for i, arr in enumerate(self.counts):
+            v = w & ((1 << (m - i)) - 1)
+            self.sq[i] += 2 * arr[v] + 1
+            arr[v] += 1
+        self.n += 1
+        return self._check()
+
+    def update_bytes(self, data) -> dict | None:
+        """Block version of ``update`` over a bytes-like object.
+
+        The block is unpacked after the carried last m-1 bits; pattern
+        indices are built from shifted slices in O(log m) array passes,
+        counted with ``bincount``
+        and added into the counters through NumPy views of their arrays.
+        The statistics are checked once, at the end of the block. Falls
+        back to per-bit updates without NumPy.
+        """
+        if np is None:
+            return _update_bits(self, data)
+        m = self.m
+        keep = min(self.filled, m - 1)
+        carry = np.array([(self.window >> (m - keep + j)) & 1 for j in range(keep)], dtype=np.uint8)
+        bits = np.concatenate((carry, np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little")))
+        size = len(bits)
+        if size < m:
+            for b in bits[keep:]:
+                self.update(int(b))
+            return None
+        count = size - m + 1
+        # Pattern indices by doubling: p holds the w-bit patterns at every
+        # position, idx the a-bit ones built from the binary digits of m.
+        p, w = bits.astype(np.uint32), 1
+        idx, a = None, 0
+        while True:
+            if m & w:
+                idx, a = (p, w) if idx is None else (idx[:len(p) - a] | (p[a:] << a), a + w)
+            if 2 * w > m:
+                break
+            p = p[:-w] | (p[w:] << w)
+            w *= 2
+        c = np.bincount(idx[:count], minlength=1 << m)
+        for i, arr in enumerate(self.counts):
+            if i:
+                c = c.reshape(2, -1).sum(axis=0)
+            view = np.frombuffer(arr, dtype=np.int64)
+            self.sq[i] += 2 * _dot_exact(view, c) + _dot_exact(c, c)
+            view += c
+        self.n += count
+        tail = bits[size - m:]
+        self.window = int(np.dot(tail.astype(np.int64), 1 << np.arange(m, dtype=np.int64)))
+        self.filled = m
+        evt = self._check()
+        if evt is not None:
+            evt["offset"] = 8 * len(data) - 1
+        return evt
+
+    def skip(self):
+        """Forget the carried bits before a gap, so no pattern spans it."""
+        self.filled = 0
+
+    def stats(self) -> dict:
+        """Current statistics for STATS payloads."""
+        d = self.deltas()
+        return {"serial_m": self.m, "serial_n": self.n, "serial_stat": list(d) if d is not None else None}
+
+    def checkpoint(self) -> tuple:
+        """Copy of the state for `checkpoint.capture_proc` (sums of squares are recomputed on restore)."""
+        return ((self.alpha, self.m, self.min_bits), (self.n, self.window, self.filled), (),
+                tuple(array("q", arr) for arr in self.counts), b"")
+
+    def restore(self, ints, floats, arrays, raw):
+        """Inverse of ``checkpoint`` on a test built with the same params."""
+        self.n, self.window, self.filled = ints
+        for arr, saved in zip(self.counts, arrays):
+            arr[:] = saved
+        self.sq = [sum(c * c for c in arr) for arr in self.counts]
+
+
+# Expected value and variance of log2 distances for L = 6..16 (SP 800-22 2.9).
+_MAURER_MOMENTS = {
+    6: (5.2177052, 2.954), 7: (6.1962507, 3.125), 8: (7.1836656, 3.238),
+    9: (8.1764248, 3.311), 10: (9.1723243, 3.356), 11: (10.170032, 3.384),
+    12: (11.168765, 3.401), 13: (12.168070, 3.410), 14: (13.167693, 3.416),
+    15: (14.167488, 3.419), 16: (15.167379, 3.421),
+}
+
+
+@dataclass
+class MaurerUniversal:
+    """Maurer's universal statistical test (SP 800-22 2.9), streaming.
+
+    The stream is cut into non-overlapping L-bit blocks (the earliest bit
+    is bit 0 of the block value). The first init_blocks blocks only fill
+    the last-occurrence table; after that every block adds the log2 of the
+    distance to its previous occurrence, and each run of test_blocks
+    blocks is evaluated as one segment: a two-sided p-value below alpha
+    flags a compressible (or too regular) stream.
+    """
+    alpha: float
+    L: int = 8
+    init_blocks: int = None
+    test_blocks: int = None
+    blocks: int = 0
+    segments: int = 0
+    last_fn: float = None
+    last_p: float = None
+
+    def __post_init__(self):
+        if not (0 < self.alpha < 1):
+            raise ValueError("alpha must be in (0,1)")
+        if self.L not in _MAURER_MOMENTS:
+            raise ValueError("L must be in [6, 16]")
+        if self.init_blocks is None:
+            self.init_blocks = 10 << self.L
+        if self.test_blocks is None:
+            self.test_blocks = 1000 << self.L
+        if self.init_blocks < 0 or self.test_blocks <= 0:
+            raise ValueError("init_blocks must be >= 0 and test_blocks > 0")
+        L, K = self.L, self.test_blocks
+        self.expected, variance = _MAURER_MOMENTS[L]
+        c = 0.7 - 0.8 / L + (4 + 32 / L) * K ** (-3 / L) / 15
+        self.sigma = c * math.sqrt(variance / K)
+        # 1-based index of the last occurrence of each block value, 0 if none.
+        self.table = array("q", bytes(8 << L))
+        self._sum = 0.0
+        self._count = 0
+        # Bits of the current incomplete block (earliest at bit 0).
+        self._acc = 0
+        self._acc_bits = 0
+
+    def _segment_done(self) -> dict | None:
+        fn = self._sum / self.test_blocks
+        z = (fn - self.expected) / self.sigma
+        p = math.erfc(abs(z) / math.sqrt(2.0))
+        self.last_fn, self.last_p = fn, p
+        self.segments += 1
+        self._sum = 0.0
+        self._count = 0
+        if p >= self.alpha:
+            return None
+        return {
+            "test": "MAURER",
+            "L": self.L,
+            "fn": fn,
+            "expected": self.expected,
+            "p_value": p,
+            "segment": self.segments,
+            "message": f"Universal statistic {fn:.4f} vs {self.expected:.4f} (p={p:.2e} < {self.alpha:g})",
+        }
+
+    def _block(self, v: int) -> dict | None:
+        self.blocks += 1
+        i = self.blocks
+        prev = self.table[v]
+        self.table[v] = i
+        if i <= self.init_blocks:
+            return None
+        self._sum += math.log2(i - prev)
+        self._count += 1
+        if self._count == self.test_blocks:
+            return self._segment_done()
+        return None
+
+    def update(self, bit: int):
+        self._acc |= bit << self._acc_bits
+        self._acc_bits += 1
+        if self._acc_bits < self.L:
+            return None
+        v = self._acc
+        self._acc = 0
+        self._acc_bits = 0
+        return self._block(v)
+
+    def update_bytes(self, data) -> dict | None:
+        """Block version of ``update`` over a bytes-like object.
+
+        Block values are read straight from the bytes for L = 8 or 16 when
+        the stream is block-aligned, otherwise unpacked and reshaped. The
+        distances of a whole chunk are computed at once: a stable sort by
+        value links each block to its previous occurrence in the chunk,
+        and first occurrences look up the table. Falls back to per-bit
+        updates without NumPy.
+        """
+        if np is None:
+            return _update_bits(self, data)
+        L = self.L
+        lead = self._acc_bits
+        # Values stay 8/16-bit so the stable argsort below is a radix sort.
+        if lead == 0 and L == 8:
+            vals = np.frombuffer(data, dtype=np.uint8)
+        elif lead == 0 and L == 16 and len(data) % 2 == 0:
+            vals = np.frombuffer(data, dtype="<u2")
+        else:
+            carry = np.array([(self._acc >> j) & 1 for j in range(lead)], dtype=np.uint8)
+            bits = np.concatenate((carry, np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little")))
+            whole = len(bits) - len(bits) % L
+            rest = bits[whole:]
+            self._acc = int(np.dot(rest.astype(np.int64), 1 << np.arange(len(rest), dtype=np.int64)))
+            self._acc_bits = len(rest)
+            vals = (bits[:whole].reshape(-1, L).astype(np.uint16) << np.arange(L, dtype=np.uint16)).sum(
+                axis=1, dtype=np.uint16)
+        n = len(vals)
+        if n == 0:
+            return None
+        pos = np.arange(self.blocks + 1, self.blocks + 1 + n, dtype=np.int64)
+        table = np.frombuffer(self.table, dtype=np.int64)
+        order = np.argsort(vals, kind="stable")
+        sv, sp = vals[order], pos[order]
+        same = np.zeros(n, dtype=bool)
+        same[1:] = sv[1:] == sv[:-1]
+        prev = table[sv]
+        prev[1:] = np.where(same[1:], sp[:-1], prev[1:])
+        dist = np.empty(n, dtype=np.int64)
+        dist[order] = sp - prev
+        last = np.ones(n, dtype=bool)
+        last[:-1] = ~same[1:]
+        table[sv[last]] = sp[last]
+        self.blocks += n
+
+        skip = max(0, min(n, self.init_blocks - int(pos[0]) + 1))
+        logs = np.log2(dist[skip:])
+        first = None
+        start = 0
+        while start < len(logs):
+            take = min(self.test_blocks - self._count, len(logs) - start)
+            self._sum += float(logs[start:start + take].sum())
+            self._count += take
+            start += take
+            if self._count == self.test_blocks:
+                evt = self._segment_done()
+                if evt is not None and first is None:
+                    evt["offset"] = (skip + start) * L - lead - 1
+                    first = evt
+        return first
+
+    def skip(self):
+        """Drop the incomplete block before a gap in the stream."""
+        self._acc = 0
+        self._acc_bits = 0
+
+    def stats(self) -> dict:
+        """Last segment's statistic and p-value for STATS payloads."""
+        return {"maurer_L": self.L, "maurer_segments": self.segments, "maurer_fn": self.last_fn,
+                "maurer_p": self.last_p}
+
+    def checkpoint(self) -> tuple:
+        """Copy of the state for `checkpoint.capture_proc` (None statistics as NaN)."""
+        nan = float("nan")
+        return ((self.alpha, self.L, self.init_blocks, self.test_blocks),
+                (self.blocks, self.segments, self._count, self._acc, self._acc_bits),
+                (self._sum, nan if self.last_fn is None else self.last_fn, nan if self.last_p is None else self.last_p),
+                (array("q", self.table),), b"")
 
+    def restore(self, ints, floats, arrays, raw):
+        """Inverse of ``checkpoint`` on a test built with the same params."""
+        self.blocks, self.segments, self._count, self._acc, self._acc_bits = ints
+        self._sum, fn, p = floats
+        self.last_fn = None if fn != fn else fn
+        self.last_p = None if p != p else p
+        self.table[:] = arrays[0]
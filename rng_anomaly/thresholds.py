@@ -0,0 +1,288 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import importlib.util
+
+from .utils import iso_now, apt_bounds_binomial, rct_cutoff_from_alpha, inv_norm_cdf
+
+
+CACHE_VERSION = 1
+
+# Levels seen fewer times than this are extrapolated from the tail fit.
+MIN_EVENTS = 20
+
+
+def default_cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "rng-anomaly", "thresholds.json")
+
+
+def _blocks(np, rng, total_bits: int, block_bits: int):
+    done = 0
+    while done < total_bits:
+        n = min(block_bits, total_bits - done)
+        yield np.unpackbits(np.frombuffer(rng.bytes((n + 7) // 8), dtype=np.uint8), bitorder="little")[:n]
+        done += n
+
+
+def simulate_rct(np, rng, total_bits: int, block_bits: int, max_len: int = 64):
+    """
+    Run-length census of fair bits: element c of the result is the number
+    of runs that reached length c (an RCT with cutoff c fires once per
+    such run). Runs are carried across blocks.
+    """
+    reach = np.zeros(max_len + 2, dtype=np.int64)
+    lengths_hist = np.zeros(max_len + 2, dtype=np.int64)
+    carry_bit, carry_len = None, 0
+    for bits in _blocks(np, rng, total_bits, block_bits):
+        edges = np.flatnonzero(np.diff(bits)) + 1
+        starts = np.concatenate(([0], edges))
+        lengths = np.diff(np.concatenate((starts, [len(bits)])))
+        if carry_bit is not None and bits[0] == carry_bit:
+            lengths[0] += carry_len
+        elif carry_bit is not None:
+            lengths_hist[min(carry_len, max_len + 1)] += 1
+        # The last run may continue in the next block.
+        carry_bit, carry_len = int(bits[-1]), int(lengths[-1])
+        lengths_hist += np.bincount(np.minimum(lengths[:-1], max_len + 1), minlength=max_len + 2)
+    if carry_bit is not None:
+        lengths_hist[min(carry_len, max_len + 1)] += 1
+    reach[:] = np.cumsum(lengths_hist[::-1])[::-1]
+    return reach
+
+
+def simulate_apt(np, rng, total_bits: int, block_bits: int, window: int):
+    """
+    Alarm episodes of a sliding-window proportion test on fair bits:
+    element M of the result is the number of times |2*ones - W| went
+    from <= M to > M (one episode per excursion out of the bounds).
+    """
+    counts = np.zeros(window + 2, dtype=np.int64)
+    tail = np.zeros(0, dtype=np.uint8)
+    prev_dev = None
+    for bits in _blocks(np, rng, total_bits, block_bits):
+        seq = np.concatenate((tail, bits))
+        if len(seq) < window:
+            tail = seq
+            continue
+        cs = np.concatenate(([0], np.cumsum(seq, dtype=np.int64)))
+        dev = np.abs(2 * (cs[window:] - cs[:-window]) - window)
+        if prev_dev is not None:
+            dev = np.concatenate(([prev_dev], dev))
+        up = np.flatnonzero(dev[1:] > dev[:-1])
+        # Levels dev[i-1] .. dev[i]-1 are crossed upwards at step i.
+        np.add.at(counts, dev[up], 1)
+        np.add.at(counts, dev[up + 1], -1)
+        prev_dev = int(dev[-1])
+        tail = seq[-(window - 1):] if window > 1 else seq[:0]
+    return np.cumsum(counts)[:window + 1]
+
+
+def simulate_z(np, rng, paths: int, min_bits: int, horizon_bits: int, ratio: float = 1.002):
+    """
+    Largest |Z| seen by each of `paths` monobit runs over [min_bits,
+    horizon_bits], evaluated on a geometric grid (exact binomial
+    increments between grid points).
+    """
+    grid = [min_bits]
+    while grid[-1] < horizon_bits:
+        grid.append(min(horizon_bits, max(grid[-1] + 1, int(grid[-1] * ratio))))
+    grid = np.array(grid, dtype=np.int64)
+    steps = np.diff(np.concatenate(([0], grid)))
+    best = np.zeros(paths)
+    chunk = max(1, (1 << 22) // len(grid))
+    for start in range(0, paths, chunk):
+        n = min(chunk, paths - start)
+        ones = np.cumsum(rng.binomial(steps, 0.5, size=(n, len(steps))), axis=1)
+        z = np.abs(ones - 0.5 * grid) / np.sqrt(0.25 * grid)
+        best[start:start + n] = z.max(axis=1)
+    return np.sort(best)
+
+
+def _pick_level(events, total: float, max_rate: float, first: int, slope_fn):
+    """
+    Smallest level whose event rate per bit is <= max_rate. Levels with
+    fewer than MIN_EVENTS events use `slope_fn(level, ref_level, ref_rate)`
+    from the last well-sampled level. Returns (level, rate, extrapolated).
+    """
+    ref = None
+    for level in range(first, len(events)):
+        if events[level] >= MIN_EVENTS:
+            ref = level
+            rate = events[level] / total
+            if rate <= max_rate:
+                return level, rate, False
+            continue
+        if ref is None:
+            return level, 0.0, True
+        ref_rate = events[ref] / total
+        rate = slope_fn(level, ref, ref_rate)
+        if rate <= max_rate:
+            return level, rate, True
+    return len(events) - 1, 0.0, True
+
+
+def calibrate_rct(np, rng, total_bits: int, block_bits: int, alpha: float, max_rate: float) -> dict:
+    reach = simulate_rct(np, rng, total_bits, block_bits)
+    nominal = rct_cutoff_from_alpha(alpha)
+    cutoff, rate, extra = _pick_level(reach, total_bits, max_rate, 8,
+                                      lambda c, r, rr: rr * 0.5 ** (c - r))
+    return {
+        "cutoff": int(cutoff),
+        "rate_per_bit": rate,
+        "extrapolated": extra,
+        "nominal": {"alpha": alpha, "cutoff": nominal,
+                    "rate_per_bit": float(reach[nominal]) / total_bits if nominal < len(reach) else None},
+    }
+
+
+def calibrate_apt(np, rng, total_bits: int, block_bits: int, window: int, alpha: float, max_rate: float) -> dict:
+    episodes = simulate_apt(np, rng, total_bits, block_bits, window)
+    lo, hi = apt_bounds_binomial(window, alpha)
+    margin = 2 * hi - window
+    # Gaussian tail: log rate falls with level^2 / (2W); scale from the reference level.
+    m, rate, extra = _pick_level(episodes, total_bits, max_rate, 1,
+                                 lambda lv, r, rr: rr * math.exp(-(lv * lv - r * r) / (2.0 * window)))
+    return {
+        "window": window,
+        "lo": int(math.ceil((window - m) / 2.0)),
+        "hi": int(math.floor((window + m) / 2.0)),
+        "rate_per_bit": rate,
+        "extrapolated": extra,
+        "nominal": {"alpha": alpha, "lo": lo, "hi": hi,
+                    "rate_per_bit": float(episodes[margin]) / total_bits if 0 <= margin < len(episodes) else None},
+    }
+
+
+def calibrate_z(np, rng, paths: int, min_bits: int, horizon_bits: int, alpha: float, max_prob: float) -> dict:
+    best = simulate_z(np, rng, paths, min_bits, horizon_bits)
+    nominal = inv_norm_cdf(1 - alpha / 2.0)
+    idx = min(len(best) - 1, int(math.ceil((1.0 - max_prob) * len(best))))
+    return {
+        "min_bits": min_bits,
+        "horizon_bits": horizon_bits,
+        "z_threshold": float(best[idx]) if max_prob * len(best) >= 1 else None,
+        "fa_prob": max_prob,
+        "paths": paths,
+        "nominal": {"alpha": alpha, "z_threshold": nominal,
+                    "fa_prob": float(np.mean(best >= nominal))},
+    }
+
+
+def load_thresholds(path: str) -> dict:
+    """Read a threshold cache written by `rng-anomaly thresholds`. Raises ValueError if unusable."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != CACHE_VERSION:
+        raise ValueError("unsupported threshold cache version")
+    return data
+
+
+def apply_thresholds(cache: dict, rct, apt, zmono=None) -> list[str]:
+    """
+    Replace the alpha-derived cutoffs of freshly built tests with the
+    cached ones (APT only for a matching window, Z only for a matching
+    min_bits). Returns the names of the tests that were changed.
+    """
+    changed = []
+    entry = cache.get("RCT")
+    if entry and entry.get("cutoff"):
+        rct.cutoff = int(entry["cutoff"])
+        changed.append("RCT")
+    entry = cache.get("APT", {}).get(str(apt.window))
+    if entry:
+        apt.lo, apt.hi = int(entry["lo"]), int(entry["hi"])
+        changed.append("APT")
+    entry = cache.get("ZMONO")
+    if zmono is not None and entry and entry.get("z_threshold") and entry.get("min_bits") == zmono.min_bits:
+        zmono.z_threshold = float(entry["z_threshold"])
+        changed.append("ZMONO")
+    return changed
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(
+        prog="rng-anomaly thresholds",
+        description="Monte Carlo false-alarm rates for RCT, APT and Z; write corrected thresholds to a cache.",
+    )
+    ap.add_argument("--bits", type=float, default=float(1 << 28),
+                    help="Simulated fair bits for RCT and each APT window (default 2^28).")
+    ap.add_argument("--block-bits", type=int, default=1 << 24,
+                    help="Bits per vectorized block (default 2^24).")
+    ap.add_argument("--apt-window", type=_int_list, default=[1024],
+                    help="Comma-separated APT windows to calibrate (default 1024).")
+    ap.add_argument("--alpha", type=float, default=1e-6,
+                    help="Alpha the nominal thresholds are derived from (for comparison).")
+    ap.add_argument("--source-bps", type=float, default=1e7,
+                    help="Throughput the per-hour rates refer to (default 1e7).")
+    ap.add_argument("--target-per-hour", type=float, default=1e-3,
+                    help="Acceptable false alarms per hour per test (default 1e-3).")
+    ap.add_argument("--z-paths", type=int, default=4000,
+                    help="Simulated runs for the Z threshold (default 4000).")
+    ap.add_argument("--z-min-bits", type=int, default=10000,
+                    help="Z min_bits the threshold is computed for (default 10000).")
+    ap.add_argument("--z-hours", type=float, default=1.0,
+                    help="Run length for the Z false-alarm probability, in hours at --source-bps (default 1).")
+    ap.add_argument("--seed", type=int, default=None, help="Seed (default: random).")
+    ap.add_argument("--out", default=None,
+                    help=f"Cache path (default {default_cache_path()}).")
+    args = ap.parse_args(argv)
+    if importlib.util.find_spec("numpy") is None:
+        print("Error: rng-anomaly thresholds needs numpy", file=sys.stderr)
+        sys.exit(1)
+    if args.bits <= 0 or args.block_bits <= 0 or args.source_bps <= 0 or args.target_per_hour <= 0:
+        ap.error("--bits, --block-bits, --source-bps and --target-per-hour must be > 0")
+    if not args.apt_window or min(args.apt_window) <= 0:
+        ap.error("--apt-window must be positive")
+    import numpy as np
+
+    rng = np.random.default_rng(args.seed)
+    total = int(args.bits)
+    max_rate = args.target_per_hour / (args.source_bps * 3600.0)
+    horizon = int(args.z_hours * 3600.0 * args.source_bps)
+    t0 = time.perf_counter()
+    cache = {
+        "version": CACHE_VERSION,
+        "ts": iso_now(),
+        "params": {"bits": total, "source_bps": args.source_bps, "target_per_hour": args.target_per_hour,
+                   "alpha": args.alpha, "seed": args.seed},
+        "RCT": calibrate_rct(np, rng, total, args.block_bits, args.alpha, max_rate),
+        "APT": {str(w): calibrate_apt(np, rng, total, args.block_bits, w, args.alpha, max_rate)
+                for w in args.apt_window},
+        "ZMONO": calibrate_z(np, rng, args.z_paths, args.z_min_bits, max(horizon, args.z_min_bits + 1),
+                             args.alpha, min(1.0, args.target_per_hour * args.z_hours)),
+    }
+    cache["elapsed_sec"] = round(time.perf_counter() - t0, 3)
+
+    out = args.out or default_cache_path()
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = f"{out}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, out)
+
+    per_hour = args.source_bps * 3600.0
+
+    def hourly(rate):
+        return f"{rate * per_hour:.3g}/h" if rate is not None else "n/a"
+
+    r = cache["RCT"]
+    print(f"RCT   nominal cutoff {r['nominal']['cutoff']:>3}: {hourly(r['nominal']['rate_per_bit'])}   "
+          f"corrected {r['cutoff']:>3}: {hourly(r['rate_per_bit'])}{' (extrapolated)' if r['extrapolated'] else ''}")
+    for w, a in cache["APT"].items():
+        n = a["nominal"]
+        print(f"APT   W={w} nominal [{n['lo']},{n['hi']}]: {hourly(n['rate_per_bit'])}   "
+              f"corrected [{a['lo']},{a['hi']}]: {hourly(a['rate_per_bit'])}{' (extrapolated)' if a['extrapolated'] else ''}")
+    z = cache["ZMONO"]
+    z_txt = f"{z['z_threshold']:.3f}" if z["z_threshold"] is not None else "n/a (raise --z-paths)"
+    print(f"ZMONO nominal |Z|>={z['nominal']['z_threshold']:.3f}: P(alarm in {args.z_hours:g}h)="
+          f"{z['nominal']['fa_prob']:.3g}   corrected |Z|>={z_txt}")
+    print(f"-> {out}")
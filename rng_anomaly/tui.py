@@ -1,14 +1,164 @@
+import sys
 import time
 import curses
-import sys
+import locale
+import threading
+import functools
+from collections import deque
+
+from .utils import human_bps
+
+
+_BASE_ONE = (
+    "  11  ",
+    " 111  ",
+    "  11  ",
+    "  11  ",
+    "  11  ",
+    "  11  ",
+    " 11111",
+)
+_BASE_ZERO = (
+    " 0000 ",
+    "00  00",
+    "00  00",
+    "00  00",
+    "00  00",
+    "00  00",
+    " 0000 ",
+)
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+RESET = "\x1b[0m"
+GREEN = "\x1b[32m"
+CYAN = "\x1b[36m"
+BOLD = "\x1b[1m"
+
+
+@functools.lru_cache(maxsize=None)
+def scaled_glyphs(scale: int, gap: int) -> tuple[tuple[str, ...], tuple[str, ...], int]:
+    """The big '1' and '0' scaled by `scale`, and their total width with `gap` spaces between."""
+    k = max(1, int(scale))
+
+    def scale_art(art):
+        if k <= 1:
+            return art
+        scaled = []
+        for row in art:
+            row_scaled = "".join(ch * k for ch in row)
+            scaled += [row_scaled] * k
+        return tuple(scaled)
+
+    one, zero = scale_art(_BASE_ONE), scale_art(_BASE_ZERO)
+    return one, zero, len(one[0]) + max(1, int(gap)) + len(zero[0])
+
+
+@functools.lru_cache(maxsize=64)
+def _pretty_art_rows(scale: int, gap: int, content_width: int) -> tuple[str, ...]:
+    one, zero, width = scaled_glyphs(scale, gap)
+    spacer = " " * max(1, int(gap))
+    left_pad = (content_width - width) // 2
+    right_pad = content_width - width - left_pad
+    return tuple(
+        "│" + (" " * left_pad) + f"{GREEN}{BOLD}{o}{RESET}" + spacer + f"{CYAN}{BOLD}{z}{RESET}"
+        + (" " * right_pad) + "│"
+        for o, z in zip(one, zero)
+    )
+
+
+def sparkline(values, width: int) -> str:
+    """The last `width` values as block characters, scaled to their own min..max."""
+    vals = list(values)[-width:] if width > 0 else []
+    if not vals:
+        return ""
+    lo, hi = min(vals), max(vals)
+    if hi <= lo:
+        return SPARK_CHARS[0] * len(vals)
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[int((v - lo) / (hi - lo) * top + 0.5)] for v in vals)
+
+
+class ProcHistory:
+    """
+    Per-process bps and bias samples for the sparkline panels. `sample`
+    reads the Aggregator slots (bias from the bits/ones added since the
+    previous sample) and keeps the last `length` points per process.
+    """
+
+    def __init__(self, length: int = 120):
+        self.length = length
+        self.rows = {}
+
+    def sample(self, procs: dict):
+        for pid, slot in procs.items():
+            row = self.rows.get(pid)
+            if row is None:
+                row = self.rows[pid] = {"bps": deque(maxlen=self.length), "bias": deque(maxlen=self.length),
+                                        "bits": 0, "ones": 0}
+            bps, bits, ones = slot[0], slot[1], slot[2]
+            row["bps"].append(float(bps or 0.0))
+            d_bits, d_ones = bits - row["bits"], ones - row["ones"]
+            if d_bits > 0:
+                row["bias"].append(200.0 * d_ones / d_bits - 100.0)
+            row["bits"], row["ones"] = bits, ones
+
+
+class _Refresher:
+    """
+    Fixed-rate refresh thread. Producers only store the latest values;
+    `draw` runs on the thread every `interval` seconds (and once more on
+    `stop`), so rendering cost does not depend on the message rate.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = max(0.01, float(interval))
+        self.frames = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def draw(self):
+        raise NotImplementedError
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._draw_safe()
+
+    def _draw_safe(self):
+        try:
+            self.draw()
+            self.frames += 1
+        except Exception:
+            pass
+
+    def start_thread(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop_thread(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        self._draw_safe()
 
 
-class LiveUI:
-    def __init__(self, enabled: bool, refresh_sec: float, pct_decimals: int = 6, scale: int = 1, gap: int = 2):
+class LiveUI(_Refresher):
+    """
+    Curses UI: big 1/0, percentages, and with `agg` a per-process panel
+    (bps, bias, sparklines of both). Each frame is a set of positioned
+    text segments; only segments that differ from the previous frame are
+    written, and the glyphs come from `scaled_glyphs`.
+    """
+
+    def __init__(self, enabled: bool, refresh_sec: float, pct_decimals: int = 6, scale: int = 1, gap: int = 2,
+                 agg=None, spark_sec: float = 1.0):
+        super().__init__(refresh_sec)
         self.enabled = enabled
         self.refresh_sec = refresh_sec
         self.screen = None
-        self.last_draw = 0.0
+        self.agg = agg
         self.last_ones_pct = None
         self.last_zeros_pct = None
         self.color_enabled = False
@@ -20,10 +170,19 @@ class LiveUI:
             self.pct_decimals = max(0, int(pct_decimals))
         except Exception:
             self.pct_decimals = 6
+        self.history = ProcHistory()
+        self.spark_sec = spark_sec
+        self.last_sample = 0.0
+        self.prev = {}
+        self.size = None
 
     def start(self):
         if not self.enabled:
             return
+        try:
+            locale.setlocale(locale.LC_ALL, "")
+        except locale.Error:
+            pass
         try:
             self.screen = curses.initscr()
             curses.noecho()
@@ -50,10 +209,13 @@ class LiveUI:
                 self.color_enabled = False
         except Exception:
             self.enabled = False
+            return
+        self.start_thread()
 
     def stop(self):
         if not self.enabled:
             return
+        self.stop_thread()
         try:
             curses.nocbreak()
             try:
@@ -66,124 +228,106 @@ class LiveUI:
             pass
 
     def update(self, ones_pct: float | None, zeros_pct: float | None):
-        if not self.enabled:
-            return
-        now = time.perf_counter()
-        if (now - self.last_draw) < self.refresh_sec:
-            return
-        self.last_draw = now
+        """Store the latest percentages (used when no Aggregator is attached)."""
         self.last_ones_pct = ones_pct
         self.last_zeros_pct = zeros_pct
-        try:
-            self.screen.erase()
-            maxy, maxx = self.screen.getmaxyx()
-            base_one = [
-                "  11  ",
-                " 111  ",
-                "  11  ",
-                "  11  ",
-                "  11  ",
-                "  11  ",
-                " 11111",
-            ]
-            base_zero = [
-                " 0000 ",
-                "00  00",
-                "00  00",
-                "00  00",
-                "00  00",
-                "00  00",
-                " 0000 ",
-            ]
-
-            def scale_art(art: list[str], k: int) -> list[str]:
-                if k <= 1:
-                    return art
-                scaled = []
-                for row in art:
-                    row_scaled = "".join(ch * k for ch in row)
-                    for _ in range(k):
-                        scaled.append(row_scaled)
-                return scaled
-
-            one_art = scale_art(base_one, self.scale)
-            zero_art = scale_art(base_zero, self.scale)
-            art_height = len(one_art)
-            art_width = len(one_art[0]) + self.gap + len(zero_art[0])
+
+    def _attr(self, which: int) -> int:
+        if not self.color_enabled:
+            return 0
+        return curses.color_pair(which) | curses.A_BOLD
+
+    def frame(self, maxy: int, maxx: int) -> dict:
+        """{(y, x): (text, attr)} for the current values."""
+        seg = {}
+        if self.agg is not None:
+            ones_pct = self.agg.ones_ratio
+            zeros_pct = (1 - ones_pct) if ones_pct is not None else None
+            procs = dict(self.agg.procs)
+        else:
+            ones_pct, zeros_pct, procs = self.last_ones_pct, self.last_zeros_pct, {}
+        one_art, zero_art, art_width = scaled_glyphs(self.scale, self.gap)
+        art_height = len(one_art)
+        if procs:
+            start_y = 1
+        else:
             start_y = max((maxy - art_height) // 2 - 1, 0)
-            start_x = max((maxx - art_width) // 2, 0)
-            for i, row in enumerate(one_art):
-                if self.color_enabled:
-                    self.screen.addstr(start_y + i, start_x, row, curses.color_pair(self.color_pair_one) | curses.A_BOLD)
-                else:
-                    self.screen.addstr(start_y + i, start_x, row)
-            sep_x = start_x + len(one_art[0]) + self.gap
-            for i, row in enumerate(zero_art):
-                if self.color_enabled:
-                    self.screen.addstr(start_y + i, sep_x, row, curses.color_pair(self.color_pair_zero) | curses.A_BOLD)
-                else:
-                    self.screen.addstr(start_y + i, sep_x, row)
-            pct_y = start_y + art_height + 1
-            fmt = f"{{:.{self.pct_decimals}f}}%"
-            ones_txt = f"1s: {fmt.format(ones_pct*100)}" if ones_pct is not None else "1s: n/a"
-            zeros_txt = f"0s: {fmt.format(zeros_pct*100)}" if zeros_pct is not None else "0s: n/a"
-            spacer = " " * max(4, self.gap * 2)
-            line_x = max((maxx - (len(ones_txt) + len(spacer) + len(zeros_txt))) // 2, 0)
-            if self.color_enabled:
-                self.screen.addstr(pct_y, line_x, ones_txt, curses.color_pair(self.color_pair_one) | curses.A_BOLD)
-                self.screen.addstr(pct_y, line_x + len(ones_txt) + len(spacer) - len(spacer), spacer)
-                self.screen.addstr(pct_y, line_x + len(ones_txt) + len(spacer), zeros_txt, curses.color_pair(self.color_pair_zero) | curses.A_BOLD)
-            else:
-                self.screen.addstr(pct_y, line_x, ones_txt + spacer + zeros_txt)
-            self.screen.refresh()
-        except Exception:
-            pass
+        start_x = max((maxx - art_width) // 2, 0)
+        sep_x = start_x + len(one_art[0]) + self.gap
+        for i in range(art_height):
+            seg[(start_y + i, start_x)] = (one_art[i], self._attr(self.color_pair_one))
+            seg[(start_y + i, sep_x)] = (zero_art[i], self._attr(self.color_pair_zero))
+
+        pct_y = start_y + art_height + 1
+        fmt = f"{{:.{self.pct_decimals}f}}%"
+        ones_txt = f"1s: {fmt.format(ones_pct*100)}" if ones_pct is not None else "1s: n/a"
+        zeros_txt = f"0s: {fmt.format(zeros_pct*100)}" if zeros_pct is not None else "0s: n/a"
+        spacer = " " * max(4, self.gap * 2)
+        line_x = max((maxx - (len(ones_txt) + len(spacer) + len(zeros_txt))) // 2, 0)
+        seg[(pct_y, line_x)] = (ones_txt, self._attr(self.color_pair_one))
+        seg[(pct_y, line_x + len(ones_txt) + len(spacer))] = (zeros_txt, self._attr(self.color_pair_zero))
+        if not procs:
+            return seg
+
+        now = time.perf_counter()
+        if now - self.last_sample >= self.spark_sec:
+            self.last_sample = now
+            self.history.sample(procs)
+        y = pct_y + 2
+        spark_w = max(8, min(self.history.length, (maxx - 40) // 2))
+        seg[(y, 0)] = (f"{'proc':>5} {'bps':>14} {'bias pp':>10}  {'bps':<{spark_w}}  bias", curses.A_BOLD)
+        for pid in sorted(procs):
+            y += 1
+            if y >= maxy - 1:
+                break
+            slot = procs[pid]
+            bias = (200.0 * slot[2] / slot[1] - 100.0) if slot[1] else None
+            row = self.history.rows.get(pid)
+            spark_bps = sparkline(row["bps"], spark_w) if row else ""
+            spark_bias = sparkline(row["bias"], spark_w) if row else ""
+            bias_txt = f"{bias:+10.4f}" if bias is not None else f"{'n/a':>10}"
+            seg[(y, 0)] = (f"{pid:>5} {human_bps(float(slot[0] or 0.0)):>14} {bias_txt}  "
+                           f"{spark_bps:<{spark_w}}  {spark_bias}", 0)
+        return seg
+
+    def draw(self):
+        scr = self.screen
+        maxy, maxx = scr.getmaxyx()
+        if (maxy, maxx) != self.size:
+            self.size = (maxy, maxx)
+            self.prev = {}
+            scr.erase()
+        seg = self.frame(maxy, maxx)
+        for pos, (text, _) in self.prev.items():
+            new = seg.get(pos)
+            if new is None or len(new[0]) < len(text):
+                self._put(pos, " " * len(text), 0, maxy, maxx)
+        for pos, item in seg.items():
+            if self.prev.get(pos) != item:
+                self._put(pos, item[0], item[1], maxy, maxx)
+        self.prev = seg
+        scr.refresh()
+
+    def _put(self, pos, text: str, attr: int, maxy: int, maxx: int):
+        y, x = pos
+        if y >= maxy or x >= maxx:
+            return
+        text = text[:maxx - x - (1 if y == maxy - 1 else 0)]
+        if text:
+            try:
+                self.screen.addstr(y, x, text, attr)
+            except curses.error:
+                pass
 
 
 def build_pretty_lines(bits_total: int, ones_ratio: float | None, pretty_scale: int = 1, pretty_gap: int = 3, pct_decimals: int = 6):
     if ones_ratio is None or bits_total is None:
         ones_ratio = None
     zeros_ratio = (1 - ones_ratio) if ones_ratio is not None else None
-    RESET = "\x1b[0m"
-    GREEN = "\x1b[32m"
-    CYAN = "\x1b[36m"
-    BOLD = "\x1b[1m"
-
-    base_one = [
-        "  11  ",
-        " 111  ",
-        "  11  ",
-        "  11  ",
-        "  11  ",
-        "  11  ",
-        " 11111",
-    ]
-    base_zero = [
-        " 0000 ",
-        "00  00",
-        "00  00",
-        "00  00",
-        "00  00",
-        "00  00",
-        " 0000 ",
-    ]
-
-    def scale_art(art, k):
-        if k <= 1:
-            return art
-        scaled = []
-        for row in art:
-            row_scaled = "".join(ch * k for ch in row)
-            for _ in range(k):
-                scaled.append(row_scaled)
-        return scaled
 
-    k = max(1, int(pretty_scale))
     gap = max(1, int(pretty_gap))
-    one_art = scale_art(base_one, k)
-    zero_art = scale_art(base_zero, k)
+    _, _, art_plain_width = scaled_glyphs(pretty_scale, gap)
     spacer = " " * gap
-    art_plain_width = len(one_art[0]) + len(spacer) + len(zero_art[0])
     d = max(0, int(pct_decimals))
     fmt = f"{{:.{d}f}}%"
     ones_txt_plain = f"1s: {fmt.format(ones_ratio*100)}" if ones_ratio is not None else "1s:   n/a  "
@@ -195,12 +339,7 @@ def build_pretty_lines(bits_total: int, ones_ratio: float | None, pretty_scale:
     top = "┌" + ("─" * content_width) + "┐"
     bottom = "└" + ("─" * content_width) + "┘"
     lines = [top]
-    left_pad = (content_width - art_plain_width) // 2
-    right_pad = content_width - art_plain_width - left_pad
-    for i in range(len(one_art)):
-        left_colored = f"{GREEN}{BOLD}{one_art[i]}{RESET}"
-        right_colored = f"{CYAN}{BOLD}{zero_art[i]}{RESET}"
-        lines.append("│" + (" " * left_pad) + left_colored + spacer + right_colored + (" " * right_pad) + "│")
+    lines += _pretty_art_rows(pretty_scale, gap, content_width)
     left_pad_pct = (content_width - len(mid_plain)) // 2
     right_pad_pct = content_width - len(mid_plain) - left_pad_pct
     ones_col = f"{GREEN}{BOLD}{ones_txt_plain}{RESET}"
@@ -216,23 +355,61 @@ def build_pretty_lines(bits_total: int, ones_ratio: float | None, pretty_scale:
 
 
 def stdout_live_update(pretty: bool, bits_total: int, ones_ratio: float | None, pretty_state: dict, pretty_scale: int, pretty_gap: int, pct_decimals: int):
+    """
+    Write one frame. In pretty mode only the lines that differ from the
+    previous frame (kept in `pretty_state`) are rewritten; unchanged lines
+    are skipped with a bare newline.
+    """
     try:
         if pretty:
             lines = build_pretty_lines(bits_total, ones_ratio, pretty_scale, pretty_gap, pct_decimals)
+            prev = pretty_state.get("prev")
             if pretty_state["printed"]:
                 sys.stdout.write(f"\x1b[{pretty_state['lines']}A")
-            for ln in lines:
-                sys.stdout.write("\x1b[2K" + ln + "\n")
+            if prev is None or len(prev) != len(lines):
+                prev = [None] * len(lines)
+            sys.stdout.write("".join(
+                "\n" if ln == old else "\x1b[2K" + ln + "\n" for ln, old in zip(lines, prev)
+            ))
             pretty_state["printed"] = True
             pretty_state["lines"] = len(lines)
+            pretty_state["prev"] = lines
             sys.stdout.flush()
         else:
             if ones_ratio is None:
                 return
             line = f"bits={bits_total:,}  1s={ones_ratio*100:.3f}%  0s={(1-ones_ratio)*100:.3f}%"
+            if line == pretty_state.get("prev"):
+                return
+            pretty_state["prev"] = line
             sys.stdout.write("\r" + line)
             sys.stdout.flush()
     except Exception:
         pass
 
 
+class StdoutLive(_Refresher):
+    """`stdout_live_update` driven from the refresh thread with the Aggregator's totals."""
+
+    def __init__(self, agg, interval: float, pretty: bool = False, pretty_scale: int = 1, pretty_gap: int = 3,
+                 pct_decimals: int = 6):
+        super().__init__(interval)
+        self.agg = agg
+        self.pretty = pretty
+        self.pretty_scale = pretty_scale
+        self.pretty_gap = pretty_gap
+        self.pct_decimals = pct_decimals
+        self.state = {"printed": False, "lines": 0}
+
+    def start(self):
+        self.start_thread()
+
+    def stop(self):
+        self.stop_thread()
+
+    def draw(self):
+        ones_ratio = self.agg.ones_ratio
+        if ones_ratio is None:
+            return
+        stdout_live_update(self.pretty, self.agg.bits_total, ones_ratio, self.state,
+                           self.pretty_scale, self.pretty_gap, self.pct_decimals)
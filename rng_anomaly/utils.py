@@ -78,6 +78,20 @@ def rct_cutoff_from_alpha(alpha_one_sided: float) -> int:
     return max(r, 8)
 
 
+def chi2_upper_quantile(df: int, alpha: float) -> float:
+    """
+    Value exceeded with probability alpha by a chi-square with df degrees
+    of freedom (Wilson–Hilferty cube-root normal approximation).
+    """
+    if df <= 0:
+        raise ValueError("df must be > 0")
+    if not (0 < alpha < 1):
+        raise ValueError("alpha must be in (0,1)")
+    z = inv_norm_cdf(1 - alpha)
+    h = 2.0 / (9.0 * df)
+    return df * max(0.0, 1 - h + z * math.sqrt(h)) ** 3
+
+
 def human_bps(bps: float) -> str:
     if not math.isfinite(bps):
         return "n/a"
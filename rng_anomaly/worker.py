@@ -1,9 +1,67 @@
+import sys
 import time
 import math
+import queue
+import threading
 import multiprocessing as mp
 
-from .tests_online import RCT, APT, SPRTDetector, ZMonobit
-from .sources import bit_stream_from_device, bit_stream_synthetic, derive_process_seed
+from . import checkpoint as ckpt
+from .budget import CpuBudget
+from .capture import ContextRing
+from .tests_online import RCT, APT, SPRTDetector, ZMonobit, BitPosition, SerialTest, MaurerUniversal
+from .sources import (
+    bit_stream_from_device,
+    bits_from_chunks,
+    chunk_stream_from_device,
+    chunk_stream_synthetic,
+    synthetic_partition,
+    stream_offset,
+)
+
+
+ENGINES = ("bit", "block")
+EXEC_MODES = ("process", "thread")
+
+# Optional tests enabled by name through `build_tests(extras=...)`. They
+# run after the core battery and add their `stats()` to STATS payloads.
+EXTRA_TESTS = {
+    "BITPOS": BitPosition,
+    "SERIAL": SerialTest,
+    "MAURER": MaurerUniversal,
+}
+
+
+def build_tests(
+    alpha: float,
+    beta: float,
+    delta: float,
+    apt_window: int,
+    ztest_enabled: bool = False,
+    z_alpha: float | None = None,
+    z_min_bits: int = 10000,
+    thresholds: dict | None = None,
+    extras: dict | None = None,
+) -> tuple:
+    """
+    Build the online test battery. Returns (rct, apt, sprt, tests) where
+    `tests` is the list to run, including ZMonobit when enabled.
+    `thresholds` is a cache from `rng-anomaly thresholds` whose cutoffs
+    replace the alpha-derived ones. `extras` maps `EXTRA_TESTS` names to
+    their keyword arguments; those tests are appended last.
+    """
+    rct = RCT(alpha=alpha)
+    apt = APT(window=apt_window, alpha=alpha)
+    sprt = SPRTDetector(delta=delta, alpha=alpha, beta=beta)
+    tests = [rct, apt, sprt]
+    if ztest_enabled:
+        z_alpha_eff = z_alpha if (z_alpha is not None) else alpha
+        tests.append(ZMonobit(alpha=z_alpha_eff, min_bits=z_min_bits))
+    for name, kwargs in (extras or {}).items():
+        tests.append(EXTRA_TESTS[name](**kwargs))
+    if thresholds:
+        from .thresholds import apply_thresholds
+        apply_thresholds(thresholds, rct, apt, tests[3] if ztest_enabled else None)
+    return rct, apt, sprt, tests
 
 
 def worker(
@@ -27,126 +85,365 @@ def worker(
     ztest_enabled: bool = False,
     z_alpha: float | None = None,
     z_min_bits: int = 10000,
+    engine: str = "bit",
+    stop_event=None,
+    checkpoint_dir: str | None = None,
+    checkpoint_interval: float = 60.0,
+    resume: bool = False,
+    num_procs: int = 1,
+    thresholds: dict | None = None,
+    extras: dict | None = None,
+    lincomp_queue=None,
+    lincomp_bytes: int = 12500,
+    lincomp_every: int = 16,
+    budget: float | None = None,
+    context_dir: str | None = None,
+    context_bytes: int = 1 << 16,
 ):
     """
     Worker loop that reads bits from a source and applies RCT, APT, SPRT,
     and optionally Z-test. Reports the first anomaly found or termination.
+
+    engine="bit" feeds the tests one bit at a time; engine="block" feeds
+    whole read chunks through the tests' ``update_bytes`` fast paths.
+    stop_event (threading/multiprocessing Event) asks the loop to finish
+    early; thread workers cannot be terminated, so they rely on it.
+    With checkpoint_dir, the test state and counters are snapshotted every
+    checkpoint_interval seconds (written by a background thread) and, with
+    resume, restored from the last snapshot at startup.
+    Synthetic workers read their share of one logical stream (see
+    `synthetic_partition`; num_procs is the number of workers), and their
+    ANOMALY events carry the triggering bit's `stream_offset`.
+    thresholds (see `build_tests`) overrides the alpha-derived cutoffs;
+    extras (see `build_tests`) enables optional tests, whose counters are
+    added to STATS and DONE payloads and whose state is checkpointed too.
+    With lincomp_queue (block engine), the first lincomp_bytes of every
+    lincomp_every-th chunk are offered to a `lincomp.LinearComplexityPool`
+    without blocking; samples are dropped while its queue is full.
+    With budget (block engine), each extra test gets a `budget.CpuBudget`
+    of that fraction of a core and skips chunks once it has used it; the
+    core tests always see every chunk. Coverage is reported in STATS.
+    With context_dir, the last chunks are kept in a `capture.ContextRing`
+    and each ANOMALY gets a dump of up to context_bytes around its bit
+    (`context_file`, `context_start_bit`, `context_bytes`).
     """
-    rct = RCT(alpha=alpha)
-    apt = APT(window=apt_window, alpha=alpha)
-    sprt = SPRTDetector(delta=delta, alpha=alpha, beta=beta)
-    tests = [rct, apt, sprt]
-    if ztest_enabled:
-        z_alpha_eff = z_alpha if (z_alpha is not None) else alpha
-        tests.append(ZMonobit(alpha=z_alpha_eff, min_bits=z_min_bits))
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}")
+    rct, apt, sprt, tests = build_tests(alpha, beta, delta, apt_window, ztest_enabled, z_alpha, z_min_bits,
+                                        thresholds, extras)
+
+    zmono = tests[3] if ztest_enabled else None
+    core_tests = tests[:4 if ztest_enabled else 3]
+    extra_tests = tests[len(core_tests):]
+    extra_names = list(extras or {})
+    budgets = [CpuBudget(budget) if budget is not None else None for _ in extra_tests]
+    params = {
+        "alpha": alpha, "beta": beta, "delta": delta, "apt_window": apt_window,
+        "z_alpha": z_alpha, "z_min_bits": z_min_bits,
+    }
 
     bits_seen = 0
     t0 = time.perf_counter()
     ones_seen = 0
     last_report = t0
+    bits_base = 0
+    # Counters restored by --resume (`bits_resumed`/`ones_resumed`), sent
+    # with STATS and ITER so the main process can tell history from bits
+    # processed since startup.
+    resumed = {}
+    bits_limit = max_bits
+    writer = None
+    last_ckpt = t0
+    chunks_seen = 0
+    lc_sent = lc_dropped = 0
+
+    def state(now: float) -> dict:
+        rate = (bits_seen - bits_base) / (now - t0) if now > t0 else float("nan")
+        apt_len = apt.filled
+        snap = {
+            "proc": proc_id,
+            "bits_processed": bits_seen,
+            "ones_total": ones_seen,
+            "ones_pct": (ones_seen / bits_seen) if bits_seen else None,
+            "apt_window": apt.window,
+            "apt_len": apt_len,
+            "apt_ones": apt.ones,
+            "apt_pct": (apt.ones / apt_len) if apt_len > 0 else None,
+            "rct_run_len": rct.run_len,
+            "sprt_up": sprt.s_up,
+            "sprt_dn": sprt.s_dn,
+            "bps": rate,
+        }
+        snap.update(resumed)
+        for test in extra_tests:
+            snap.update(test.stats())
+        if budget is not None:
+            snap["coverage"] = {name: b.stats() for name, b in zip(extra_names, budgets)}
+        if lincomp_queue is not None:
+            snap["lincomp_sent"] = lc_sent
+            snap["lincomp_dropped"] = lc_dropped
+        return snap
+
+    synth_start, synth_stride = synthetic_partition(proc_id, num_procs, max_bits) if use_synthetic else (0, 1)
+
+    ring = ContextRing(context_dir, proc_id, context_bytes) if context_dir is not None else None
+
+    def ringed(chunks, start_bit: int):
+        pos = start_bit // 8
+        for data in chunks:
+            ring.push(pos, data)
+            pos += len(data)
+            yield data
+
+    def capture():
+        return ckpt.capture_proc(proc_id, engine, params, rct, apt, sprt, zmono, bits_seen, ones_seen,
+                                 list(zip(extra_names, extra_tests)))
 
     try:
-        if use_synthetic:
-            base_seed = synthetic_seed
-            seed_eff = derive_process_seed(base_seed, proc_id)
-            bit_gen = bit_stream_synthetic(p=synthetic_p, seed=seed_eff)
-        else:
-            bit_gen = bit_stream_from_device(source_path, chunk_size=chunk_size)
-
-        for bit in bit_gen:
-            bits_seen += 1
-            ones_seen += bit
-
-            if per_iter and (bits_seen % max(1, iter_sample) == 0):
-                zeros_seen = bits_seen - ones_seen
-                queue_out.put((
-                    "ITER",
-                    {
-                        "proc": proc_id,
-                        "bits_processed": bits_seen,
-                        "ones_total": ones_seen,
-                        "zeros_total": zeros_seen,
-                        "ones_pct": (ones_seen / bits_seen),
-                        "zeros_pct": (zeros_seen / bits_seen),
-                    },
-                ))
-
-            for test in tests:
-                evt = test.update(bit)
-                if evt is not None:
-                    now = time.perf_counter()
-                    rate = bits_seen / (now - t0) if now > t0 else float("nan")
-                    apt_len = len(apt.buf)
-                    evt.update(
+        if checkpoint_dir is not None:
+            path = ckpt.proc_path(checkpoint_dir, proc_id)
+            if resume:
+                saved = ckpt.load(path, ckpt.decode_proc)
+                if saved is not None:
+                    bits_seen, ones_seen = ckpt.restore_proc(saved, engine, params, rct, apt, sprt, zmono,
+                                                             list(zip(extra_names, extra_tests)))
+                    bits_base = bits_seen
+                    resumed = {"bits_resumed": bits_seen, "ones_resumed": ones_seen}
+                    if max_bits is not None:
+                        bits_limit = bits_base + max_bits
+            writer = ckpt.Checkpointer(path, ckpt.encode_proc)
+
+        if engine == "block":
+            if use_synthetic:
+                chunk_gen = chunk_stream_synthetic(
+                    p=synthetic_p, seed=synthetic_seed, chunk_size=chunk_size,
+                    start_block=synth_start, stride=synth_stride,
+                )
+            else:
+                chunk_gen = chunk_stream_from_device(source_path, chunk_size=chunk_size)
+            if ring is not None:
+                chunk_gen = ringed(chunk_gen, bits_seen)
+            sample = max(1, iter_sample)
+
+            for data in chunk_gen:
+                if bits_limit is not None:
+                    data = data[:max(0, math.ceil((bits_limit - bits_seen) / 8))]
+                    if not data:
+                        break
+                nbits = len(data) * 8
+                ones_chunk = int.from_bytes(data, "little").bit_count()
+                events = []
+                for test in core_tests:
+                    evt = test.update_bytes(data)
+                    if evt is not None:
+                        events.append(evt)
+                for test, b in zip(extra_tests, budgets):
+                    if b is None:
+                        evt = test.update_bytes(data)
+                    elif b.due():
+                        evt = b.run(test.update_bytes, data, nbits)
+                    else:
+                        test.skip()
+                        b.skip(nbits)
+                        continue
+                    if evt is not None:
+                        events.append(evt)
+
+                bits_before, ones_before = bits_seen, ones_seen
+                bits_seen += nbits
+                ones_seen += ones_chunk
+
+                if lincomp_queue is not None and chunks_seen % lincomp_every == 0:
+                    stream_off = stream_offset(bits_before, synth_start, synth_stride) if use_synthetic else None
+                    try:
+                        lincomp_queue.put_nowait((proc_id, bits_before, stream_off, bytes(data[:lincomp_bytes])))
+                        lc_sent += 1
+                    except queue.Full:
+                        lc_dropped += 1
+                chunks_seen += 1
+
+                if per_iter and (bits_seen // sample) > (bits_before // sample):
+                    zeros_seen = bits_seen - ones_seen
+                    queue_out.put((
+                        "ITER",
                         {
                             "proc": proc_id,
                             "bits_processed": bits_seen,
                             "ones_total": ones_seen,
-                            "ones_pct": (ones_seen / bits_seen) if bits_seen else None,
-                            "apt_window": apt.window,
-                            "apt_len": apt_len,
-                            "apt_ones": apt.ones,
-                            "apt_pct": (apt.ones / apt_len) if apt_len > 0 else None,
-                            "rct_run_len": rct.run_len,
-                            "sprt_up": sprt.s_up,
-                            "sprt_dn": sprt.s_dn,
-                            "bps": rate,
-                        }
-                    )
-                    queue_out.put(("ANOMALY", evt))
+                            "zeros_total": zeros_seen,
+                            "ones_pct": (ones_seen / bits_seen),
+                            "zeros_pct": (zeros_seen / bits_seen),
+                            **resumed,
+                        },
+                    ))
+
+                if events:
+                    now = time.perf_counter()
+                    wall = time.time()
+                    snap = state(now)
+                    for evt in sorted(events, key=lambda e: e["offset"]):
+                        offset = evt.pop("offset")
+                        # Counters up to and including the triggering bit;
+                        # test statistics are taken at the end of the chunk.
+                        prefix = int.from_bytes(data[:offset // 8 + 1], "little")
+                        prefix &= (1 << (offset + 1)) - 1
+                        evt.update(snap)
+                        evt.update(
+                            {
+                                "bits_processed": bits_before + offset + 1,
+                                "ones_total": ones_before + prefix.bit_count(),
+                                "ones_pct": (ones_before + prefix.bit_count()) / (bits_before + offset + 1),
+                            }
+                        )
+                        if use_synthetic:
+                            evt["stream_offset"] = stream_offset(bits_before + offset, synth_start, synth_stride)
+                        if ring is not None:
+                            evt.update(ring.capture(bits_before + offset))
+                        evt["detected_at"] = wall
+                        queue_out.put(("ANOMALY", evt))
                     if stop_on_anomaly:
                         return
 
-            now = time.perf_counter()
-            if (now - last_report) >= report_interval:
-                rate = bits_seen / (now - t0) if now > t0 else float("nan")
-                apt_len = len(apt.buf)
-                queue_out.put(
-                    (
-                        "STATS",
+                now = time.perf_counter()
+                if (now - last_report) >= report_interval:
+                    queue_out.put(("STATS", state(now)))
+                    last_report = now
+                if writer is not None and (now - last_ckpt) >= checkpoint_interval:
+                    writer.submit(capture())
+                    last_ckpt = now
+
+                if bits_limit is not None and bits_seen >= bits_limit:
+                    break
+                if max_seconds is not None and (now - t0) >= max_seconds:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    break
+        else:
+            if use_synthetic:
+                chunks = chunk_stream_synthetic(
+                    p=synthetic_p, seed=synthetic_seed, chunk_size=chunk_size,
+                    start_block=synth_start, stride=synth_stride,
+                )
+            elif ring is not None:
+                chunks = chunk_stream_from_device(source_path, chunk_size=chunk_size)
+            if ring is not None:
+                chunks = ringed(chunks, bits_seen)
+            if use_synthetic or ring is not None:
+                bit_gen = bits_from_chunks(chunks)
+            else:
+                bit_gen = bit_stream_from_device(source_path, chunk_size=chunk_size)
+
+            for bit in bit_gen:
+                bits_seen += 1
+                ones_seen += bit
+
+                if per_iter and (bits_seen % max(1, iter_sample) == 0):
+                    zeros_seen = bits_seen - ones_seen
+                    queue_out.put((
+                        "ITER",
                         {
                             "proc": proc_id,
                             "bits_processed": bits_seen,
                             "ones_total": ones_seen,
-                            "ones_pct": (ones_seen / bits_seen) if bits_seen else None,
-                            "apt_window": apt.window,
-                            "apt_len": apt_len,
-                            "apt_ones": apt.ones,
-                            "apt_pct": (apt.ones / apt_len) if apt_len > 0 else None,
-                            "rct_run_len": rct.run_len,
-                            "sprt_up": sprt.s_up,
-                            "sprt_dn": sprt.s_dn,
-                            "bps": rate,
+                            "zeros_total": zeros_seen,
+                            "ones_pct": (ones_seen / bits_seen),
+                            "zeros_pct": (zeros_seen / bits_seen),
+                            **resumed,
                         },
-                    )
-                )
-                last_report = now
+                    ))
+
+                for test in tests:
+                    evt = test.update(bit)
+                    if evt is not None:
+                        evt.update(state(time.perf_counter()))
+                        if use_synthetic:
+                            evt["stream_offset"] = stream_offset(bits_seen - 1, synth_start, synth_stride)
+                        if ring is not None:
+                            evt.update(ring.capture(bits_seen - 1))
+                        evt["detected_at"] = time.time()
+                        queue_out.put(("ANOMALY", evt))
+                        if stop_on_anomaly:
+                            return
 
-            if max_bits is not None and bits_seen >= max_bits:
-                break
-            if max_seconds is not None and (time.perf_counter() - t0) >= max_seconds:
-                break
+                now = time.perf_counter()
+                if (now - last_report) >= report_interval:
+                    queue_out.put(("STATS", state(now)))
+                    last_report = now
+                    if writer is not None and (now - last_ckpt) >= checkpoint_interval:
+                        writer.submit(capture())
+                        last_ckpt = now
 
+                if bits_limit is not None and bits_seen >= bits_limit:
+                    break
+                if max_seconds is not None and (time.perf_counter() - t0) >= max_seconds:
+                    break
+                if stop_event is not None and (bits_seen & 0xFFF) == 0 and stop_event.is_set():
+                    break
+
+        if writer is not None:
+            writer.submit(capture())
+            writer.close()
+            writer = None
         now = time.perf_counter()
-        apt_len = len(apt.buf)
-        queue_out.put(
-            (
-                "DONE",
-                {
-                    "proc": proc_id,
-                    "bits_processed": bits_seen,
-                    "ones_total": ones_seen,
-                    "ones_pct": (ones_seen / bits_seen) if bits_seen else None,
-                    "apt_window": apt.window,
-                    "apt_len": apt_len,
-                    "apt_ones": apt.ones,
-                    "apt_pct": (apt.ones / apt_len) if apt_len > 0 else None,
-                    "bps": bits_seen / (now - t0) if now > t0 else float("nan"),
-                },
-            )
-        )
+        done = state(now)
+        for key in ("rct_run_len", "sprt_up", "sprt_dn"):
+            done.pop(key)
+        queue_out.put(("DONE", done))
 
     except Exception as e:
         queue_out.put(("ERROR", {"proc": proc_id, "error": repr(e)}))
+    finally:
+        if writer is not None:
+            writer.submit(capture())
+            writer.close()
+        if ring is not None:
+            ring.flush()
+
+
+def launch_workers(exec_mode: str, count: int, make_kwargs) -> tuple:
+    """
+    Start `count` workers as processes or threads.
+
+    make_kwargs(proc_id, queue_out, stop_event) returns the keyword
+    arguments for `worker`. Thread mode uses a plain queue.Queue, so
+    payloads are handed over as shared Python objects without pickling.
+    Returns (queue, handles, stop_event).
+    """
+    if exec_mode not in EXEC_MODES:
+        raise ValueError(f"exec_mode must be one of {EXEC_MODES}")
+    if exec_mode == "thread":
+        q = queue.Queue()
+        stop = threading.Event()
+        factory = threading.Thread
+    else:
+        q = mp.Queue()
+        stop = None
+        factory = mp.Process
+    handles = []
+    for i in range(count):
+        h = factory(target=worker, kwargs=make_kwargs(i, q, stop), daemon=True)
+        h.start()
+        handles.append(h)
+    return q, handles, stop
+
+
+def stop_workers(handles: list, stop_event=None, timeout: float = 1.0):
+    """
+    Stop workers started by `launch_workers`: signal threads through the
+    stop event, terminate processes, then join everything.
+    """
+    if stop_event is not None:
+        stop_event.set()
+    for h in handles:
+        if isinstance(h, mp.Process) and h.is_alive():
+            h.terminate()
+    for h in handles:
+        h.join(timeout=timeout)
 
 
+def gil_enabled() -> bool:
+    """
+    True unless running on a free-threaded CPython build with the GIL off.
+    """
+    check = getattr(sys, "_is_gil_enabled", None)
+    return True if check is None else bool(check())